@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AdvertisementClassConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'advertisement'
-    verbose_name = _("Advertisement")
\ No newline at end of file
+    verbose_name = _("Advertisement")
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0004_advertisement_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='weight',
+            field=models.PositiveIntegerField(default=1, help_text='Relative share of impressions among ads of the same frame and type', verbose_name='weight'),
+        ),
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['end_date', 'start_date'], name='advertisement_window_idx'),
+        ),
+    ]
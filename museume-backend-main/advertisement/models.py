@@ -21,10 +21,17 @@ class Advertisement(models.Model):
     banner_image = models.ImageField(upload_to='advertisements/', help_text=_("Upload the banner image"), verbose_name=_("banner image"))
     start_date = models.DateTimeField(help_text=_("Start date of the display period"), verbose_name=_("start date"))
     end_date = models.DateTimeField(help_text=_("End date of the display period"), verbose_name=_("end date"))
+    weight = models.PositiveIntegerField(
+        default=1, help_text=_("Relative share of impressions among ads of the same frame and type"), verbose_name=_("weight")
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
 
     class Meta:
         verbose_name = _("Advertisement")
         verbose_name_plural = _("Advertisements")
+        indexes = [
+            models.Index(fields=['end_date', 'start_date'], name='advertisement_window_idx'),
+        ]
 
     def is_active(self):
         from django.utils.timezone import now
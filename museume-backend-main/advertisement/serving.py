@@ -0,0 +1,107 @@
+"""
+Advertisement serving.
+
+The set of currently active ads (start_date <= now <= end_date) is loaded
+with one indexed query and kept in process memory until the next window
+boundary, i.e. the earliest end_date of an active ad or start_date of an
+upcoming one. Requests normally run no query; they only read a version
+number from the default cache.
+
+Admin edits bump a version number in the default cache (see signals.py);
+each process compares it with the version its snapshot was built from and
+reloads when they differ. AD_CACHE_MAX_AGE bounds how long a snapshot is
+trusted when the default cache is not shared between processes.
+"""
+import hashlib
+import random
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Advertisement
+
+AD_CACHE_MAX_AGE = getattr(settings, 'AD_CACHE_MAX_AGE', 300)
+AD_VERSION_KEY = 'advertisement:version'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+class ActiveAds:
+    """Active ads at one point in time, valid until expires_at."""
+
+    def __init__(self, ads, expires_at, version):
+        self.ads = ads
+        self.expires_at = expires_at
+        self.version = version
+        self.last_modified = max((ad['updated_at'] for ad in ads), default=None)
+        self.signature = hashlib.md5(
+            '|'.join(f"{ad['id']}:{ad['updated_at'].isoformat()}" for ad in ads).encode()
+        ).hexdigest()
+
+    def rotate(self, rng=random):
+        """One ad per (banner_frame, add_type), picked in proportion to weight."""
+        groups = {}
+        for ad in self.ads:
+            groups.setdefault((ad['banner_frame'], ad['add_type']), []).append(ad)
+        return [
+            rng.choices(ads, weights=[ad['weight'] for ad in ads])[0] if any(ad['weight'] for ad in ads) else ads[0]
+            for ads in groups.values()
+        ]
+
+
+def get_version():
+    return cache.get(AD_VERSION_KEY, 0)
+
+
+def bump_version():
+    try:
+        cache.incr(AD_VERSION_KEY)
+    except ValueError:
+        cache.set(AD_VERSION_KEY, 1, None)
+
+
+def load_active_ads(now, version):
+    ads = [
+        {
+            'id': ad.id,
+            'name': ad.name,
+            'banner_frame': ad.banner_frame,
+            'add_type': ad.add_type,
+            'banner_image': ad.banner_image.url if ad.banner_image else None,
+            'start_date': ad.start_date,
+            'end_date': ad.end_date,
+            'weight': ad.weight,
+            'updated_at': ad.updated_at,
+        }
+        for ad in Advertisement.objects.filter(start_date__lte=now, end_date__gte=now).order_by('id')
+    ]
+    # The set changes when an active ad ends or an upcoming one starts
+    boundaries = [ad['end_date'] + timedelta(microseconds=1) for ad in ads]
+    next_start = Advertisement.objects.filter(start_date__gt=now).order_by('start_date').values_list('start_date', flat=True).first()
+    if next_start:
+        boundaries.append(next_start)
+    expires_at = min(boundaries + [now + timedelta(seconds=AD_CACHE_MAX_AGE)])
+    return ActiveAds(ads, expires_at, version)
+
+
+def get_active_ads():
+    """Snapshot of the ads active now, reloaded only when the set can have changed."""
+    global _snapshot
+    now = timezone.now()
+    version = get_version()
+    snapshot = _snapshot
+    if snapshot is None or now >= snapshot.expires_at or snapshot.version != version:
+        with _lock:
+            snapshot = _snapshot
+            if snapshot is None or now >= snapshot.expires_at or snapshot.version != version:
+                snapshot = _snapshot = load_active_ads(now, version)
+    return snapshot
+
+
+def clear_active_ads():
+    global _snapshot
+    _snapshot = None
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Advertisement
+from .serving import bump_version, clear_active_ads
+
+
+@receiver(post_save, sender=Advertisement)
+@receiver(post_delete, sender=Advertisement)
+def reload_active_ads(sender, **kwargs):
+    # Other processes notice the new version once the change is committed
+    transaction.on_commit(bump_version)
+    clear_active_ads()
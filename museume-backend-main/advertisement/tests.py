@@ -0,0 +1,65 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Advertisement
+from .serving import clear_active_ads, get_active_ads
+
+
+class AdvertisementServingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.active = Advertisement.objects.create(
+            name='Active', banner_image='advertisements/a.png', add_type='banner',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        cls.unweighted = Advertisement.objects.create(
+            name='Unweighted', banner_image='advertisements/b.png', add_type='banner', weight=0,
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+        )
+        cls.logo = Advertisement.objects.create(
+            name='Logo', banner_image='advertisements/c.png', add_type='logo',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(hours=1),
+        )
+        Advertisement.objects.create(
+            name='Expired', banner_image='advertisements/d.png',
+            start_date=now - timedelta(days=2), end_date=now - timedelta(days=1),
+        )
+        cls.upcoming = Advertisement.objects.create(
+            name='Upcoming', banner_image='advertisements/e.png',
+            start_date=now + timedelta(minutes=30), end_date=now + timedelta(days=1),
+        )
+
+    def setUp(self):
+        clear_active_ads()
+
+    def test_only_active_ads_are_served_without_queries(self):
+        response = self.client.get('/api/advertisements/')
+        self.assertEqual([ad['name'] for ad in response.json()], ['Active', 'Unweighted', 'Logo'])
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/advertisements/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @mock.patch('advertisement.serving.AD_CACHE_MAX_AGE', 3600)
+    def test_snapshot_expires_at_next_window_boundary(self):
+        self.assertEqual(get_active_ads().expires_at, self.upcoming.start_date)
+
+        with mock.patch('django.utils.timezone.now', return_value=self.upcoming.start_date):
+            names = [ad['name'] for ad in get_active_ads().ads]
+        self.assertEqual(names, ['Active', 'Unweighted', 'Logo', 'Upcoming'])
+
+    def test_changes_reload_the_snapshot(self):
+        get_active_ads()
+        with self.captureOnCommitCallbacks(execute=True):
+            Advertisement.objects.filter(pk=self.logo.pk).delete()
+        self.assertEqual([ad['name'] for ad in get_active_ads().ads], ['Active', 'Unweighted'])
+
+    def test_rotation_picks_one_ad_per_type_by_weight(self):
+        for _ in range(20):
+            response = self.client.get('/api/advertisements/?rotate=1')
+            self.assertEqual(sorted(ad['name'] for ad in response.json()), ['Active', 'Logo'])
@@ -3,12 +3,23 @@ from django.http import JsonResponse
 from django.views import View
 from .models import Advertisement
 from django.utils.translation import gettext as _
+from museum_app.conditional import ConditionalGetMixin
+from .serving import get_active_ads
+import hashlib
 
-class AdvertisementListView(View):
-    def _get_secure_image_url(self, request, image_field):
+class AdvertisementListView(ConditionalGetMixin, View):
+    """
+    Currently active advertisements, served from the in-process snapshot
+    (see serving.py) without database queries.
+
+    Query params:
+        rotate: If set, return one ad per banner frame and type, picked by weight
+    """
+
+    def _get_secure_image_url(self, request, image_url):
         """Helper method to ensure HTTPS URLs in production"""
-        if image_field:
-            url = request.build_absolute_uri(image_field.url)
+        if image_url:
+            url = request.build_absolute_uri(image_url)
             # Force HTTPS in production
             if url.startswith('http://') and (
                 'museume.art' in url or 
@@ -19,23 +30,37 @@ class AdvertisementListView(View):
         return None
     
     def get(self, request):
-        ads = Advertisement.objects.all()
+        self.active_ads = get_active_ads()
+        if request.GET.get('rotate'):
+            # A different pick on every request, so no conditional GET
+            return JsonResponse(self.get_advertisements(request, self.active_ads.rotate()), safe=False)
+        return self.conditional_get(
+            request, lambda: JsonResponse(self.get_advertisements(request, self.active_ads.ads), safe=False)
+        )
+
+    def get_version(self, request):
+        # Derived from the snapshot instead of querying the table
+        etag = '"%s"' % hashlib.md5(
+            f"{self.active_ads.signature}|{request.get_full_path()}|{request.build_absolute_uri('/')}".encode()
+        ).hexdigest()
+        last_modified = self.active_ads.last_modified
+        return etag, last_modified.timestamp() if last_modified else None
+
+    def get_advertisements(self, request, ads):
         data = [
             {
-                "id": ad.id,
-                "name": ad.name,
-                "banner_frame": ad.banner_frame,
-                "add_type": ad.add_type,
-                "banner_image": self._get_secure_image_url(request, ad.banner_image) if ad.banner_image else None,
-                "start_date": ad.start_date,
-                "end_date": ad.end_date,
+                "id": ad['id'],
+                "name": ad['name'],
+                "banner_frame": ad['banner_frame'],
+                "add_type": ad['add_type'],
+                "banner_image": self._get_secure_image_url(request, ad['banner_image']),
+                "start_date": ad['start_date'],
+                "end_date": ad['end_date'],
                 "is_active": True,
-                                # "is_active": ad.is_active,
-
             }
             for ad in ads
         ]
-        return JsonResponse(data, safe=False)
+        return data
 
 class AdvertisementDetailView(View):
     def get(self, request, pk):
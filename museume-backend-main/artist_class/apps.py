@@ -5,3 +5,6 @@ class ArtistClassConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'artist_class'
     verbose_name = _("Artist Class")
+
+    def ready(self):
+        from . import webhooks  # noqa: F401
@@ -0,0 +1,73 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from member.models import Member
+from .models import ArtistClass, MemberClassSignup, Payment
+from .views import AsyncClassSignupView, AsyncConfirmPaymentView
+
+
+class FakePaymentIntent(dict):
+
+    def __init__(self, **fields):
+        super().__init__(**fields)
+        self.__dict__.update(fields)
+
+
+class AsyncPaymentViewTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        cls.artist_class = ArtistClass.objects.create(
+            name='Drawing', category='Art', thumbnail='artist_class_thumbnails/a.png',
+            url='https://example.com/class', cost=1200, currency='JPY',
+        )
+
+    def post(self, view_class, data):
+        request = APIRequestFactory().post('/', data, format='json')
+        force_authenticate(request, self.member)
+        return view_class.as_view()(request)
+
+    def test_views_are_async(self):
+        self.assertTrue(iscoroutinefunction(AsyncClassSignupView.as_view()))
+        self.assertTrue(iscoroutinefunction(AsyncConfirmPaymentView.as_view()))
+
+    @mock.patch('stripe.PaymentIntent.create')
+    async def test_signup_creates_a_pending_payment(self, create):
+        create.return_value = FakePaymentIntent(id='pi_1', client_secret='secret')
+        response = await self.post(AsyncClassSignupView, {'artist_class': self.artist_class.pk})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment_intent_client_secret'], 'secret')
+        self.assertEqual(create.call_args.kwargs['amount'], 1200)
+        payment = await Payment.objects.aget(stripe_payment_intent_id='pi_1')
+        self.assertEqual(payment.status, Payment.PENDING)
+
+    @mock.patch('stripe.PaymentIntent.modify')
+    @mock.patch('stripe.PaymentIntent.retrieve')
+    async def test_signup_follows_price_changes_of_a_pending_payment(self, retrieve, modify):
+        retrieve.return_value = FakePaymentIntent(id='pi_3', amount=1000, currency='jpy')
+        await Payment.objects.acreate(
+            member=self.member, artist_class=self.artist_class, amount=1000,
+            stripe_payment_intent_id='pi_3', stripe_payment_intent_secret='secret', status=Payment.PENDING,
+        )
+        response = await self.post(AsyncClassSignupView, {'artist_class': self.artist_class.pk})
+
+        self.assertEqual(response.status_code, 200)
+        modify.assert_called_once_with('pi_3', amount=1200)
+        payment = await Payment.objects.aget(stripe_payment_intent_id='pi_3')
+        self.assertEqual(payment.amount, 1200)
+
+    @mock.patch('stripe.PaymentIntent.retrieve_async')
+    async def test_confirm_payment_confirms_the_signup(self, retrieve_async):
+        retrieve_async.return_value = FakePaymentIntent(id='pi_2', status='succeeded')
+        await Payment.objects.acreate(
+            member=self.member, artist_class=self.artist_class, amount=1200, stripe_payment_intent_id='pi_2',
+        )
+        response = await self.post(AsyncConfirmPaymentView, {'payment_intent_id': 'pi_2'})
+
+        self.assertEqual(response.status_code, 200)
+        signup = await MemberClassSignup.objects.aget(member=self.member, artist_class=self.artist_class)
+        self.assertEqual(signup.status, MemberClassSignup.CONFIRMED)
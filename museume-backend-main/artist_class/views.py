@@ -4,18 +4,25 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.response import Response
+from museum_app.async_views import AsyncAPIView
 from museum_app.permissions import IsChild
 from .filters import ArtistClassFilter
 from .models import ArtistClass, MemberClassSignup, Payment
 from .serializers import ArtistClassSerializer, MemberClassSignupSerializer, PaymentSerializer
 from .pagination import CustomPageNumberPagination
 from member.helpers.emails import send_email
+from billing.models import StripeEvent
+from billing.webhooks import record_stripe_event
 from django.utils.translation import gettext as _
 from django.utils.decorators import method_decorator
+from asgiref.sync import sync_to_async
+import logging
 import os
 import stripe
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 
+logger = logging.getLogger(__name__)
+
 
 
 class ArtistClassListView(generics.ListAPIView):
@@ -79,10 +86,21 @@ class ArtistClassDetailView(generics.RetrieveAPIView):
 
         return Response(data)
 
+def get_stripe_amount(artist_class):
+    """Class cost in the currency's smallest unit (cents for USD, yen for JPY)."""
+    if artist_class.currency == 'USD':
+        return int(artist_class.cost * 100)
+    return int(artist_class.cost)
+
+
 class ClassSignupView(APIView):
     permission_classes = [IsChild]
 
     def post(self, request, *args, **kwargs):
+        return self.signup(request)
+
+    def signup(self, request):
+        """Sign the member up for a free class, or start (or resume) the payment of a paid one."""
         artist_class_id = request.data.get('artist_class')
 
         if not artist_class_id:
@@ -94,24 +112,7 @@ class ClassSignupView(APIView):
             return Response({"error": "Class not found."}, status=status.HTTP_404_NOT_FOUND)
 
         if artist_class.is_free or (artist_class.cost is None or artist_class.cost == 0):
-            # Possibly just mark it as "SUCCEEDED" or handle differently
-            payment = Payment.objects.create(
-                member=request.user,
-                artist_class=artist_class,
-                amount=0,
-                status=Payment.SUCCEEDED,
-            )
-            
-            serializer = MemberClassSignupSerializer(data=request.data)
-            if serializer.is_valid():
-                signup = serializer.save(member=request.user, status='confirmed')
-                response_data = {
-                    "message": _("Successfully Signed up for the class"),
-                    "data": serializer.data,
-                }
-                return Response(response_data, status=status.HTTP_201_CREATED)
-            else:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return self.signup_for_free_class(request, artist_class)
 
         existing_payment = Payment.objects.filter(
             member=request.user,
@@ -128,10 +129,7 @@ class ClassSignupView(APIView):
                     payment_intent = stripe.PaymentIntent.retrieve(existing_payment.stripe_payment_intent_id)
                     
                     # 通貨に応じて金額を計算
-                    if artist_class.currency == 'USD':
-                        new_amount = int(artist_class.cost * 100)
-                    else:  # JPY
-                        new_amount = int(artist_class.cost)
+                    new_amount = get_stripe_amount(artist_class)
                     
                     # 金額または通貨が変更されている場合
                     amount_changed = payment_intent.amount != new_amount
@@ -140,23 +138,13 @@ class ClassSignupView(APIView):
                     if amount_changed or currency_changed:
                         if currency_changed:
                             # 通貨が変更された場合は新しいPayment Intentを作成
-                            print(f"Currency changed from {payment_intent.currency} to {artist_class.currency}, creating new Payment Intent")
+                            logger.info("Currency changed from %s to %s, creating new Payment Intent", payment_intent.currency, artist_class.currency)
                             
                             # 古いPayment Intentをキャンセル
                             stripe.PaymentIntent.cancel(existing_payment.stripe_payment_intent_id)
                             
                             # 新しいPayment Intentを作成
-                            new_payment_intent = stripe.PaymentIntent.create(
-                                amount=new_amount,
-                                currency=artist_class.currency.lower(),
-                                metadata={
-                                    "payment_type": "artist_class",
-                                    "artist_class_id": str(artist_class_id),
-                                    "member_id": str(request.user.id),
-                                    "artist_class_name": artist_class.name
-                                },
-                                description=f"Payment for artist class: {artist_class.name}",
-                            )
+                            new_payment_intent = stripe.PaymentIntent.create(**self.get_payment_intent_params(request, artist_class))
                             
                             # Payment レコードを更新
                             existing_payment.stripe_payment_intent_id = new_payment_intent.id
@@ -164,7 +152,7 @@ class ClassSignupView(APIView):
                             existing_payment.amount = artist_class.cost
                             existing_payment.save()
                             
-                            print(f"Created new Payment Intent: {new_payment_intent.id}")
+                            logger.info("Created new Payment Intent: %s", new_payment_intent.id)
                         else:
                             # 通貨が同じで金額のみ変更の場合
                             stripe.PaymentIntent.modify(
@@ -174,71 +162,101 @@ class ClassSignupView(APIView):
                             # ローカルのPaymentレコードも更新
                             existing_payment.amount = artist_class.cost
                             existing_payment.save()
-                            print(f"Updated payment intent amount from {payment_intent.amount} to {new_amount}")
+                            logger.info("Updated payment intent amount from %s to %s", payment_intent.amount, new_amount)
                         
                 except stripe.error.StripeError as e:
-                    print(f"Failed to update payment intent: {e}")
+                    logger.warning("Failed to update payment intent: %s", e)
                 
-                return Response({
-                    "payment_intent_client_secret": existing_payment.stripe_payment_intent_secret,
-                    "amount": artist_class.cost,
-                    "currency": artist_class.currency,
-                    "message": _("Payment required. Complete payment to register for the class.")
-                }, status=status.HTTP_200_OK)
+                return self.pending_payment_response(existing_payment, artist_class)
 
         try:
-            #  - For USD: multiply by 100 (decimal -> cents)
-            if artist_class.currency == 'USD':
-                amount_in_smallest_unit = int(artist_class.cost * 100)
-            else:  # JPY
-                amount_in_smallest_unit = int(artist_class.cost)
-            print("in not free artist class")
-
             # Create Stripe Payment Intent
-            payment_intent = stripe.PaymentIntent.create(
-                amount=amount_in_smallest_unit,
-                currency=artist_class.currency.lower(),
-                metadata={
-                    "payment_type": "artist_class",
-                    "artist_class_id": str(artist_class_id),  # Convert to string
-                    "member_id": str(request.user.id),
-                    "artist_class_name": artist_class.name
-                },
-                description=f"Payment for artist class: {artist_class.name}",
-            )
+            payment_intent = stripe.PaymentIntent.create(**self.get_payment_intent_params(request, artist_class))
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Create Payment record
-            payment = Payment.objects.create(
-                member=request.user,
-                artist_class=artist_class,
-                amount=artist_class.cost,
-                stripe_payment_intent_id=payment_intent.id,
-                stripe_payment_intent_secret=payment_intent['client_secret'],
-                status=Payment.PENDING
-            )
+            return self.record_pending_payment(request, artist_class, payment_intent)
+        except stripe.error.StripeError as e:
+            return Response({"errors": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-            # 有料クラスの場合もMemberClassSignupレコードを作成（pending状態）
-            MemberClassSignup.objects.get_or_create(
-                member=request.user,
-                artist_class=artist_class,
-                defaults={'status': MemberClassSignup.PENDING}
-            )
+    def signup_for_free_class(self, request, artist_class):
+        # Possibly just mark it as "SUCCEEDED" or handle differently
+        payment = Payment.objects.create(
+            member=request.user,
+            artist_class=artist_class,
+            amount=0,
+            status=Payment.SUCCEEDED,
+        )
+        
+        serializer = MemberClassSignupSerializer(data=request.data)
+        if serializer.is_valid():
+            signup = serializer.save(member=request.user, status='confirmed')
+            response_data = {
+                "message": _("Successfully Signed up for the class"),
+                "data": serializer.data,
+            }
+            return Response(response_data, status=status.HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def get_payment_intent_params(self, request, artist_class):
+        return {
+            'amount': get_stripe_amount(artist_class),
+            'currency': artist_class.currency.lower(),
+            'metadata': {
+                "payment_type": "artist_class",
+                "artist_class_id": str(artist_class.id),  # Convert to string
+                "member_id": str(request.user.id),
+                "artist_class_name": artist_class.name
+            },
+            'description': f"Payment for artist class: {artist_class.name}",
+        }
 
-            print("payment created::::::::::", payment)
+    def pending_payment_response(self, payment, artist_class):
+        return Response({
+            "payment_intent_client_secret": payment.stripe_payment_intent_secret,
+            "amount": artist_class.cost,
+            "currency": artist_class.currency,
+            "message": _("Payment required. Complete payment to register for the class.")
+        }, status=status.HTTP_200_OK)
+
+    def record_pending_payment(self, request, artist_class, payment_intent):
+        # Create Payment record
+        payment = Payment.objects.create(
+            member=request.user,
+            artist_class=artist_class,
+            amount=artist_class.cost,
+            stripe_payment_intent_id=payment_intent.id,
+            stripe_payment_intent_secret=payment_intent['client_secret'],
+            status=Payment.PENDING
+        )
+
+        # 有料クラスの場合もMemberClassSignupレコードを作成（pending状態）
+        MemberClassSignup.objects.get_or_create(
+            member=request.user,
+            artist_class=artist_class,
+            defaults={'status': MemberClassSignup.PENDING}
+        )
+
+        return Response({
+            "payment_intent_client_secret": payment_intent['client_secret'],
+            "payment_intent_id": payment_intent.id,
+            "amount": artist_class.cost,
+            "currency": artist_class.currency,
+            "signup_id": payment.id,
+            "message": _("Payment required. Complete payment to register for the class.")
+        }, status=status.HTTP_200_OK)
 
-            return Response({
-                "payment_intent_client_secret": payment_intent['client_secret'],
-                "payment_intent_id": payment_intent.id,
-                "amount": artist_class.cost,
-                "currency": artist_class.currency,
-                "signup_id": payment.id,
-                "message": _("Payment required. Complete payment to register for the class.")
-            }, status=status.HTTP_200_OK)
-        except stripe.error.StripeError as e:
-            return Response({"errors": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class AsyncClassSignupView(AsyncAPIView, ClassSignupView):
+    """
+    ClassSignupView for ASGI. The signup runs in the request's thread through
+    sync_to_async, so its Stripe calls do not block the event loop.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        return await sync_to_async(self.signup)(request)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class StripeWebhookView(APIView):
@@ -259,69 +277,11 @@ class StripeWebhookView(APIView):
             # Invalid signature
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        # Handle the event
-        if event['type'] == 'payment_intent.succeeded':
-            payment_intent = event['data']['object']
-            self.handle_payment_intent_succeeded(payment_intent)
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            self.handle_payment_intent_failed(payment_intent)
-
+        # Stored and processed by the Stripe event worker (artist_class/webhooks.py);
+        # redeliveries of the same event are ignored
+        record_stripe_event(payload, StripeEvent.SOURCE_ARTIST_CLASS)
         return Response(status=status.HTTP_200_OK)
 
-    def handle_payment_intent_succeeded(self, payment_intent):
-        intent_id = payment_intent['id']
-        try:
-            payment = Payment.objects.get(stripe_payment_intent_id=intent_id)
-            payment.status = Payment.SUCCEEDED
-            payment.save()
-            
-            artist_class = payment.artist_class
-
-            # Create or update the class signup
-            MemberClassSignup.objects.update_or_create(
-                member=payment.member,
-                artist_class=artist_class,
-                defaults={'status': MemberClassSignup.CONFIRMED}
-            )
-            
-            print(f"Signup updated successfully...")
-            
-            if artist_class.class_type == ArtistClass.REAL_TIME:
-                artist_class = payment.artist_class
-                
-                # Send email with video URL
-                context = {
-                    'class_name': artist_class.name,
-                    'course_link': artist_class.url,
-                }
-                print("context:::", context)
-                send_email(
-                    template_name='emails/artist_class_url.html',
-                    subject=f"{artist_class.name}のクラスリンク",
-                    context=context,
-                    recipient_email=payment.member.parent.email,
-                )
-                print(f"Video link email sent to {payment.member.parent.email}")
-            
-        except Payment.DoesNotExist:
-            print(f"Payment not found for intent: {intent_id}")
-        except Exception as e:
-            print(f"Error updating records: {str(e)}")
-            return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-    def handle_payment_intent_failed(self, payment_intent):
-        intent_id = payment_intent['id']
-        try:
-            payment = Payment.objects.get(stripe_payment_intent_id=intent_id)
-            payment.status = Payment.FAILED
-            payment.save()
-        except Payment.DoesNotExist:
-            print(f"Payment not found for intent: {intent_id}")
-        except Exception as e:
-                print(f"Error updating records: {str(e)}")
-                return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
 class ClassRegistrationStatusView(APIView):
     permission_classes = [IsChild]
 
@@ -441,25 +401,55 @@ class ConfirmPaymentView(APIView):
             if payment_intent['status'] != 'succeeded':
                 return Response({"errors": _("Payment has not succeeded yet.")}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Update Payment record
-            payment.status = 'succeeded'
-            payment.save()
-
-            # Create or update MemberClassSignup record
-            member_signup, created = MemberClassSignup.objects.update_or_create(
-                member=payment.member,
-                artist_class=payment.artist_class,
-                defaults={
-                    'status': MemberClassSignup.CONFIRMED,
-                    'signed_up_at': payment.created_at if not created else None
-                }
-            )
-            
-            if created:
-                print(f"Created new signup record for {payment.member.username}")
-            else:
-                print(f"Updated existing signup record for {payment.member.username}")
+            self.confirm_signup(payment)
+            return Response({"message": _("Payment confirmed and class signup updated successfully.")}, status=status.HTTP_200_OK)
+
+        except Payment.DoesNotExist:
+            return Response({"errors": _("Payment record not found.")}, status=status.HTTP_404_NOT_FOUND)
+        except stripe.error.StripeError as e:
+            return Response({"errors": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        except Exception as e:
+            return Response({"errors": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def confirm_signup(self, payment):
+        # Update Payment record
+        payment.status = 'succeeded'
+        payment.save()
+
+        # Create or update MemberClassSignup record. A new signup gets the
+        # current time (auto_now_add); an existing one the payment date.
+        member_signup, created = MemberClassSignup.objects.update_or_create(
+            member=payment.member,
+            artist_class=payment.artist_class,
+            defaults={
+                'status': MemberClassSignup.CONFIRMED,
+                'signed_up_at': payment.created_at,
+            }
+        )
+        
+        if created:
+            print(f"Created new signup record for {payment.member.username}")
+        else:
+            print(f"Updated existing signup record for {payment.member.username}")
+
+
+class AsyncConfirmPaymentView(AsyncAPIView, ConfirmPaymentView):
+    """ConfirmPaymentView for ASGI: the Stripe lookup is awaited instead of blocking the worker."""
+
+    async def post(self, request, *args, **kwargs):
+        payment_intent_id = request.data.get('payment_intent_id')
+
+        if not payment_intent_id:
+            return Response({"errors": _("Payment Intent ID is required.")}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            payment = await Payment.objects.select_related('member', 'artist_class').aget(stripe_payment_intent_id=payment_intent_id)
+
+            payment_intent = await stripe.PaymentIntent.retrieve_async(payment_intent_id)
+            if payment_intent['status'] != 'succeeded':
+                return Response({"errors": _("Payment has not succeeded yet.")}, status=status.HTTP_400_BAD_REQUEST)
 
+            await sync_to_async(self.confirm_signup)(payment)
             return Response({"message": _("Payment confirmed and class signup updated successfully.")}, status=status.HTTP_200_OK)
 
         except Payment.DoesNotExist:
@@ -0,0 +1,52 @@
+from billing.models import StripeEvent
+from billing.webhooks import webhook_handler
+from member.helpers.emails import send_email
+from .models import ArtistClass, MemberClassSignup, Payment
+
+
+@webhook_handler(StripeEvent.SOURCE_ARTIST_CLASS, 'payment_intent.succeeded')
+def handle_payment_intent_succeeded(payment_intent):
+    intent_id = payment_intent['id']
+    try:
+        payment = Payment.objects.select_related('artist_class', 'member__parent').get(stripe_payment_intent_id=intent_id)
+    except Payment.DoesNotExist:
+        print(f"Payment not found for intent: {intent_id}")
+        return
+
+    payment.status = Payment.SUCCEEDED
+    payment.save()
+
+    artist_class = payment.artist_class
+
+    # Create or update the class signup
+    MemberClassSignup.objects.update_or_create(
+        member=payment.member,
+        artist_class=artist_class,
+        defaults={'status': MemberClassSignup.CONFIRMED}
+    )
+
+    if artist_class.class_type == ArtistClass.REAL_TIME:
+        # Send email with video URL (queued in the outbox)
+        context = {
+            'class_name': artist_class.name,
+            'course_link': artist_class.url,
+        }
+        send_email(
+            template_name='emails/artist_class_url.html',
+            subject=f"{artist_class.name}のクラスリンク",
+            context=context,
+            recipient_email=payment.member.parent.email,
+        )
+
+
+@webhook_handler(StripeEvent.SOURCE_ARTIST_CLASS, 'payment_intent.payment_failed')
+def handle_payment_intent_failed(payment_intent):
+    intent_id = payment_intent['id']
+    try:
+        payment = Payment.objects.get(stripe_payment_intent_id=intent_id)
+    except Payment.DoesNotExist:
+        print(f"Payment not found for intent: {intent_id}")
+        return
+
+    payment.status = Payment.FAILED
+    payment.save()
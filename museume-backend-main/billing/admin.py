@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Plan, Subscription
+from django.utils import timezone
+from .models import Plan, Subscription, StripeEvent
 
 # Register your models here.
 
@@ -9,3 +10,21 @@ class PlanAdmin(admin.ModelAdmin):
     fields = ('name', 'amount', 'currency', 'interval', 'features')
 
 admin.site.register(Subscription)
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'source', 'type', 'ordering_key', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('source', 'status', 'type')
+    search_fields = ('event_id', 'ordering_key')
+    readonly_fields = [field.name for field in StripeEvent._meta.fields]
+    actions = ['retry_events']
+
+    @admin.action(description="Retry selected events")
+    def retry_events(self, request, queryset):
+        queryset.exclude(status=StripeEvent.STATUS_PROCESSED).update(
+            status=StripeEvent.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+
+    def has_add_permission(self, request):
+        return False
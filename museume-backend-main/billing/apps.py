@@ -5,4 +5,7 @@ from django.apps import AppConfig
 class BillingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'billing'
-    verbose_name = _("billing")
\ No newline at end of file
+    verbose_name = _("billing")
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
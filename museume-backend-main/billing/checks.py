@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@checks.register('stripe_worker', deploy=True)
+def check_shared_entitlement_cache(app_configs, **kwargs):
+    """
+    Stripe events are processed by ``manage.py process_stripe_events``, which
+    drops cached entitlements from the default cache. A per-process cache
+    would leave the web workers serving the old subscription. Only a warning
+    with DEBUG, so local runs can use the default LocMem cache.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    message = (
+        "The default cache is local to each process, so entitlement changes made by the "
+        "Stripe event worker are not seen by the web workers."
+    )
+    hint = "Set CACHE_BACKEND to a cache shared by all processes, e.g. django.core.cache.backends.redis.RedisCache."
+    if settings.DEBUG:
+        # Fine for a single local runserver
+        return [checks.Warning(message, hint=hint, id='billing.W001')]
+    return [checks.Error(message, hint=hint, id='billing.E001')]
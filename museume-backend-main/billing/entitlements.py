@@ -0,0 +1,99 @@
+"""
+Effective subscription ("entitlement") of a member.
+
+Children do not have subscriptions of their own; they are covered by their
+parent's. ``get_entitlement`` resolves that once and caches the result:
+
+- per request, on the member instance (``request.user`` is shared by the
+  views and serializers handling the request)
+- across requests, in the default cache under the subscription holder's id,
+  so a parent and all of their children share one entry
+
+The cache entry is dropped whenever a Subscription or Plan changes (see
+billing/signals.py), which covers the Stripe webhook, cancellations and
+admin edits. Webhooks are processed by the process_stripe_events worker,
+so the default cache must be shared between processes; outside DEBUG the
+worker refuses to start with a per-process cache (billing/checks.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Subscription
+
+CACHE_KEY_PREFIX = 'billing:entitlement:'
+MEMO_ATTRIBUTE = '_entitlement'
+
+
+class Entitlement:
+    """Plain, cacheable view of a member's active subscription and plan."""
+
+    def __init__(self, active=False, plan=None):
+        self.active = active
+        self.plan = plan  # dict with the plan fields, or None
+
+    @property
+    def is_premium(self):
+        return bool(self.active and self.plan and self.plan['amount'] > 0)
+
+    @classmethod
+    def from_subscription(cls, subscription):
+        if subscription is None:
+            return cls()
+        plan = subscription.plan
+        return cls(active=True, plan=plan and {
+            'id': plan.id,
+            'name': plan.name,
+            'amount': plan.amount,
+            'currency': plan.currency,
+            'interval': plan.interval,
+            'features': plan.features,
+        })
+
+    def to_cache(self):
+        return {'active': self.active, 'plan': self.plan}
+
+    @classmethod
+    def from_cache(cls, data):
+        return cls(**data)
+
+
+def get_subscription_holder_id(member):
+    """Id of the member whose subscription covers ``member`` (no query)."""
+    if member.role == 'child' and member.parent_id:
+        return member.parent_id
+    return member.pk
+
+
+def get_cache_key(holder_id):
+    return f'{CACHE_KEY_PREFIX}{holder_id}'
+
+
+def get_entitlement(member):
+    """
+    Resolve the effective subscription of a member.
+
+    Returns:
+        Entitlement
+    """
+    entitlement = getattr(member, MEMO_ATTRIBUTE, None)
+    if entitlement is not None:
+        return entitlement
+
+    key = get_cache_key(get_subscription_holder_id(member))
+    data = cache.get(key)
+    if data is not None:
+        entitlement = Entitlement.from_cache(data)
+    else:
+        subscription = Subscription.objects.filter(
+            member_id=get_subscription_holder_id(member), active=True
+        ).select_related('plan').first()
+        entitlement = Entitlement.from_subscription(subscription)
+        cache.set(key, entitlement.to_cache(), getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 300))
+
+    setattr(member, MEMO_ATTRIBUTE, entitlement)
+    return entitlement
+
+
+def invalidate_entitlements(*holder_ids):
+    """Drop cached entitlements of the given subscription holders (parents)."""
+    cache.delete_many([get_cache_key(holder_id) for holder_id in holder_ids if holder_id])
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billing.webhooks import STRIPE_EVENT_BATCH_SIZE, process_stripe_events
+
+
+class Command(BaseCommand):
+    help = 'Process stored Stripe webhook events (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=STRIPE_EVENT_BATCH_SIZE, help='Events processed per transaction')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events instead of exiting when none are due')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        # Entitlements invalidated here must reach the web workers (billing/checks.py)
+        self.check(tags=['stripe_worker'], include_deployment_checks=True)
+        total_processed = total_failed = 0
+        while True:
+            processed, failed, deferred = process_stripe_events(options['batch_size'])
+            total_processed += processed
+            total_failed += failed
+            if processed or failed:
+                self.stdout.write(f"Processed {processed} events, {failed} failed, {deferred} deferred")
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_processed} processed, {total_failed} failed"))
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_add_plans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='event id')),
+                ('source', models.CharField(choices=[('billing', 'Billing'), ('artist_class', 'Artist Class')], max_length=20, verbose_name='source')),
+                ('type', models.CharField(max_length=100, verbose_name='type')),
+                ('ordering_key', models.CharField(blank=True, max_length=255, verbose_name='ordering key')),
+                ('stripe_created', models.PositiveBigIntegerField(default=0, verbose_name='created at Stripe')),
+                ('payload', models.JSONField(verbose_name='payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt at')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='received at')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='processed at')),
+            ],
+            options={
+                'verbose_name': 'Stripe Event',
+                'verbose_name_plural': 'Stripe Events',
+                'ordering': ['stripe_created', 'id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='stripe_event_due_idx'), models.Index(fields=['ordering_key', 'status'], name='stripe_event_key_idx')],
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.utils.translation import gettext_lazy as _
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import stripe
 import os
 
@@ -20,6 +21,7 @@ class Plan(models.Model):
     interval = models.CharField(max_length=10, choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month'), ('year', 'Year')], verbose_name=_("interval"))
     features = models.TextField(help_text=_("Comma-separated list of features"), verbose_name=_("features"))
     currency = models.CharField(max_length=3, choices=CURRENCY_CHOICES, default='USD')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
 
     STRIPE_PRODUCT_ID = os.getenv('STRIPE_PRODUCT_ID')
 
@@ -94,3 +96,54 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f"Subscription for {self.member.username}"
+
+
+class StripeEvent(models.Model):
+    """
+    Raw Stripe webhook event, stored before it is processed.
+
+    The webhook views only verify the signature and insert the event; the
+    unique ``event_id`` turns Stripe retries into no-ops. ``manage.py
+    process_stripe_events`` then runs the handlers in billing/webhooks.py,
+    in order per ``ordering_key`` (subscription or payment intent id).
+    """
+    SOURCE_BILLING = 'billing'
+    SOURCE_ARTIST_CLASS = 'artist_class'
+    SOURCE_CHOICES = [
+        (SOURCE_BILLING, 'Billing'),
+        (SOURCE_ARTIST_CLASS, 'Artist Class'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True, verbose_name=_("event id"))
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name=_("source"))
+    type = models.CharField(max_length=100, verbose_name=_("type"))
+    ordering_key = models.CharField(max_length=255, blank=True, verbose_name=_("ordering key"))
+    stripe_created = models.PositiveBigIntegerField(default=0, verbose_name=_("created at Stripe"))
+    payload = models.JSONField(verbose_name=_("payload"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name=_("status"))
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("attempts"))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_("next attempt at"))
+    last_error = models.TextField(blank=True, verbose_name=_("last error"))
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name=_("received at"))
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name=_("processed at"))
+
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='stripe_event_due_idx'),
+            models.Index(fields=['ordering_key', 'status'], name='stripe_event_key_idx'),
+        ]
+        verbose_name = _("Stripe Event")
+        verbose_name_plural = _("Stripe Events")
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
@@ -0,0 +1,25 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from .entitlements import invalidate_entitlements
+from .models import Plan, Subscription
+
+
+# Invalidate once the change is committed: a request reading the old row
+# before then would otherwise cache it again for the whole TTL
+
+@receiver(post_save, sender=Subscription)
+@receiver(pre_delete, sender=Subscription)
+def invalidate_entitlement_on_subscription_change(sender, instance, **kwargs):
+    transaction.on_commit(partial(invalidate_entitlements, instance.member_id))
+
+
+@receiver(post_save, sender=Plan)
+@receiver(pre_delete, sender=Plan)
+def invalidate_entitlements_on_plan_change(sender, instance, **kwargs):
+    # pre_delete: subscriptions still point at the plan before SET_NULL runs
+    member_ids = list(Subscription.objects.filter(plan=instance).values_list('member_id', flat=True))
+    transaction.on_commit(partial(invalidate_entitlements, *member_ids))
@@ -0,0 +1,173 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from member.models import Member
+from .checks import check_shared_entitlement_cache
+from .entitlements import get_entitlement
+from .models import Plan, StripeEvent, Subscription
+from .webhooks import (
+    HANDLERS, STRIPE_EVENT_MAX_ATTEMPTS, get_retry_delay, process_stripe_events, record_stripe_event,
+)
+
+
+def build_payload(event_id, event_type, data_object, created):
+    return json.dumps({'id': event_id, 'type': event_type, 'created': created, 'data': {'object': data_object}})
+
+
+class StripeEventProcessingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        # bulk_create skips Plan.save(), which creates a Stripe price
+        cls.plan = Plan.objects.bulk_create([
+            Plan(name='Premium', stripe_price_id='price_1', amount=500, interval='month', features='gallery'),
+        ])[0]
+
+    def record(self, event_id, event_type, data_object, created):
+        return record_stripe_event(build_payload(event_id, event_type, data_object, created), StripeEvent.SOURCE_BILLING)
+
+    def make_due(self):
+        StripeEvent.objects.update(next_attempt_at=timezone.now())
+
+    def test_redelivered_events_are_stored_once(self):
+        invoice = {'id': 'in_1', 'subscription': 'sub_1'}
+        self.assertTrue(self.record('evt_1', 'invoice.payment_succeeded', invoice, 100))
+        self.assertFalse(self.record('evt_1', 'invoice.payment_succeeded', invoice, 100))
+
+        event = StripeEvent.objects.get()
+        self.assertEqual(event.ordering_key, 'sub_1')
+        self.assertEqual(event.stripe_created, 100)
+
+    def test_invoice_before_checkout_does_not_block_the_subscription(self):
+        self.record('evt_invoice', 'invoice.payment_succeeded', {'id': 'in_1', 'subscription': 'sub_1'}, 100)
+        self.record('evt_checkout', 'checkout.session.completed', {
+            'id': 'cs_1',
+            'subscription': 'sub_1',
+            'customer': 'cus_1',
+            'customer_email': self.member.email,
+            'metadata': {'plan_id': self.plan.stripe_price_id},
+        }, 101)
+
+        # The invoice waits for the subscription, the checkout goes through
+        self.assertEqual(process_stripe_events(), (1, 0, 1))
+        self.assertTrue(Subscription.objects.filter(stripe_subscription_id='sub_1', member=self.member).exists())
+        invoice_event = StripeEvent.objects.get(event_id='evt_invoice')
+        self.assertEqual(invoice_event.status, StripeEvent.STATUS_PENDING)
+        self.assertGreater(invoice_event.next_attempt_at, timezone.now())
+
+        self.make_due()
+        self.assertEqual(process_stripe_events(), (1, 0, 0))
+        self.assertFalse(StripeEvent.objects.exclude(status=StripeEvent.STATUS_PROCESSED).exists())
+
+    def test_blocked_events_do_not_take_up_the_batch(self):
+        handler = mock.Mock()
+        self.record('evt_1', 'customer.subscription.updated', {'id': 'sub_1', 'status': 'active'}, 100)
+        self.record('evt_2', 'customer.subscription.updated', {'id': 'sub_1', 'status': 'canceled'}, 101)
+        self.record('evt_3', 'customer.subscription.updated', {'id': 'sub_2', 'status': 'active'}, 102)
+        # evt_1 has not been tried and is not due, so evt_2 must wait for it
+        StripeEvent.objects.filter(event_id='evt_1').update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+
+        with mock.patch.dict(HANDLERS, {(StripeEvent.SOURCE_BILLING, 'customer.subscription.updated'): handler}):
+            self.assertEqual(process_stripe_events(batch_size=1), (1, 0, 0))
+            handler.assert_called_once_with({'id': 'sub_2', 'status': 'active'})
+
+            self.make_due()
+            self.assertEqual(process_stripe_events(), (2, 0, 0))
+        self.assertEqual([call.args[0]['status'] for call in handler.call_args_list], ['active', 'active', 'canceled'])
+
+    def test_failed_handlers_are_retried_with_backoff(self):
+        self.assertEqual(get_retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(get_retry_delay(3), timedelta(seconds=120))
+        self.assertEqual(get_retry_delay(20), timedelta(seconds=3600))
+
+        handler = mock.Mock(side_effect=ValueError('boom'))
+        self.record('evt_1', 'invoice.payment_failed', {'id': 'in_1', 'subscription': 'sub_1'}, 100)
+        with mock.patch.dict(HANDLERS, {(StripeEvent.SOURCE_BILLING, 'invoice.payment_failed'): handler}):
+            with self.assertLogs('billing.webhooks', 'ERROR'):
+                self.assertEqual(process_stripe_events(), (0, 1, 0))
+            event = StripeEvent.objects.get()
+            self.assertEqual((event.attempts, event.last_error), (1, 'boom'))
+            self.assertAlmostEqual(
+                (event.next_attempt_at - timezone.now()).total_seconds(), get_retry_delay(1).total_seconds(), delta=5,
+            )
+
+            # Not due yet
+            self.assertEqual(process_stripe_events(), (0, 0, 0))
+
+            StripeEvent.objects.update(attempts=STRIPE_EVENT_MAX_ATTEMPTS - 1)
+            self.make_due()
+            with self.assertLogs('billing.webhooks', 'ERROR'):
+                process_stripe_events()
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.STATUS_FAILED)
+
+
+class EntitlementCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parent = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        cls.child = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child', parent=cls.parent)
+        cls.plan = Plan.objects.bulk_create([
+            Plan(name='Premium', stripe_price_id='price_1', amount=500, interval='month', features='gallery'),
+        ])[0]
+        cls.subscription = Subscription.objects.create(
+            member=cls.parent, plan=cls.plan, stripe_subscription_id='sub_1', stripe_customer_id='cus_1',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh(self, member):
+        # A new request: no per-instance memo
+        return Member.objects.get(pk=member.pk)
+
+    def test_parent_and_children_share_one_cache_entry(self):
+        child = self.fresh(self.child)
+        with self.assertNumQueries(1):
+            self.assertTrue(get_entitlement(child).is_premium)
+            get_entitlement(child)
+
+        parent = self.fresh(self.parent)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_entitlement(parent).plan['name'], 'Premium')
+
+    def test_saving_the_subscription_invalidates_the_entry(self):
+        get_entitlement(self.fresh(self.child))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.active = False
+            self.subscription.save()
+            # Not before the change is committed
+            self.assertTrue(get_entitlement(self.fresh(self.child)).active)
+        child = self.fresh(self.child)
+        with self.assertNumQueries(1):
+            self.assertFalse(get_entitlement(child).active)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subscription.delete()
+            Subscription.objects.create(member=self.parent, plan=None, stripe_subscription_id='sub_2', stripe_customer_id='cus_1')
+        entitlement = get_entitlement(self.fresh(self.child))
+        self.assertTrue(entitlement.active)
+        self.assertFalse(entitlement.is_premium)
+
+    def test_worker_requires_a_shared_cache(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}}
+        with override_settings(CACHES=local, DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_entitlement_cache(None)], ['billing.E001'])
+            with self.assertRaises(SystemCheckError):
+                call_command('process_stripe_events', stdout=StringIO(), stderr=StringIO())
+        with override_settings(CACHES=local, DEBUG=True):
+            self.assertEqual([error.id for error in check_shared_entitlement_cache(None)], ['billing.W001'])
+            call_command('process_stripe_events', stdout=StringIO(), stderr=StringIO())
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_entitlement_cache(None), [])
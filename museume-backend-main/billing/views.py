@@ -1,4 +1,3 @@
-import traceback
 from rest_framework import generics, status
 from .serializers import PlanSerializer
 from rest_framework.views import APIView
@@ -9,22 +8,27 @@ from django.utils.translation import gettext as _
 from django.http import HttpResponse
 from django.contrib.auth import get_user_model
 from django.conf import settings
-from .models import Subscription, Plan
+from .models import Subscription, Plan, StripeEvent
+from .webhooks import record_stripe_event
+from .entitlements import get_entitlement
+from museum_app.async_views import AsyncAPIView
+from museum_app.conditional import ConditionalGetMixin
 from dotenv import load_dotenv
 import stripe
 import os
 try:
-    from work.models import Image
+    from work.models import Image, MemberQuota
 except ImportError:
     # Fallback if work app is not available
     Image = None
+    MemberQuota = None
 
 load_dotenv()
 stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
 Member = get_user_model()
 
 # List all available subscription plans
-class PlanListView(generics.ListAPIView):
+class PlanListView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Plan.objects.all()
     serializer_class = PlanSerializer
 
@@ -33,23 +37,13 @@ class SubscriptionStatusView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
-        # Check parent's subscription if user is a child
-        if request.user.role == 'child' and request.user.parent:
-            subscription = Subscription.objects.filter(member=request.user.parent, active=True).first()
-        else:
-            subscription = Subscription.objects.filter(member=request.user, active=True).first()
+        # Parent's subscription if user is a child (cached, see billing/entitlements.py)
+        entitlement = get_entitlement(request.user)
         
-        if subscription:
+        if entitlement.active:
             return Response({
                 'active': True,
-                'plan': {
-                    'id': subscription.plan.id,
-                    'name': subscription.plan.name,
-                    'amount': subscription.plan.amount,
-                    'currency': subscription.plan.currency,
-                    'interval': subscription.plan.interval,
-                    'features': subscription.plan.features,
-                }
+                'plan': entitlement.plan,
             })
         return Response({'active': False})
 
@@ -69,20 +63,44 @@ class CreateCheckoutSessionView(APIView):
         plan = Plan.objects.get(id=plan_id)
 
         try:
-            checkout_session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[
-                    {
-                        'price': plan.stripe_price_id,
-                        'quantity': 1,
-                    },
-                ],
-                mode='subscription',
-                success_url=os.getenv('STRIPE_SUCCESS_URL'),
-                cancel_url=os.getenv('STRIPE_CANCELLED_URL'),
-                customer_email=request.user.email,
-                metadata={'plan_id': plan.stripe_price_id}
+            checkout_session = stripe.checkout.Session.create(**self.get_checkout_session_params(request, plan))
+            return Response({'url': checkout_session.url})
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def get_checkout_session_params(self, request, plan):
+        return {
+            'payment_method_types': ['card'],
+            'line_items': [
+                {
+                    'price': plan.stripe_price_id,
+                    'quantity': 1,
+                },
+            ],
+            'mode': 'subscription',
+            'success_url': os.getenv('STRIPE_SUCCESS_URL'),
+            'cancel_url': os.getenv('STRIPE_CANCELLED_URL'),
+            'customer_email': request.user.email,
+            'metadata': {'plan_id': plan.stripe_price_id},
+        }
+
+
+class AsyncCreateCheckoutSessionView(AsyncAPIView, CreateCheckoutSessionView):
+    """CreateCheckoutSessionView for ASGI: the Stripe call is awaited instead of blocking the worker."""
+
+    async def post(self, request, *args, **kwargs):
+
+        if request.user.role != 'protector':
+            return Response(
+                {'error': 'Only Protectors can create a payment session.'},
+                status=status.HTTP_403_FORBIDDEN
             )
+
+        plan_id = request.data.get('planId')
+        plan = await Plan.objects.aget(id=plan_id)
+
+        try:
+            checkout_session = await stripe.checkout.Session.create_async(**self.get_checkout_session_params(request, plan))
             return Response({'url': checkout_session.url})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -115,11 +133,8 @@ class CancelSubscriptionView(APIView):
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
-    print(payload)
-    sig_header = request.META['HTTP_STRIPE_SIGNATURE']
-    event = None
+    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
     stripe_webhook_secret=os.getenv('STRIPE_WEBHOOK_SECRET')
-    print("stripe webhook secret:::::::", stripe_webhook_secret)
     try:
         event = stripe.Webhook.construct_event(
             payload, sig_header, stripe_webhook_secret,#settings.STRIPE_WEBHOOK_SECRET
@@ -129,76 +144,10 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError as e:
         return HttpResponse(status=status.HTTP_400_BAD_REQUEST)
 
-    print(f"EVENT: {event['type']}, {event['id']}")
-    try:
-        if event['type'] == 'checkout.session.completed':
-            session = event['data']['object']
-            customer_email = session['customer_email']
-            member = Member.objects.get(email=customer_email, role='protector')
-            stripe_customer_id = session['customer']
-            print("stripe cust id::", stripe_customer_id)
-            stripe_subscription_id = session['subscription']
-            plan_id = session['metadata']['plan_id']
-            plan = Plan.objects.get(stripe_price_id=plan_id)
-
-            member_subscription = Subscription.objects.filter(member=member).first()
-            if member_subscription:
-                member_subscription.stripe_customer_id = stripe_customer_id
-                member_subscription.stripe_subscription_id = stripe_subscription_id
-                member_subscription.plan = plan
-                member_subscription.active = True
-                member_subscription.save()
-            else:
-                Subscription.objects.create(
-                    member=member,
-                    stripe_customer_id=stripe_customer_id,
-                    stripe_subscription_id=stripe_subscription_id,
-                    plan=plan,
-                    active=True
-                )
-            member.save()
-
-        elif event['type'] == 'invoice.payment_succeeded':
-            invoice = event['data']['object']
-            stripe_subscription_id = invoice['subscription']
-            subscription = Subscription.objects.filter(stripe_subscription_id=stripe_subscription_id).first()
-            subscription.active = True
-            subscription.save()
-            
-            plan = subscription.plan
-            member = subscription.member
-            member.save()
-
-        elif event['type'] == 'invoice.payment_failed':
-            invoice = event['data']['object']
-            stripe_subscription_id = invoice['subscription']
-            subscription = Subscription.objects.get(stripe_subscription_id=stripe_subscription_id)
-            subscription.active = False
-            subscription.save()
-
-        elif event['type'] == 'customer.subscription.deleted':
-            subscription = event['data']['object']
-            stripe_subscription_id = subscription['id']
-            sub = Subscription.objects.get(stripe_subscription_id=stripe_subscription_id)
-            sub.active = False
-            sub.save()
-
-        elif event['type'] == 'customer.subscription.updated':
-            subscription = event['data']['object']
-            stripe_subscription_id = subscription['id']
-            sub = Subscription.objects.get(stripe_subscription_id=stripe_subscription_id)
-            if subscription['status'] == 'active':
-                sub.active = True
-            else:
-                sub.active = False
-            sub.save()
-
-        return HttpResponse(status=status.HTTP_200_OK)
-    except Exception as e:
-        print(f"EVENT: {event}")
-        print(f"Error: {e}")
-        traceback.print_exc()
-        return HttpResponse(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    # Stored and processed by the Stripe event worker (billing/webhooks.py);
+    # redeliveries of the same event are ignored
+    record_stripe_event(payload, StripeEvent.SOURCE_BILLING)
+    return HttpResponse(status=status.HTTP_200_OK)
 
 # Get user's total image count for subscription limit checking
 class UserImageCountView(APIView):
@@ -217,31 +166,21 @@ class UserImageCountView(APIView):
                     'error': 'Image counting not available'
                 })
             
-            # Count total images uploaded by the user
-            print(f"Counting images for user: {request.user.username} (role: {request.user.role})")
-            total_images = Image.objects.filter(work__member=request.user).count()
-            print(f"Total images found: {total_images}")
-            
-            # Get subscription status - check parent's subscription if user is a child
-            if request.user.role == 'child' and request.user.parent:
-                subscription = Subscription.objects.filter(member=request.user.parent, active=True).first()
-                print(f"Child user - checking parent's subscription: {request.user.parent.email}")
-            else:
-                subscription = Subscription.objects.filter(member=request.user, active=True).first()
+            # Usage counters and subscription status (parent's subscription for children)
+            usage = MemberQuota.usage(request.user)
+            total_images = usage['image_count']
             
             response_data = {
                 'total_images': total_images,
-                'subscription_active': bool(subscription),
-                'is_premium': subscription and subscription.plan.amount > 0 if subscription else False,
-                'limit_reached': False
+                'subscription_active': usage['subscription_active'],
+                'is_premium': usage['is_premium'],
+                'limit_reached': False,
+                'max_images': usage['image_limit'],  # None = unlimited for premium
             }
             
             # Check if free user has reached limit
-            if not subscription or subscription.plan.amount == 0:
-                response_data['limit_reached'] = total_images >= 50
-                response_data['max_images'] = 50
-            else:
-                response_data['max_images'] = None  # Unlimited for premium
+            if usage['image_limit'] is not None:
+                response_data['limit_reached'] = total_images >= usage['image_limit']
             
             return Response(response_data)
         except Exception as e:
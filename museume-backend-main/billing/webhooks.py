@@ -0,0 +1,223 @@
+"""
+Stripe webhook ingestion and processing.
+
+The webhook views verify the signature, store the event with
+``record_stripe_event`` and answer 200 right away. Duplicate deliveries hit
+the unique ``StripeEvent.event_id`` and are ignored.
+
+``process_stripe_events`` (run by ``manage.py process_stripe_events``) then
+calls the handler registered for the event's source and type. Events that
+share an ordering key (subscription or payment intent id) are processed in
+the order Stripe created them: while an earlier event for the same key has
+not been tried yet, later ones are deferred (and not claimed at all if the
+earlier one is not due, so they do not take up the batch). Once an event has been tried it no longer holds back its
+key, so one failing event cannot block a subscription. Failed handlers are
+retried with exponential backoff.
+
+Handlers raise ``EventNotReady`` when the event refers to an object that an
+event Stripe may deliver later creates, e.g. an invoice that arrives before
+the checkout session of its subscription. Such events are retried with the
+same backoff but logged quietly and counted as deferred.
+
+Handlers receive ``event['data']['object']`` as a dict and are registered
+with the ``webhook_handler`` decorator; artist class handlers live in
+artist_class/webhooks.py.
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Plan, StripeEvent, Subscription
+
+logger = logging.getLogger(__name__)
+Member = get_user_model()
+
+STRIPE_EVENT_BATCH_SIZE = getattr(settings, 'STRIPE_EVENT_BATCH_SIZE', 50)
+STRIPE_EVENT_MAX_ATTEMPTS = getattr(settings, 'STRIPE_EVENT_MAX_ATTEMPTS', 8)
+STRIPE_EVENT_RETRY_DELAY = getattr(settings, 'STRIPE_EVENT_RETRY_DELAY', 30)
+STRIPE_EVENT_MAX_RETRY_DELAY = getattr(settings, 'STRIPE_EVENT_MAX_RETRY_DELAY', 3600)
+
+# (source, event type) -> handler(data_object)
+HANDLERS = {}
+
+
+class EventNotReady(Exception):
+    """The event depends on an object that has not been created yet."""
+
+
+def webhook_handler(source, *event_types):
+    """Register a function as the handler of the given Stripe event types."""
+    def decorator(func):
+        for event_type in event_types:
+            HANDLERS[(source, event_type)] = func
+        return func
+    return decorator
+
+
+def get_ordering_key(event):
+    """Subscription or payment intent the event belongs to (its object id otherwise)."""
+    data_object = event['data']['object']
+    for field in ('subscription', 'payment_intent'):
+        value = data_object.get(field)
+        if isinstance(value, str) and value:
+            return value
+    return data_object.get('id') or ''
+
+
+def record_stripe_event(payload, source):
+    """
+    Persist a verified webhook payload.
+
+    Args:
+        payload: Raw request body (already verified with stripe.Webhook.construct_event)
+        source: StripeEvent.SOURCE_* of the endpoint that received it
+
+    Returns:
+        bool: False if the event had already been received
+    """
+    event = json.loads(payload)
+    _, created = StripeEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={
+            'source': source,
+            'type': event['type'],
+            'ordering_key': get_ordering_key(event),
+            'stripe_created': event.get('created') or 0,
+            'payload': event,
+        },
+    )
+    return created
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(STRIPE_EVENT_RETRY_DELAY * 2 ** max(attempts - 1, 0), STRIPE_EVENT_MAX_RETRY_DELAY))
+
+
+def get_earlier_untried_events(ordering_key, stripe_created, pk):
+    """Events with the same ordering key that come first and have not been tried yet."""
+    return StripeEvent.objects.filter(
+        ordering_key=ordering_key,
+        status=StripeEvent.STATUS_PENDING,
+        attempts=0,
+    ).exclude(ordering_key='').filter(
+        Q(stripe_created__lt=stripe_created) |
+        Q(stripe_created=stripe_created, id__lt=pk)
+    )
+
+
+def has_earlier_pending_event(event):
+    if not event.ordering_key:
+        return False
+    return get_earlier_untried_events(event.ordering_key, event.stripe_created, event.id).exists()
+
+
+def process_stripe_events(batch_size=STRIPE_EVENT_BATCH_SIZE):
+    """
+    Process one batch of due events.
+
+    Returns:
+        tuple: (processed, failed, deferred) counts for the batch
+    """
+    processed = failed = deferred = 0
+    now = timezone.now()
+    with transaction.atomic():
+        # Earlier events that are due come first in the batch; events waiting
+        # for one that is not due would only be claimed to be deferred
+        blocked = get_earlier_untried_events(
+            OuterRef('ordering_key'), OuterRef('stripe_created'), OuterRef('pk'),
+        ).filter(next_attempt_at__gt=now)
+        batch = list(
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=StripeEvent.STATUS_PENDING, next_attempt_at__lte=now)
+            .filter(~Exists(blocked))
+            .order_by('stripe_created', 'id')[:batch_size]
+        )
+        for event in batch:
+            # The earlier event may be claimed by another worker
+            if has_earlier_pending_event(event):
+                deferred += 1
+                continue
+
+            handler = HANDLERS.get((event.source, event.type))
+            event.attempts += 1
+            try:
+                if handler is not None:
+                    with transaction.atomic():
+                        handler(event.payload['data']['object'])
+            except Exception as e:
+                if isinstance(e, EventNotReady):
+                    logger.info("Stripe event %s (%s) is not ready: %s", event.event_id, event.type, e)
+                    deferred += 1
+                else:
+                    logger.exception("Failed to process Stripe event %s (%s)", event.event_id, event.type)
+                    failed += 1
+                event.last_error = str(e)
+                if event.attempts >= STRIPE_EVENT_MAX_ATTEMPTS:
+                    event.status = StripeEvent.STATUS_FAILED
+                else:
+                    event.next_attempt_at = timezone.now() + get_retry_delay(event.attempts)
+            else:
+                processed += 1
+                event.status = StripeEvent.STATUS_PROCESSED
+                event.processed_at = timezone.now()
+                event.last_error = ''
+            event.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'processed_at'])
+    return processed, failed, deferred
+
+
+def get_subscription(stripe_subscription_id):
+    try:
+        return Subscription.objects.get(stripe_subscription_id=stripe_subscription_id)
+    except Subscription.DoesNotExist:
+        # Its checkout.session.completed event has not been processed yet
+        raise EventNotReady(f"Subscription {stripe_subscription_id} does not exist yet")
+
+
+@webhook_handler(StripeEvent.SOURCE_BILLING, 'checkout.session.completed')
+def handle_checkout_session_completed(session):
+    member = Member.objects.get(email=session['customer_email'], role='protector')
+    plan = Plan.objects.get(stripe_price_id=session['metadata']['plan_id'])
+
+    Subscription.objects.update_or_create(
+        member=member,
+        defaults={
+            'stripe_customer_id': session['customer'],
+            'stripe_subscription_id': session['subscription'],
+            'plan': plan,
+            'active': True,
+        },
+    )
+
+
+@webhook_handler(StripeEvent.SOURCE_BILLING, 'invoice.payment_succeeded')
+def handle_invoice_payment_succeeded(invoice):
+    subscription = get_subscription(invoice['subscription'])
+    subscription.active = True
+    subscription.save()
+
+
+@webhook_handler(StripeEvent.SOURCE_BILLING, 'invoice.payment_failed')
+def handle_invoice_payment_failed(invoice):
+    subscription = get_subscription(invoice['subscription'])
+    subscription.active = False
+    subscription.save()
+
+
+@webhook_handler(StripeEvent.SOURCE_BILLING, 'customer.subscription.deleted')
+def handle_subscription_deleted(stripe_subscription):
+    subscription = get_subscription(stripe_subscription['id'])
+    subscription.active = False
+    subscription.save()
+
+
+@webhook_handler(StripeEvent.SOURCE_BILLING, 'customer.subscription.updated')
+def handle_subscription_updated(stripe_subscription):
+    subscription = get_subscription(stripe_subscription['id'])
+    subscription.active = stripe_subscription['status'] == 'active'
+    subscription.save()
@@ -21,6 +21,7 @@ class ContestApplicationInline(admin.TabularInline):
         'work_link',
         'work_images',
         'description',
+        'like_count',
         'mark_as_winner_button',
     )
     fields = (
@@ -28,6 +29,7 @@ class ContestApplicationInline(admin.TabularInline):
         'work_link',
         'work_images',
         'description',
+        'like_count',
         'mark_as_winner_button',
     )
 
@@ -5,4 +5,7 @@ from django.apps import AppConfig
 class ContestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contest'
-    verbose_name = _("contest")
\ No newline at end of file
+    verbose_name = _("contest")
+
+    def ready(self):
+        from . import signals  # noqa: F401
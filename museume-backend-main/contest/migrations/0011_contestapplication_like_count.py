@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_like_count(apps, schema_editor):
+    ContestApplication = apps.get_model('contest', 'ContestApplication')
+    Work = apps.get_model('work', 'Work')
+    ContestApplication.objects.update(
+        like_count=Subquery(Work.objects.filter(pk=OuterRef('work_id')).values('like_count')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contest', '0010_alter_contest_options_and_more'),
+        ('work', '0011_memberquota'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contestapplication',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='like count'),
+        ),
+        migrations.AddIndex(
+            model_name='contestapplication',
+            index=models.Index(fields=['contest', '-like_count', 'submission_date'], name='contest_leaderboard_idx'),
+        ),
+        migrations.RunPython(backfill_like_count, reverse_code=migrations.RunPython.noop),
+    ]
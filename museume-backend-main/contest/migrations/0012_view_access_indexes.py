@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contest', '0011_contestapplication_like_count'),
+        ('member', '0024_organizationclosure'),
+        ('work', '0015_view_access_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contest',
+            index=models.Index(fields=['-created_at', '-id'], name='contest_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contestapplication',
+            index=models.Index(fields=['member', 'contest'], name='contest_app_member_idx'),
+        ),
+    ]
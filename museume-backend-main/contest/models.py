@@ -37,22 +37,33 @@ class Contest(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='contest_recent_idx'),
+        ]
         verbose_name = _("Contest")
         verbose_name_plural = _("Contests")
     
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
     
+    def get_leaderboard(self, limit=10):
+        """
+        Top applications by like tally (earliest submission wins ties).
+
+        Served by the (contest, like_count, submission_date) index.
+        """
+        return self.applications.order_by('-like_count', 'submission_date', 'id')[:limit]
+
     def determine_winner_by_likes(self):
         """
         Automatically select the winner based on the work with the most likes.
         """
-        from django.db.models import Max
-        max_likes_work = self.applications.aggregate(max_likes=Max('work__likes'))
-        if max_likes_work['max_likes']:
-            self.winner = self.applications.filter(work__likes=max_likes_work['max_likes']).first().work
-            self.save()
-            
+        top_application = self.get_leaderboard(limit=1).first()
+        if top_application and top_application.like_count > 0:
+            self.winner_id = top_application.work_id
+            self.save(update_fields=['winner', 'updated_at'])
+        return self.winner
+
 
 class ContestApplication(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='applications', verbose_name=_("member"))
@@ -60,9 +71,17 @@ class ContestApplication(models.Model):
     work = models.ForeignKey(Work, on_delete=models.CASCADE, related_name='applications', verbose_name=_("work"))
     submission_date = models.DateTimeField(auto_now_add=True, verbose_name=_("submission date"))
     description = models.TextField(blank=True, null=True, verbose_name=_("description"))
+    # Likes of the work counted for this contest; kept up to date by
+    # contest/signals.py until the contest ends
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("like count"))
 
     class Meta:
         unique_together = ('contest', 'work') 
+        indexes = [
+            models.Index(fields=['contest', '-like_count', 'submission_date'], name='contest_leaderboard_idx'),
+            # A member's applications, alone (my contests) or per contest (entry history)
+            models.Index(fields=['member', 'contest'], name='contest_app_member_idx'),
+        ]
         verbose_name = _("Application")
         verbose_name_plural = _("Applications")
 
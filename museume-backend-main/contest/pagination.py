@@ -1,4 +1,9 @@
 from rest_framework.pagination import PageNumberPagination
+from museum_app.pagination import KeysetOrPageNumberPagination
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 10
+
+class CustomCursorPagination(KeysetOrPageNumberPagination):
+    """Cursor pagination on (created_at, id); ?page= keeps page numbers."""
+    page_size = 10
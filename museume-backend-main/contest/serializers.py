@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import Contest, ContestApplication
 from member.serializers import OrganizationSerializer
-from work.serializers import ImageSerializer
+from work.serializers import ImageSerializer, build_image_url
 from django.utils.translation import gettext as _
 
 class ContestSerializer(serializers.ModelSerializer):
@@ -17,7 +17,10 @@ class ContestSerializer(serializers.ModelSerializer):
         Return all contest applications for the current user for the given contest.
         """
         member = self.context.get('request').user
-        if member and not member.is_anonymous:
+        if hasattr(obj, 'member_applications'):
+            # Prefetched by the views (see contest/views.py with_entry_history)
+            contest_applications = obj.member_applications
+        elif member and not member.is_anonymous:
             contest_applications = ContestApplication.objects.filter(contest=obj, member=member)
         else:
             contest_applications = []
@@ -37,22 +40,24 @@ class ContestApplicationSerializer(serializers.ModelSerializer):
         """
         Return only the first image for the work if it exists.
         """
-        first_image = obj.work.images.first()
+        if 'images' in getattr(obj.work, '_prefetched_objects_cache', {}):
+            # Prefetched in id order, so the first entry matches images.first()
+            images = obj.work.images.all()
+            first_image = images[0] if images else None
+        else:
+            first_image = obj.work.images.first()
         if first_image:
-            request = self.context.get('request')
-            if request:
-                url = request.build_absolute_uri(first_image.image.url)
-                # Force HTTPS in production
-                if url.startswith('http://') and (
-                    'museume.art' in url or 
-                    request.get_host() in ['museume.art', 'www.museume.art']
-                ):
-                    url = url.replace('http://', 'https://')
-                return url
-            else:
-                return first_image.image.url
+            return build_image_url(self.context.get('request'), first_image.image)
         return None
 
+class ContestLeaderboardEntrySerializer(ContestApplicationSerializer):
+    rank = serializers.IntegerField(read_only=True)
+    member_id = serializers.IntegerField(read_only=True)
+    username = serializers.CharField(source='member.username', read_only=True)
+
+    class Meta(ContestApplicationSerializer.Meta):
+        fields = ['rank', 'id', 'work_id', 'title', 'image', 'member_id', 'username', 'like_count', 'submission_date']
+
 class SubmitWorkSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContestApplication
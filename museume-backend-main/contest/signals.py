@@ -0,0 +1,31 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from work.models import Like, Work
+from .models import ContestApplication
+
+
+@receiver(pre_save, sender=ContestApplication)
+def start_tally_from_current_likes(sender, instance, raw=False, **kwargs):
+    if raw or not instance._state.adding:
+        return
+    instance.like_count = Work.objects.filter(pk=instance.work_id).values_list('like_count', flat=True).first() or 0
+
+
+def _open_applications(work_id):
+    # Tallies freeze once a contest has ended
+    return ContestApplication.objects.filter(work_id=work_id, contest__end_date__gte=timezone.now())
+
+
+@receiver(post_save, sender=Like)
+def count_like_in_contests(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    _open_applications(instance.work_id).update(like_count=F('like_count') + 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like_in_contests(sender, instance, **kwargs):
+    _open_applications(instance.work_id).filter(like_count__gt=0).update(like_count=F('like_count') - 1)
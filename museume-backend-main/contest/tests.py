@@ -1,3 +1,211 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.test import APITestCase
+
+from member.models import Member, Organization
+from museum_app.middleware import QueryBudgetExceeded
+from museum_app.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from work.models import Image, Like, Work
+from .models import Contest, ContestApplication
+from .pagination import CustomCursorPagination
+from .views import ContestListView, MyContestsView
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image_file(name, color):
+    buffer = BytesIO()
+    PILImage.new('RGB', (8, 8), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class ContestQueryCountTests(QueryBudgetTestMixin, APITestCase):
+    """The contest list/detail endpoints must not issue queries per contest or application."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name='Org', email='org@example.com', username='org', staff_name='Staff',
+            address='Address', city='City', country='Country',
+        )
+        cls.member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        cls.member.organizations.add(cls.organization)
+
+        now = timezone.now()
+        cls.contests = [
+            Contest.objects.create(
+                organization=cls.organization, name=f'Contest {i}', explanation='-',
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            )
+            for i in range(15)
+        ]
+        for i, contest in enumerate(cls.contests):
+            work = Work.objects.create(title=f'Work {i}', member=cls.member)
+            for j in range(2):
+                Image.objects.create(work=work, image=make_image_file(f'{i}_{j}.png', (i, j, 0)))
+            ContestApplication.objects.create(member=cls.member, contest=contest, work=work)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.member)
+
+    def test_contest_list_query_count(self):
+        # contests + organizations, applications + works, images
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/contests/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), CustomCursorPagination.page_size)
+        for contest in response.data['results']:
+            self.assertEqual(len(contest['entry_history']), 1)
+            self.assertIsNotNone(contest['entry_history'][0]['image'])
+            self.assertEqual(contest['organization']['name'], 'Org')
+
+    def test_contest_detail_query_count(self):
+        contest = self.contests[0]
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/contests/{contest.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        first_image = Image.objects.filter(work__applications__contest=contest).order_by('id').first()
+        self.assertTrue(response.data['entry_history'][0]['image'].endswith(first_image.image.url))
+
+    def test_contest_list_reports_server_timing(self):
+        response = self.client.get('/api/contests/')
+
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="3 queries"$')
+
+    def test_contest_list_over_budget_fails(self):
+        with mock.patch.object(ContestListView, 'query_budget', 2):
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs('museum_app.querybudget', 'WARNING'):
+                self.client.get('/api/contests/')
+
+    def test_contest_leaderboard_query_budget(self):
+        with self.assertQueryBudget(4):
+            response = self.client.get(f'/api/contests/{self.contests[0].id}/leaderboard/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+@skipUnless(connection.vendor == 'mysql', 'Query plans are checked on MySQL')
+class ContestQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The contest queries in contest/views.py are served by indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name='Org', email='org@example.com', username='org', staff_name='Staff',
+            address='Address', city='City', country='Country',
+        )
+        cls.members = [
+            Member.objects.create_user(username=f'child{i}', email=f'child{i}@example.com', password='x', role='child')
+            for i in range(4)
+        ]
+        cls.members[0].organizations.add(cls.organization)
+
+        now = timezone.now()
+        Contest.objects.bulk_create([
+            Contest(
+                organization=cls.organization, name=f'Contest {i}', explanation='-', is_private=i % 4 == 0,
+                start_date=now - timedelta(days=1), end_date=now + timedelta(days=1),
+            )
+            for i in range(100)
+        ])
+        Work.objects.bulk_create([Work(title=f'Work {i}', member=cls.members[i % 4]) for i in range(400)])
+        # MySQL does not return primary keys from bulk_create
+        contests = list(Contest.objects.order_by('id'))
+        ContestApplication.objects.bulk_create([
+            ContestApplication(member_id=work.member_id, contest=contests[i % 100], work=work)
+            for i, work in enumerate(Work.objects.order_by('id'))
+        ])
+
+    def get_queryset(self, view_class, member):
+        request = RequestFactory().get('/')
+        request.user = member
+        view = view_class()
+        view.setup(request)
+        return view.get_queryset()
+
+    def test_contest_list(self):
+        for member in [self.members[0], AnonymousUser()]:
+            self.assertIndexedPlan(self.get_queryset(ContestListView, member).order_by('-created_at', '-id')[:16])
+
+    def test_member_applications(self):
+        contest_ids = list(Contest.objects.values_list('id', flat=True)[:16])
+        applications = ContestApplication.objects.filter(member=self.members[0], contest__in=contest_ids).order_by('id')
+        # Sorting is bounded by the member's applications to one page of contests
+        self.assertIndexedPlan(applications, allow_filesort=True)
+        self.assertIndexedPlan(self.get_queryset(MyContestsView, self.members[0])[:15], allow_filesort=True)
+
+
+class ContestLikeTallyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(
+            name='Org', username='org', email='org@example.com', staff_name='Staff',
+            address='Address', city='City', country='Country',
+        )
+        cls.artist = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        cls.fans = [
+            Member.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='x', role='child')
+            for i in range(3)
+        ]
+        cls.work = Work.objects.create(title='Work', member=cls.artist, is_public=True, public_visibility='public')
+        now = timezone.now()
+        cls.contest = Contest.objects.create(
+            organization=cls.organization, name='Contest', explanation='-',
+            start_date=now - timedelta(days=1), end_date=now + timedelta(days=1), award_condition='likes',
+        )
+
+    def apply(self):
+        return ContestApplication.objects.create(member=self.artist, contest=self.contest, work=self.work)
+
+    def get_tally(self, application):
+        return ContestApplication.objects.values_list('like_count', flat=True).get(pk=application.pk)
+
+    def test_tally_starts_from_the_likes_of_the_work(self):
+        Like.objects.create(member=self.fans[0], work=self.work)
+        application = self.apply()
+        self.assertEqual(self.get_tally(application), 1)
+
+    def test_likes_are_counted_and_uncounted(self):
+        application = self.apply()
+        for fan in self.fans:
+            Like.objects.create(member=fan, work=self.work)
+        self.assertEqual(self.get_tally(application), 3)
+
+        Like.objects.get(member=self.fans[0]).delete()
+        self.assertEqual(self.get_tally(application), 2)
+
+        # Deleting a member deletes their likes
+        self.fans[1].delete()
+        self.assertEqual(self.get_tally(application), 1)
+
+        self.assertEqual(self.contest.determine_winner_by_likes(), self.work)
+
+    def test_tally_is_frozen_once_the_contest_has_ended(self):
+        application = self.apply()
+        Like.objects.create(member=self.fans[0], work=self.work)
+        Contest.objects.filter(pk=self.contest.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+
+        Like.objects.create(member=self.fans[1], work=self.work)
+        Like.objects.get(member=self.fans[0]).delete()
+        self.assertEqual(self.get_tally(application), 1)
+        self.assertEqual(Work.objects.values_list('like_count', flat=True).get(pk=self.work.pk), 1)
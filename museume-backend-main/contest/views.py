@@ -3,15 +3,41 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
 from .filters import ContestFilter
 from .models import Contest, ContestApplication
-from .serializers import ContestSerializer, ContestApplicationSerializer, SubmitWorkSerializer
-from .pagination import CustomPageNumberPagination
+from .serializers import ContestSerializer, ContestApplicationSerializer, ContestLeaderboardEntrySerializer, SubmitWorkSerializer
+from .pagination import CustomPageNumberPagination, CustomCursorPagination
 from museum_app.permissions import IsChild
-from django.db.models import Q
+from member.helpers.viewer import get_viewer
+from django.db.models import Prefetch, Q
+from work.models import Image
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
 from rest_framework.response import Response
 from django.utils.translation import gettext as _
 
+def first_images_prefetch(lookup='work__images'):
+    """Prefetch work images in id order so the first one needs no extra query."""
+    return Prefetch(lookup, queryset=Image.objects.order_by('id'))
+
+
+def with_entry_history(queryset, member):
+    """
+    Load everything ContestSerializer needs in a fixed number of queries:
+    the organization (joined) and the requesting member's applications with
+    their works and images (two prefetch queries), stored as
+    ``member_applications``.
+    """
+    queryset = queryset.select_related('organization')
+    if member and not member.is_anonymous:
+        queryset = queryset.prefetch_related(Prefetch(
+            'applications',
+            queryset=ContestApplication.objects.filter(member=member).select_related('work').prefetch_related(
+                first_images_prefetch()
+            ).order_by('id'),
+            to_attr='member_applications',
+        ))
+    return queryset
+
+
 class ContestListView(generics.ListAPIView):
     # permission_classes = [IsChild]
     queryset = Contest.objects.all()
@@ -19,7 +45,9 @@ class ContestListView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_class = ContestFilter
     search_fields = ['name']
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CustomCursorPagination
+    # authentication, contests, applications, images
+    query_budget = 4
 
     def get_queryset(self):
         if self.request.user and not self.request.user.is_anonymous:
@@ -32,21 +60,24 @@ class ContestListView(generics.ListAPIView):
         else:
             queryset = Contest.objects.filter(is_private=False)
 
-        return queryset
+        return with_entry_history(queryset, self.request.user)
     
 class ContestDetailView(generics.RetrieveAPIView):
     # permission_classes = [IsChild]
     serializer_class = ContestSerializer
+    # authentication, contest, membership check, applications, images
+    query_budget = 5
+
+    def get_queryset(self):
+        return with_entry_history(Contest.objects.all(), self.request.user)
 
     def get_object(self):
         contest_id = self.kwargs['contest_id']
-        contest = get_object_or_404(Contest, id=contest_id)
+        contest = get_object_or_404(self.get_queryset(), id=contest_id)
         
         member = self.request.user
         if member and not member.is_anonymous:
-            member_organizations = member.organizations.all()
-
-            if contest.is_private and not member_organizations.filter(id=contest.organization.id).exists():
+            if contest.is_private and contest.organization_id not in get_viewer(self.request).organization_ids:
                 raise PermissionDenied(_("You do not have permission to view this contest."))
         else:
             if contest.is_private:
@@ -59,6 +90,50 @@ class ContestDetailView(generics.RetrieveAPIView):
         serializer = self.get_serializer(contest)
         return Response(serializer.data)
 
+class ContestLeaderboardView(ContestDetailView):
+    """
+    Top-N applications of a contest ranked by like tally.
+
+    Query params:
+        limit: Number of entries (default 10, max 100)
+    """
+    serializer_class = ContestLeaderboardEntrySerializer
+    default_limit = 10
+    max_limit = 100
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get_queryset(self):
+        return Contest.objects.all()
+
+    def retrieve(self, request, *args, **kwargs):
+        contest = self.get_object()
+        applications = contest.get_leaderboard(self.get_limit()).select_related('work', 'member').prefetch_related(
+            first_images_prefetch()
+        )
+
+        entries = []
+        rank = 0
+        previous_likes = None
+        for position, application in enumerate(applications, start=1):
+            # Equal tallies share a rank (1, 2, 2, 4, ...)
+            if application.like_count != previous_likes:
+                rank, previous_likes = position, application.like_count
+            application.rank = rank
+            entries.append(application)
+
+        serializer = self.get_serializer(entries, many=True)
+        return Response({
+            'contest_id': contest.id,
+            'award_condition': contest.award_condition,
+            'results': serializer.data,
+        })
+
 class SubmitWorkToContestView(generics.CreateAPIView):
     serializer_class = SubmitWorkSerializer
     permission_classes = [IsChild]
@@ -85,8 +160,10 @@ class MyContestsView(generics.ListAPIView):
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_class = ContestFilter
     search_fields = ['name']
+    # authentication, count, contests, applications, images
+    query_budget = 5
 
     def get_queryset(self):
         user = self.request.user
         applied_contests = ContestApplication.objects.filter(member=user).values_list('contest', flat=True)
-        return Contest.objects.filter(id__in=applied_contests)
+        return with_entry_history(Contest.objects.filter(id__in=applied_contests), user)
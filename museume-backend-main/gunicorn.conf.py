@@ -0,0 +1,23 @@
+# Gunicorn settings, read automatically from the working directory.
+#
+# Django keeps one persistent database connection per worker thread
+# (DB_CONN_MAX_AGE in museum_app/settings.py), so GUNICORN_THREADS is the
+# size of each worker's connection pool and GUNICORN_WORKERS x
+# GUNICORN_THREADS the most connections the app opens per database.
+#
+# With ASYNC_VIEWS the app is served over ASGI by uvicorn workers
+# (gunicorn museum_app.asgi:application): each worker runs an event loop,
+# so a few workers can wait on many Stripe calls at once.
+import os
+
+# Without GUNICORN_WORKERS the worker count is left to gunicorn (--workers,
+# WEB_CONCURRENCY, or its default of 1)
+if os.getenv('GUNICORN_WORKERS'):
+    workers = int(os.getenv('GUNICORN_WORKERS'))
+threads = int(os.getenv('GUNICORN_THREADS', '1'))
+
+if os.getenv('ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes'):
+    wsgi_app = 'museum_app.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    worker_class = 'gthread' if threads > 1 else 'sync'
@@ -8,8 +8,9 @@ from django.db.models import Q
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.crypto import get_random_string
+from django.utils.html import format_html
 from django.contrib.auth.hashers import make_password
-from member.helpers.emails import send_email
+from member.helpers.emails import get_member_emails, send_email, queue_bulk_email
 from member.helpers.sendgrid import create_new_sender_idenity
 from .models import *
 from contest.models import Contest
@@ -178,38 +179,40 @@ def send_custom_message(modeladmin, request, queryset):
             subject = form.cleaned_data['subject']
             message = form.cleaned_data['message']
 
-            # Send the email to each selected member
-            for member in queryset:
-                if request.user.organization.custom_email_address:
-                    from_email = request.user.organization.custom_email_address
-                else:
-                    from_email = settings.EMAIL_HOST_MAIL
-
-                print(f"Sending email to {member.email}")
-                print(f"Subject: {subject}")
-                print(f"Message: {message}")
-                context = {
-                    "action_link": "",
-                    "custom_message": message,
-                    "from_email": from_email
-                }
-
-                send_email(
-                    template_name='emails/custom_messages.html',
-                    subject="Message Notification",
-                    context=context,
-                    recipient_email=member.email if member.role is not 'child' else member.parent.email,
-                    from_email=from_email
-                )
-
-            messages.success(request, "Custom emails sent successfully!")
-            # Redirect back to the changelist page
-            if member.role == 'child':
-                return redirect(reverse('admin:member_profilemember_changelist'))
-            elif member.role == 'company_admin' or member.role == 'branch_admin':
-                return redirect(reverse('admin:member_staffmember_changelist'))
+            organization = request.user.organization
+            if organization and organization.custom_email_address:
+                from_email = organization.custom_email_address
             else:
-                return redirect(reverse('admin:member_regularmember_changelist'))
+                from_email = settings.EMAIL_HOST_MAIL
+
+            context = {
+                "action_link": "",
+                "subject": subject,
+                "custom_message": message,
+                "from_email": from_email
+            }
+
+            recipient_emails = get_member_emails(queryset)
+
+            # Rendered once and sent in batches by the email worker (send_queued_emails)
+            job = queue_bulk_email(
+                template_name='emails/custom_messages.html',
+                subject="Message Notification",
+                context=context,
+                recipient_emails=recipient_emails,
+                from_email=from_email,
+                created_by=request.user,
+            )
+
+            messages.success(request, format_html(
+                '{} <a href="{}">{}</a>',
+                _("Custom email queued for %(count)s recipients.") % {'count': job.total},
+                reverse('admin:member_bulkemailjob_change', args=[job.pk]),
+                _("View progress"),
+            ))
+            # Redirect back to the changelist page
+            opts = modeladmin.model._meta
+            return redirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
     else:
         # If this is the initial GET, create a form with selected IDs
         selected = request.POST.getlist(ACTION_CHECKBOX_NAME)
@@ -461,3 +464,46 @@ class ProfileMemberAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'template_name', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'template_name')
+    readonly_fields = [field.name for field in EmailOutbox._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(BulkEmailJob)
+class BulkEmailJobAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'created_by', 'status', 'progress', 'sent', 'failed', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = [field.name for field in BulkEmailJob._meta.fields] + ['progress']
+
+    @admin.display(description=_("progress"))
+    def progress(self, obj):
+        return f"{obj.processed} / {obj.total}"
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).select_related('created_by')
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(created_by=request.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser or request.user.role in ['company_admin', 'branch_admin']
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,31 +1,285 @@
-from django.core.mail import EmailMultiAlternatives
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 from django.conf import settings
 
-def send_email(template_name, subject, context, recipient_email, from_email=settings.EMAIL_HOST_MAIL, reply_to=None):
+# Outbox delivery (see send_queued_emails): retry delay is
+# EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), capped at EMAIL_OUTBOX_MAX_RETRY_DELAY
+EMAIL_OUTBOX_BATCH_SIZE = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+EMAIL_OUTBOX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 60)
+EMAIL_OUTBOX_MAX_RETRY_DELAY = getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_DELAY', 3600)
+# Bulk jobs: recipients per SMTP connection, and how long a running job may go
+# without progress before another worker picks it up again
+BULK_EMAIL_BATCH_SIZE = getattr(settings, 'BULK_EMAIL_BATCH_SIZE', 100)
+BULK_EMAIL_STALE_AFTER = getattr(settings, 'BULK_EMAIL_STALE_AFTER', 600)
+# Failed connection attempts (retried with the outbox backoff) before a job is given up
+BULK_EMAIL_MAX_ATTEMPTS = getattr(settings, 'BULK_EMAIL_MAX_ATTEMPTS', 6)
+
+
+def send_email(template_name, subject, context, recipient_email, from_email=settings.EMAIL_HOST_MAIL, reply_to=None, immediate=False):
+    """
+    Render an email template and queue it for delivery.
+
+    The message is stored in the EmailOutbox table and sent by
+    ``manage.py send_queued_emails``, so request handlers never wait on the
+    mail server. Queued rows are written in the caller's transaction: if it
+    rolls back, the email is not sent. Pass immediate=True to send over SMTP
+    right away (management commands, manual tests).
+    """
     try:
         if not isinstance(recipient_email, list):
             recipient_email = [recipient_email]
 
-        print("recipient email", recipient_email)
         context['mailto'] = settings.CONTACT_EMAIL
         html_message = render_to_string(template_name, context)
         plain_message = strip_tags(html_message)
-        
-        # EmailMultiAlternativesを使用してReply-Toを設定
-        msg = EmailMultiAlternatives(
+
+        if immediate:
+            build_message(subject, plain_message, html_message, from_email, recipient_email, reply_to).send()
+            print(f"Email sent to {recipient_email} using {template_name}")
+            return
+
+        from member.models import EmailOutbox
+
+        EmailOutbox.objects.create(
             subject=subject,
             body=plain_message,
+            html_body=html_message,
             from_email=from_email,
             to=recipient_email,
-            reply_to=[reply_to] if reply_to else None  # Reply-Toヘッダー
+            reply_to=reply_to,
+            template_name=template_name,
         )
-        msg.attach_alternative(html_message, "text/html")
-        msg.send()
-        
-        print(f"Email sent to {recipient_email} using {template_name}")
-        if reply_to:
-            print(f"Reply-To set to: {reply_to}")
     except Exception as e:
         print(f"Failed to send email to {recipient_email}: {e}")
+
+
+def build_message(subject, body, html_body, from_email, to, reply_to=None, connection=None):
+    # EmailMultiAlternativesを使用してReply-Toを設定
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        to=to,
+        reply_to=[reply_to] if reply_to else None,  # Reply-Toヘッダー
+        connection=connection,
+    )
+    if html_body:
+        msg.attach_alternative(html_body, "text/html")
+    return msg
+
+
+def get_retry_delay(attempts):
+    return timedelta(seconds=min(EMAIL_OUTBOX_RETRY_DELAY * 2 ** max(attempts - 1, 0), EMAIL_OUTBOX_MAX_RETRY_DELAY))
+
+
+def close_connection(connection):
+    try:
+        connection.close()
+    except Exception:
+        # The messages are out; a failed QUIT must not undo their bookkeeping
+        pass
+
+
+def record_delivery_failure(email, error):
+    """Reschedule an outbox email after a failed attempt, or give up on it."""
+    email.last_error = str(error)
+    if email.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = email.STATUS_FAILED
+    else:
+        email.next_attempt_at = timezone.now() + get_retry_delay(email.attempts)
+    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+
+
+def deliver_queued_emails(batch_size=EMAIL_OUTBOX_BATCH_SIZE):
+    """
+    Send one batch of due outbox emails over a single SMTP connection.
+
+    Rows are locked while they are being sent (SKIP LOCKED), so several
+    workers can run side by side. A failed message is rescheduled with
+    exponential backoff and marked failed after EMAIL_OUTBOX_MAX_ATTEMPTS.
+    If the SMTP connection cannot be opened, every email of the batch is
+    rescheduled the same way.
+
+    Returns:
+        tuple: (sent, failed) counts for the batch
+    """
+    from member.models import EmailOutbox
+
+    sent = failed = 0
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            # Mail server down or login rejected: retry the whole batch later
+            for email in batch:
+                email.attempts += 1
+                record_delivery_failure(email, e)
+            return sent, len(batch)
+
+        try:
+            for email in batch:
+                message = build_message(
+                    email.subject, email.body, email.html_body, email.from_email,
+                    email.to, email.reply_to, connection=connection,
+                )
+                email.attempts += 1
+                try:
+                    message.send()
+                except Exception as e:
+                    failed += 1
+                    record_delivery_failure(email, e)
+                else:
+                    sent += 1
+                    email.status = EmailOutbox.STATUS_SENT
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    email.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+        finally:
+            close_connection(connection)
+    return sent, failed
+
+
+def get_member_emails(members):
+    """
+    Addresses to reach the given members at.
+
+    Children are reached through their parent's address; children without
+    a parent are skipped.
+    """
+    return [
+        member.parent.email if member.role == 'child' else member.email
+        for member in members.select_related('parent')
+        if member.role != 'child' or member.parent
+    ]
+
+
+def queue_bulk_email(template_name, subject, context, recipient_emails, from_email=settings.EMAIL_HOST_MAIL, created_by=None):
+    """
+    Queue one message for many recipients; duplicates are dropped.
+
+    ``context`` must be JSON serializable: it is stored with the job and the
+    template is rendered once when the job runs.
+
+    Returns:
+        BulkEmailJob
+    """
+    from member.models import BulkEmailJob
+
+    return BulkEmailJob.objects.create(
+        created_by=created_by,
+        subject=subject,
+        template_name=template_name,
+        context=context,
+        from_email=from_email,
+        recipients=list(dict.fromkeys(email for email in recipient_emails if email)),
+    )
+
+
+def claim_bulk_email_job():
+    """Mark the oldest runnable bulk job as running and return it (or None)."""
+    from member.models import BulkEmailJob
+
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=BULK_EMAIL_STALE_AFTER)
+    candidates = BulkEmailJob.objects.filter(
+        Q(status=BulkEmailJob.STATUS_PENDING, next_attempt_at__lte=now) |
+        Q(status=BulkEmailJob.STATUS_RUNNING, updated_at__lt=stale_before)
+    ).order_by('created_at').values_list('id', 'status', 'updated_at')
+    for job_id, job_status, updated_at in candidates[:10]:
+        # Compare-and-set so two workers never run the same job
+        claimed = BulkEmailJob.objects.filter(id=job_id, status=job_status, updated_at=updated_at).update(
+            status=BulkEmailJob.STATUS_RUNNING, updated_at=timezone.now()
+        )
+        if claimed:
+            return BulkEmailJob.objects.get(id=job_id)
+    return None
+
+
+def run_bulk_email_job(job, batch_size=BULK_EMAIL_BATCH_SIZE):
+    """
+    Send a bulk job from where it left off, saving progress after each batch.
+
+    Every recipient gets their own message (addresses are never exposed to
+    each other), built from the same rendered HTML and sent over one SMTP
+    connection per batch. If the connection cannot be opened the job is
+    handed back as pending with its progress and last_error, to be resumed
+    after a backoff delay, or marked failed after BULK_EMAIL_MAX_ATTEMPTS
+    attempts in a row.
+    """
+    context = dict(job.context, mailto=settings.CONTACT_EMAIL)
+    html_message = render_to_string(job.template_name, context)
+    plain_message = strip_tags(html_message)
+
+    recipients = job.recipients
+    while job.processed < len(recipients):
+        batch = recipients[job.processed:job.processed + batch_size]
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            job.attempts += 1
+            job.last_error = str(e)
+            if job.attempts >= BULK_EMAIL_MAX_ATTEMPTS:
+                job.status = job.STATUS_FAILED
+                job.finished_at = timezone.now()
+            else:
+                job.status = job.STATUS_PENDING
+                job.next_attempt_at = timezone.now() + get_retry_delay(job.attempts)
+            job.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'finished_at', 'updated_at'])
+            return job
+        job.attempts = 0
+
+        try:
+            for email in batch:
+                message = build_message(job.subject, plain_message, html_message, job.from_email, [email], connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    job.failed += 1
+                    job.failed_recipients.append(email)
+                    job.last_error = str(e)
+                else:
+                    job.sent += 1
+        finally:
+            close_connection(connection)
+        job.save(update_fields=['sent', 'failed', 'failed_recipients', 'attempts', 'last_error', 'updated_at'])
+
+    job.status = job.STATUS_DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job
+
+
+def process_bulk_email_jobs(batch_size=BULK_EMAIL_BATCH_SIZE):
+    """
+    Run queued bulk jobs until none are left.
+
+    Returns:
+        int: Number of jobs completed
+    """
+    completed = 0
+    while True:
+        job = claim_bulk_email_job()
+        if job is None:
+            return completed
+        job = run_bulk_email_job(job, batch_size)
+        if job.status != job.STATUS_DONE:
+            # Mail server unreachable: handed back for a later run, or failed
+            return completed
+        completed += 1
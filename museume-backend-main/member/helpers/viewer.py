@@ -0,0 +1,64 @@
+from django.utils.functional import cached_property
+
+
+class ViewerContext:
+    """
+    Facts about the requesting member that serializers look up for every row
+    (shared users, organizations, liked works).
+
+    One instance is kept per request (see get_viewer), so each fact costs at
+    most one query however many nested serializers ask for it.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._liked_work_ids = set()
+        self._checked_work_ids = set()
+
+    @property
+    def is_authenticated(self):
+        return bool(self.user and self.user.is_authenticated)
+
+    @cached_property
+    def shared_user_ids(self):
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.shared_users.values_list('id', flat=True))
+
+    @cached_property
+    def organization_ids(self):
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(self.user.organizations.values_list('id', flat=True))
+
+    def liked_work_ids(self, work_ids):
+        """IDs among work_ids the viewer has liked; only unseen IDs are queried."""
+        from work.models import Like
+
+        work_ids = set(work_ids)
+        if not self.is_authenticated:
+            return set()
+        unchecked = work_ids - self._checked_work_ids
+        if unchecked:
+            self._liked_work_ids.update(
+                Like.objects.filter(member=self.user, work_id__in=unchecked).values_list('work_id', flat=True)
+            )
+            self._checked_work_ids |= unchecked
+        return self._liked_work_ids & work_ids
+
+    def has_liked(self, work_id):
+        return work_id in self.liked_work_ids([work_id])
+
+
+def get_viewer(request):
+    """
+    ViewerContext of the request's user, shared by everything serializing the
+    same request. Works with both DRF and plain Django requests.
+    """
+    http_request = getattr(request, '_request', request)
+    user = getattr(request, 'user', None)
+    viewer = getattr(http_request, '_viewer_context', None)
+    if viewer is None or viewer.user is not user:
+        viewer = ViewerContext(user)
+        http_request._viewer_context = viewer
+    return viewer
@@ -0,0 +1,130 @@
+import json
+import statistics
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from member.models import Member
+from museum_app.middleware import QueryRecorder
+
+# name -> (path, role of the member making the request)
+ENDPOINTS = {
+    'artworks': ('/api/artworks/', 'child'),
+    'family-gallery': ('/api/artworks/family-gallery/', 'child'),
+    'contests': ('/api/contests/', 'child'),
+    'profiles': ('/api/profiles/', 'protector'),
+    'image-count': ('/api/billing/user-image-count/', 'child'),
+}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency and query counts of the hot API endpoints against data from '
+        'seed_benchmark_data, save the results as JSON and optionally compare them with a baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefix given to seed_benchmark_data')
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS), help='Only run these endpoints (repeatable)')
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests before measuring')
+        parser.add_argument('--output', help='Write results to this JSON file (e.g. benchmarks/baseline.json)')
+        parser.add_argument('--compare', help='Baseline JSON file to compare the results with')
+        parser.add_argument('--threshold', type=float, default=20, help='Allowed p50 slowdown in percent before a regression is reported')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error when a regression is found')
+
+    def handle(self, *args, **options):
+        members = self.get_members(options['prefix'])
+        results = {}
+        for name in options['endpoint'] or ENDPOINTS:
+            path, role = ENDPOINTS[name]
+            results[name] = self.measure(path, members[role], options['iterations'], options['warmup'])
+            self.stdout.write(
+                f"{name:15} p50 {results[name]['p50_ms']:8.1f} ms  p95 {results[name]['p95_ms']:8.1f} ms  "
+                f"{results[name]['queries']:3d} queries  {results[name]['duplicate_queries']:3d} repeated"
+            )
+
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(baseline['results'], results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f"Regressions: {', '.join(regressions)}")
+
+    def get_members(self, prefix):
+        child = Member.objects.filter(username__startswith=f'{prefix}_protector_', role='child').order_by('id').first()
+        if child is None:
+            raise CommandError(f"No benchmark data with prefix '{prefix}'; run seed_benchmark_data first.")
+        return {'child': child, 'protector': child.parent}
+
+    def measure(self, path, member, iterations, warmup):
+        # Authenticate with a real JWT so the user lookup is part of the measurement
+        client = APIClient(HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(member).access_token}')
+
+        for _ in range(warmup):
+            client.get(path)
+
+        timings = []
+        recorder = None
+        for _ in range(iterations):
+            recorder = QueryRecorder()
+            with recorder.record():
+                start = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"GET {path} returned {response.status_code}")
+
+        return {
+            'path': path,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'mean_ms': round(statistics.mean(timings), 2),
+            'min_ms': round(min(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 2),
+            'duplicate_queries': sum(count - 1 for count in recorder.duplicates.values()),
+        }
+
+    def compare(self, baseline, results, threshold):
+        regressions = []
+        self.stdout.write('\nCompared with baseline:')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0
+            line = (
+                f"{name:15} p50 {before['p50_ms']:8.1f} -> {result['p50_ms']:8.1f} ms ({change:+.0f}%)  "
+                f"queries {before['queries']} -> {result['queries']}"
+            )
+            if change > threshold or result['queries'] > before['queries']:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return regressions
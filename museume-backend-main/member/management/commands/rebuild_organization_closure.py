@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from member.models import OrganizationClosure
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the organization closure table from Organization.parent'
+
+    def handle(self, *args, **options):
+        count = OrganizationClosure.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} closure rows."))
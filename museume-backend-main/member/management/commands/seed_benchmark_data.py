@@ -0,0 +1,282 @@
+import hashlib
+import os
+import random
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from PIL import Image as PILImage
+
+from contest.models import Contest, ContestApplication
+from member.helpers import generate_child_email, generate_ulid
+from member.models import Member, Organization
+from work.feed import rebuild_feed_entries
+from work.models import Category, Image, Like, MemberQuota, Tag, Work
+from work.search import rebuild_search_documents
+
+PASSWORD = 'benchmark'
+PLACEHOLDER_IMAGES = 8
+# Placeholder files are kept out of MEDIA_ROOT unless asked for
+DEFAULT_MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'museume-benchmark-media')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with synthetic organizations, families, works, likes and contests '
+        'for benchmark_endpoints. Run it against a scratch SQLite/MySQL database '
+        '(DB_ENGINE/DB_NAME), never production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help='Prefix of every generated username (used by --flush)')
+        parser.add_argument('--organizations', type=int, default=20, help='Top-level organizations')
+        parser.add_argument('--branches', type=int, default=3, help='Branches per organization, each with one sub-branch')
+        parser.add_argument('--protectors', type=int, default=2000)
+        parser.add_argument('--children', type=int, default=3, help='Children per protector')
+        parser.add_argument('--works', type=int, default=100000)
+        parser.add_argument('--images-per-work', type=int, default=2)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--likes', type=int, default=300000)
+        parser.add_argument('--contests', type=int, default=50)
+        parser.add_argument('--applications', type=int, default=200, help='Applications per contest')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1, help='Random seed, for reproducible data sets')
+        parser.add_argument(
+            '--media-root', default=DEFAULT_MEDIA_ROOT,
+            help='Directory the placeholder image files are written to; point MEDIA_ROOT at it to serve them',
+        )
+        parser.add_argument('--flush', action='store_true', help='Delete data from a previous run with the same prefix first')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        if options['interactive']:
+            answer = input('This writes a large amount of synthetic data to the configured database. Continue? [y/N] ')
+            if answer.lower() != 'y':
+                raise CommandError('Cancelled.')
+
+        self.random = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        self.storage = FileSystemStorage(location=options['media_root'])
+
+        if options['flush']:
+            self.flush()
+        elif Member.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise CommandError(f"Data with prefix '{self.prefix}' already exists; use --flush or another --prefix.")
+
+        organizations = self.create_organizations(options['organizations'], options['branches'])
+        protectors, children = self.create_families(organizations, options['protectors'], options['children'])
+        tags, categories = self.create_tags_and_categories(options['tags'])
+        works = self.create_works(children, options['works'], tags, categories)
+        self.create_images(works, options['images_per_work'])
+        self.create_likes(children, works, options['likes'])
+        self.update_counters(children)
+        self.create_contests(organizations, works, options['contests'], options['applications'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(organizations)} organizations, {len(protectors)} protectors, {len(children)} children "
+            f"and {len(works)} works. Log in as {protectors[0].username if protectors else '-'} / {PASSWORD}."
+        ))
+
+    def flush(self):
+        with transaction.atomic():
+            members = Member.objects.filter(username__startswith=f'{self.prefix}_')
+            Work.objects.filter(member__in=members).delete()
+            deleted, _ = members.delete()
+            # Branches, closure rows and contests cascade
+            Organization.objects.filter(username__startswith=f'{self.prefix}_').delete()
+            Tag.objects.filter(name__startswith=f'{self.prefix}_').delete()
+            Category.objects.filter(name__startswith=f'{self.prefix}_').delete()
+        self.stdout.write(f"Removed {deleted} rows from the previous run")
+
+    def create_organizations(self, count, branches):
+        organizations = []
+        for i in range(count):
+            # Saved one by one so the organization closure table is maintained
+            root = self.create_organization(f'{i}')
+            organizations.append(root)
+            for j in range(branches):
+                branch = self.create_organization(f'{i}_{j}', parent=root)
+                organizations.append(branch)
+                organizations.append(self.create_organization(f'{i}_{j}_0', parent=branch))
+        self.stdout.write(f"Created {len(organizations)} organizations")
+        return organizations
+
+    def create_organization(self, suffix, parent=None):
+        username = f'{self.prefix}_org_{suffix}'
+        return Organization.objects.create(
+            parent=parent, name=username, email=f'{username}@example.com', username=username,
+            staff_name='Benchmark', address='-', city='Tokyo', country='Japan',
+        )
+
+    def create_families(self, organizations, protector_count, children_per_protector):
+        password = make_password(PASSWORD)
+        Member.objects.bulk_create([
+            Member(
+                username=f'{self.prefix}_protector_{i}', email=f'{self.prefix}_protector_{i}@example.com',
+                password=password, role='protector', ulid=generate_ulid(), is_active=True,
+            )
+            for i in range(protector_count)
+        ], batch_size=self.batch_size)
+        protectors = list(Member.objects.filter(username__startswith=f'{self.prefix}_protector_', role='protector').order_by('id'))
+
+        children = []
+        for protector in protectors:
+            for j in range(children_per_protector):
+                ulid = generate_ulid()
+                children.append(Member(
+                    username=f'{protector.username}_child_{j}', email=generate_child_email(protector.email, ulid),
+                    password=password, role='child', ulid=ulid, parent=protector, is_active=True,
+                ))
+        Member.objects.bulk_create(children, batch_size=self.batch_size)
+        children = list(self.children().order_by('id'))
+
+        # Every family belongs to one organization; siblings share with each other
+        memberships = []
+        shares = []
+        family_organization = {}
+        for child in children:
+            organization = family_organization.setdefault(child.parent_id, self.random.choice(organizations))
+            memberships.append(Member.organizations.through(member_id=child.id, organization_id=organization.id))
+        for siblings in self.group_by_parent(children).values():
+            for child in siblings:
+                for sibling in siblings:
+                    if child.id != sibling.id:
+                        shares.append(Member.shared_users.through(from_member_id=child.id, to_member_id=sibling.id))
+        Member.organizations.through.objects.bulk_create(memberships, batch_size=self.batch_size)
+        Member.shared_users.through.objects.bulk_create(shares, batch_size=self.batch_size)
+
+        self.stdout.write(f"Created {len(protectors)} protectors and {len(children)} children")
+        return protectors, children
+
+    def children(self):
+        return Member.objects.filter(username__startswith=f'{self.prefix}_protector_', role='child')
+
+    def group_by_parent(self, children):
+        families = {}
+        for child in children:
+            families.setdefault(child.parent_id, []).append(child)
+        return families
+
+    def create_tags_and_categories(self, count):
+        Tag.objects.bulk_create([Tag(name=f'{self.prefix}_tag_{i}') for i in range(count)])
+        Category.objects.bulk_create([Category(name=f'{self.prefix}_category_{i}') for i in range(10)])
+        tags = list(Tag.objects.filter(name__startswith=f'{self.prefix}_tag_').values_list('id', flat=True))
+        categories = list(Category.objects.filter(name__startswith=f'{self.prefix}_category_').values_list('id', flat=True))
+        return tags, categories
+
+    def create_works(self, children, count, tags, categories):
+        if not children:
+            return []
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                public = self.random.random() < 0.8
+                batch.append(Work(
+                    title=f'Work {i}', description=f'Synthetic artwork {i}',
+                    member_id=self.random.choice(children).id, category_id=self.random.choice(categories),
+                    is_public=public, public_visibility='public' if public else 'private',
+                ))
+            Work.objects.bulk_create(batch)
+        works = list(Work.objects.filter(member__in=self.children()).values_list('id', flat=True).order_by('id'))
+
+        # Spread creation dates over a year so ordering and cursors behave realistically
+        now = timezone.now()
+        when = {work_id: now - timedelta(minutes=self.random.randrange(525600)) for work_id in works}
+        for start in range(0, len(works), self.batch_size):
+            ids = works[start:start + self.batch_size]
+            Work.objects.bulk_update([Work(id=work_id, created_at=when[work_id]) for work_id in ids], ['created_at'])
+            Work.tags.through.objects.bulk_create([
+                Work.tags.through(work_id=work_id, tag_id=tag_id)
+                for work_id in ids
+                for tag_id in self.random.sample(tags, min(len(tags), self.random.randint(0, 3)))
+            ])
+        rebuild_search_documents(Work.objects.filter(member__in=self.children()), batch_size=self.batch_size)
+        rebuild_feed_entries(Work.objects.filter(member__in=self.children()), batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(works)} works")
+        return works
+
+    def create_images(self, works, per_work):
+        # Image rows share a few placeholder files; only the hashes must be unique
+        names = []
+        for i in range(PLACEHOLDER_IMAGES):
+            name = f'works/{self.prefix}_placeholder_{i}.png'
+            if not self.storage.exists(name):
+                buffer = BytesIO()
+                PILImage.new('RGB', (64, 64), (i * 30, 120, 200)).save(buffer, format='PNG')
+                name = self.storage.save(name, ContentFile(buffer.getvalue()))
+            names.append(name)
+
+        images = []
+        for work_id in works:
+            for n in range(per_work):
+                images.append(Image(
+                    work_id=work_id, image=self.random.choice(names),
+                    hash=hashlib.sha256(f'{self.prefix}:{work_id}:{n}'.encode()).hexdigest(),
+                ))
+            if len(images) >= self.batch_size:
+                Image.objects.bulk_create(images)
+                images = []
+        Image.objects.bulk_create(images)
+        self.stdout.write(f"Created {len(works) * per_work} images")
+
+    def create_likes(self, children, works, count):
+        if not works:
+            return
+        pairs = set()
+        child_ids = [child.id for child in children]
+        count = min(count, len(child_ids) * len(works))
+        while len(pairs) < count:
+            pairs.add((self.random.choice(child_ids), self.random.choice(works)))
+        pairs = list(pairs)
+        for start in range(0, len(pairs), self.batch_size):
+            Like.objects.bulk_create(
+                [Like(member_id=member_id, work_id=work_id) for member_id, work_id in pairs[start:start + self.batch_size]],
+                ignore_conflicts=True,
+            )
+        self.stdout.write(f"Created {len(pairs)} likes")
+
+    def update_counters(self, children):
+        """Fill the counters bulk_create bypassed (like tallies, tag usage and upload quotas)."""
+        Tag.refresh_usage_counts(Tag.objects.filter(name__startswith=f'{self.prefix}_'))
+        likes = Like.objects.filter(work=OuterRef('pk')).order_by().values('work').annotate(count=Count('id')).values('count')
+        Work.objects.filter(member__in=self.children()).update(like_count=Coalesce(Subquery(likes), 0))
+
+        works = dict(
+            Work.objects.filter(member__in=self.children()).order_by()
+            .values('member').annotate(n=Count('id')).values_list('member', 'n')
+        )
+        images = dict(
+            Image.objects.filter(work__member__in=self.children()).order_by()
+            .values('work__member').annotate(n=Count('id')).values_list('work__member', 'n')
+        )
+        MemberQuota.objects.bulk_create([
+            MemberQuota(member_id=child.id, work_count=works.get(child.id, 0), image_count=images.get(child.id, 0))
+            for child in children
+        ], batch_size=self.batch_size)
+
+    def create_contests(self, organizations, works, count, applications_per_contest):
+        now = timezone.now()
+        public_works = list(
+            Work.objects.filter(member__in=self.children(), is_public=True).values_list('id', 'member_id', 'like_count')
+        )
+        for i in range(count):
+            contest = Contest.objects.create(
+                organization=self.random.choice(organizations), name=f'{self.prefix} contest {i}', explanation='-',
+                start_date=now - timedelta(days=7), end_date=now + timedelta(days=self.random.choice([-1, 7, 30])),
+                is_private=self.random.random() < 0.3,
+            )
+            entries = self.random.sample(public_works, min(len(public_works), applications_per_contest))
+            ContestApplication.objects.bulk_create([
+                ContestApplication(contest=contest, work_id=work_id, member_id=member_id, like_count=like_count)
+                for work_id, member_id, like_count in entries
+            ])
+        self.stdout.write(f"Created {count} contests")
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from member.helpers.emails import EMAIL_OUTBOX_BATCH_SIZE, deliver_queued_emails, process_bulk_email_jobs
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails and bulk email jobs (run from cron, or with --loop as a worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=EMAIL_OUTBOX_BATCH_SIZE, help='Emails sent per SMTP connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = total_jobs = 0
+        while True:
+            try:
+                sent, failed = deliver_queued_emails(options['batch_size'])
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} emails, {failed} failed")
+                    continue
+
+                jobs = process_bulk_email_jobs()
+                total_jobs += jobs
+                if jobs:
+                    self.stdout.write(f"Completed {jobs} bulk email jobs")
+                    continue
+            except Exception as e:
+                # Keep the worker alive, e.g. through a database restart
+                if not options['loop']:
+                    raise
+                self.stderr.write(f"Email delivery failed: {e}")
+                close_old_connections()
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total_sent} sent, {total_failed} failed, {total_jobs} bulk jobs"))
@@ -20,7 +20,8 @@ class Command(BaseCommand):
                 subject=f"[問い合わせ] {context['subject']}",
                 context=context,
                 recipient_email=["contact@museume.art", "info@seso-j.com"],
-                reply_to=context['email']
+                reply_to=context['email'],
+                immediate=True
             )
             self.stdout.write(self.style.SUCCESS("✅ メール送信成功！"))
         except Exception as e:
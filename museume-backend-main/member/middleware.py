@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.utils import translation
+from django.utils.deprecation import MiddlewareMixin
 
 
 def get_language_from_request(request):
@@ -66,15 +67,13 @@ class AdminLanguageMiddleware:
         return response
 
 
-class APILanguageMiddleware:
+class APILanguageMiddleware(MiddlewareMixin):
     """
     Middleware for handling language in API requests.
     Supports query parameters, headers, and session-based language preference.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
 
-    def __call__(self, request):
+    def process_request(self, request):
         if not request.path.startswith('/admin/'):
             lang = get_language_from_request(request)
             translation.activate(lang)
@@ -83,8 +82,7 @@ class APILanguageMiddleware:
             if hasattr(request, 'session') and request.session.session_key:
                 request.session[settings.LANGUAGE_COOKIE_NAME] = lang
 
-        response = self.get_response(request)
-
+    def process_response(self, request, response):
         # Set language cookie in response
         if not request.path.startswith('/admin/'):
             lang = translation.get_language()
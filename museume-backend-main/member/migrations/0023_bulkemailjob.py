@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0022_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkEmailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=998, verbose_name='subject')),
+                ('template_name', models.CharField(max_length=255, verbose_name='template name')),
+                ('context', models.JSONField(default=dict, verbose_name='context')),
+                ('from_email', models.CharField(blank=True, max_length=255, null=True, verbose_name='from email')),
+                ('recipients', models.JSONField(default=list, verbose_name='recipients')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done')], default='pending', max_length=10, verbose_name='status')),
+                ('sent', models.PositiveIntegerField(default=0, verbose_name='sent')),
+                ('failed', models.PositiveIntegerField(default=0, verbose_name='failed')),
+                ('failed_recipients', models.JSONField(blank=True, default=list, verbose_name='failed recipients')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_email_jobs', to=settings.AUTH_USER_MODEL, verbose_name='created by')),
+            ],
+            options={
+                'verbose_name': 'Bulk Email',
+                'verbose_name_plural': 'Bulk Emails',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_organization_closure(apps, schema_editor):
+    Organization = apps.get_model('member', 'Organization')
+    OrganizationClosure = apps.get_model('member', 'OrganizationClosure')
+    parents = dict(Organization.objects.values_list('id', 'parent_id'))
+    links = []
+    for organization_id in parents:
+        ancestor_id, depth, seen = organization_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(OrganizationClosure(ancestor_id=ancestor_id, descendant_id=organization_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    OrganizationClosure.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0023_bulkemailjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='depth')),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='member.organization', verbose_name='ancestor')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='member.organization', verbose_name='descendant')),
+            ],
+            options={
+                'verbose_name': 'Organization Closure',
+                'verbose_name_plural': 'Organization Closures',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='org_closure_descendant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_organization_closure')],
+            },
+        ),
+        migrations.RunPython(build_organization_closure, reverse_code=migrations.RunPython.noop),
+    ]
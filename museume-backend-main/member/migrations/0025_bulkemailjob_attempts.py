@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:28
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0024_organizationclosure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulkemailjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='attempts'),
+        ),
+        migrations.AddField(
+            model_name='bulkemailjob',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='next attempt at'),
+        ),
+        migrations.AlterField(
+            model_name='bulkemailjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='status'),
+        ),
+    ]
@@ -1,8 +1,10 @@
 import secrets
 import string
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.db.models import Q
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from .helpers import generate_ulid, generate_child_email, extract_parent_email, is_child_email
@@ -42,7 +44,32 @@ class Organization(models.Model):
                 if not Organization.objects.filter(organization_code=random_code).exists():
                     self.organization_code = random_code
                     break
-        super().save(*args, **kwargs)
+
+        # Keep the closure table in sync with the parent link
+        is_new = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        parent_changed = False
+        if not is_new and (update_fields is None or 'parent' in update_fields):
+            old_parent_id = Organization.objects.filter(pk=self.pk).values_list('parent_id', flat=True).first()
+            parent_changed = old_parent_id != self.parent_id
+        if parent_changed:
+            # Before the new parent is written
+            self.validate_parent()
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                OrganizationClosure.insert_node(self)
+            elif parent_changed:
+                OrganizationClosure.move_subtree(self)
+
+    def clean(self):
+        super().clean()
+        self.validate_parent()
+
+    def validate_parent(self):
+        if self.pk and self.parent_id and self.parent_id in self.get_descendant_ids():
+            raise ValidationError({'parent': _("An organization cannot be moved under one of its own branches.")})
 
     def __str__(self):
         return f"{self.name} - {self.organization_code}"
@@ -51,68 +78,130 @@ class Organization(models.Model):
         return self.branches.all()
 
     def get_nested_branches(self):
-        all_branch_ids = self.get_all_branch_ids_optimized()
-        return Organization.objects.filter(id__in=all_branch_ids)
+        """This organization and all of its branches (recursively)."""
+        return self.get_descendants()
 
-    @classmethod
-    def get_all_branch_ids(cls, org):
+    def get_descendants(self, include_self=True):
         """
-        Optimized: Get all branch IDs using a single query.
-        Fetches all organizations and builds the tree in memory.
+        All branches below this organization, in one indexed query on the
+        closure table.
         """
-        return org.get_all_branch_ids_optimized()
+        lookups = {'ancestor_links__ancestor': self}
+        if not include_self:
+            lookups['ancestor_links__depth__gt'] = 0
+        return Organization.objects.filter(**lookups)
+
+    def get_ancestors(self, include_self=False):
+        """Parent organizations of this one, the root first."""
+        lookups = {'descendant_links__descendant': self}
+        if not include_self:
+            lookups['descendant_links__depth__gt'] = 0
+        return Organization.objects.filter(**lookups).order_by('-descendant_links__depth')
+
+    def get_descendant_ids(self):
+        """IDs of this organization and all of its branches."""
+        return list(OrganizationClosure.objects.filter(ancestor=self).values_list('descendant_id', flat=True))
+
+    @classmethod
+    def get_all_branch_ids(cls, org):
+        """Get all branch IDs (including the organization itself)."""
+        return org.get_descendant_ids()
 
     def get_all_branch_ids_optimized(self):
         """
         Get all descendant organization IDs (including self) using a single query.
 
-        This avoids the N+1 problem by:
-        1. Fetching all organizations in one query
-        2. Building parent-child relationships in memory
-        3. Traversing the tree iteratively
-
         Returns:
             list: List of organization IDs including self and all descendants
         """
-        # Fetch all organizations with their parent_id in a single query
-        all_orgs = Organization.objects.values('id', 'parent_id')
-
-        # Build a mapping of parent_id -> list of child IDs
-        children_map = {}
-        for org in all_orgs:
-            parent_id = org['parent_id']
-            if parent_id not in children_map:
-                children_map[parent_id] = []
-            children_map[parent_id].append(org['id'])
-
-        # Iteratively collect all descendant IDs (BFS)
-        result = [self.id]
-        queue = [self.id]
-
-        while queue:
-            current_id = queue.pop(0)
-            child_ids = children_map.get(current_id, [])
-            result.extend(child_ids)
-            queue.extend(child_ids)
-
-        return result
+        return self.get_descendant_ids()
 
     def get_children(self):
         """
         Retrieve all Members with the role 'child' who are part of this Organization
         or any of its branches (recursively).
 
-        Optimized to avoid N+1 queries.
+        Resolved in a single query through the closure table.
         """
-        all_branch_ids = self.get_all_branch_ids_optimized()
-
         return Member.objects.filter(
-            role='child'
-        ).filter(
-            Q(organizations__id__in=all_branch_ids)
+            role='child',
+            organizations__ancestor_links__ancestor=self,
         ).distinct()
 
 
+class OrganizationClosure(models.Model):
+    """
+    Closure table of the organization hierarchy.
+
+    Holds one row per (ancestor, descendant) pair, including each
+    organization paired with itself at depth 0, so branch and parent lookups
+    are single indexed queries. Maintained by Organization.save(); rows are
+    removed with their organizations by the cascade.
+    """
+    ancestor = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='descendant_links', verbose_name=_("ancestor"))
+    descendant = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='ancestor_links', verbose_name=_("descendant"))
+    depth = models.PositiveSmallIntegerField(verbose_name=_("depth"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_organization_closure'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='org_closure_descendant_idx'),
+        ]
+        verbose_name = _("Organization Closure")
+        verbose_name_plural = _("Organization Closures")
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def insert_node(cls, organization):
+        """Add the rows of a new organization: itself plus its parent's ancestors."""
+        links = [cls(ancestor_id=organization.pk, descendant_id=organization.pk, depth=0)]
+        if organization.parent_id:
+            links.extend(
+                cls(ancestor_id=ancestor_id, descendant_id=organization.pk, depth=depth + 1)
+                for ancestor_id, depth in cls.objects.filter(descendant_id=organization.parent_id).values_list('ancestor_id', 'depth')
+            )
+        cls.objects.bulk_create(links)
+
+    @classmethod
+    def move_subtree(cls, organization):
+        """
+        Re-attach an organization and its branches below its new parent.
+        Organization.save() has already rejected parents inside the subtree.
+        """
+        subtree = list(cls.objects.filter(ancestor_id=organization.pk).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _depth in subtree]
+
+        # Drop the links from the old ancestors, then link the new ones
+        cls.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if organization.parent_id:
+            ancestors = cls.objects.filter(descendant_id=organization.parent_id).values_list('ancestor_id', 'depth')
+            cls.objects.bulk_create([
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + descendant_depth + 1)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, descendant_depth in subtree
+            ])
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the whole table from Organization.parent."""
+        parents = dict(Organization.objects.values_list('id', 'parent_id'))
+        links = []
+        for organization_id in parents:
+            ancestor_id, depth, seen = organization_id, 0, set()
+            while ancestor_id is not None and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                links.append(cls(ancestor_id=ancestor_id, descendant_id=organization_id, depth=depth))
+                ancestor_id, depth = parents.get(ancestor_id), depth + 1
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(links, batch_size=1000)
+        return len(links)
+
+
 class Member(AbstractUser):
     ROLE_CHOICES = [
         ('company_admin', 'Company Administrator'),
@@ -202,7 +291,7 @@ class Member(AbstractUser):
         return True  # All members can update email (children can become independent)
 
     def get_sibilings(self):
-        return self.parent.children.all() if self.parent else []
+        return self.parent.children.all() if self.parent else Member.objects.none()
 
     def get_shared_siblings(self):
         """Get siblings that are shared with this member."""
@@ -235,3 +324,105 @@ class ProfileMember(Member):
         proxy = True
         verbose_name = _("ProfileMember")
         verbose_name_plural = _("ProfileMembers")
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email waiting to be delivered.
+
+    ``send_email`` renders the message and stores it here instead of talking
+    to the SMTP server inside the request; ``manage.py send_queued_emails``
+    delivers pending rows in batches over one connection and retries
+    failures with exponential backoff.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=998, verbose_name=_("subject"))
+    body = models.TextField(verbose_name=_("body"))
+    html_body = models.TextField(blank=True, verbose_name=_("HTML body"))
+    from_email = models.CharField(max_length=255, null=True, blank=True, verbose_name=_("from email"))
+    to = models.JSONField(default=list, verbose_name=_("to"))
+    reply_to = models.CharField(max_length=255, null=True, blank=True, verbose_name=_("reply to"))
+    template_name = models.CharField(max_length=255, blank=True, verbose_name=_("template name"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name=_("status"))
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("attempts"))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_("next attempt at"))
+    last_error = models.TextField(blank=True, verbose_name=_("last error"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_("sent at"))
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='email_outbox_due_idx'),
+        ]
+        verbose_name = _("Email Outbox")
+        verbose_name_plural = _("Email Outbox")
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class BulkEmailJob(models.Model):
+    """
+    One message sent to many recipients (admin "send custom message").
+
+    The template is rendered once for the whole job and recipients are sent
+    in batches over a single SMTP connection by ``manage.py
+    send_queued_emails``. ``sent``/``failed`` are saved after every batch so
+    progress is visible in the admin and an interrupted job resumes where
+    it stopped. When the mail server cannot be reached the job is retried
+    at ``next_attempt_at`` with backoff and marked failed after too many
+    ``attempts``.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    created_by = models.ForeignKey(Member, on_delete=models.SET_NULL, null=True, blank=True, related_name='bulk_email_jobs', verbose_name=_("created by"))
+    subject = models.CharField(max_length=998, verbose_name=_("subject"))
+    template_name = models.CharField(max_length=255, verbose_name=_("template name"))
+    context = models.JSONField(default=dict, verbose_name=_("context"))
+    from_email = models.CharField(max_length=255, null=True, blank=True, verbose_name=_("from email"))
+    recipients = models.JSONField(default=list, verbose_name=_("recipients"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name=_("status"))
+    sent = models.PositiveIntegerField(default=0, verbose_name=_("sent"))
+    failed = models.PositiveIntegerField(default=0, verbose_name=_("failed"))
+    failed_recipients = models.JSONField(default=list, blank=True, verbose_name=_("failed recipients"))
+    last_error = models.TextField(blank=True, verbose_name=_("last error"))
+    # Consecutive failures to connect to the mail server
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_("attempts"))
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name=_("next attempt at"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name=_("finished at"))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = _("Bulk Email")
+        verbose_name_plural = _("Bulk Emails")
+
+    def __str__(self):
+        return f"{self.subject} ({self.processed}/{self.total})"
+
+    @property
+    def total(self):
+        return len(self.recipients)
+
+    @property
+    def processed(self):
+        return self.sent + self.failed
@@ -8,6 +8,7 @@ from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework.response import Response
 from django.utils.translation import gettext as _
 from member.helpers.emails import send_email
+from member.helpers.viewer import get_viewer
 from member.helpers import generate_ulid, generate_child_email
 from django.utils import timezone
 from .models import *
@@ -152,11 +153,11 @@ class MemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'ulid', 'username', 'profile_picture', 'is_shared']
 
     def get_is_shared(self, obj):
-        user = self.context.get('request').user
-        try:
-            return obj in user.shared_users.all()
-        except:
+        request = self.context.get('request')
+        if not request:
             return False
+        # Loaded once per request, however many works/profiles are serialized
+        return obj.id in get_viewer(request).shared_user_ids
 
 class ProfileSerializer(serializers.ModelSerializer):
     organizations = OrganizationSerializer(many=True, read_only=True)
@@ -174,7 +175,8 @@ class ProfileSerializer(serializers.ModelSerializer):
         return False 
         
     def get_shared_users(self, instance):
-        siblings = instance.get_sibilings().exclude(id=instance.id)
+        # Filtered in Python so the prefetched parent__children is reused
+        siblings = [sibling for sibling in instance.get_sibilings() if sibling.id != instance.id]
         return MemberSerializer(siblings, many=True, context=self.context).data
     
     def create(self, validated_data):
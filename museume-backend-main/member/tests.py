@@ -1,3 +1,402 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import smtplib
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from museum_app import routers
+from museum_app.db import metrics
+from museum_app.db.backends.mysql.base import DatabaseWrapper
+from work.models import Work
+from .helpers.emails import (
+    BULK_EMAIL_MAX_ATTEMPTS, BULK_EMAIL_STALE_AFTER, EMAIL_OUTBOX_MAX_ATTEMPTS, claim_bulk_email_job, deliver_queued_emails,
+    get_member_emails, get_retry_delay, process_bulk_email_jobs, queue_bulk_email, run_bulk_email_job, send_email,
+)
+from .models import BulkEmailJob, EmailOutbox, Member, Organization, OrganizationClosure
+
+
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        routers.clear_replica_health()
+        self.addCleanup(routers.clear_replica_health)
+        for patcher in [
+            mock.patch('museum_app.routers.get_replica_aliases', return_value=['replica1', 'replica2']),
+            mock.patch('museum_app.routers.get_replica_lag', return_value=0),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reads_use_one_replica_per_request(self):
+        self.assertEqual(self.router.db_for_read(Work), 'default')
+
+        token = routers.start_replica_reads()
+        try:
+            replica = self.router.db_for_read(Work)
+            self.assertIn(replica, ['replica1', 'replica2'])
+            self.assertEqual({self.router.db_for_read(Member) for _ in range(10)}, {replica})
+        finally:
+            routers.stop_replica_reads(token)
+        self.assertEqual(self.router.db_for_read(Work), 'default')
+
+    def test_reads_after_a_write_use_the_primary(self):
+        token = routers.start_replica_reads()
+        try:
+            self.assertEqual(self.router.db_for_write(Work), 'default')
+            self.assertEqual(self.router.db_for_read(Work), 'default')
+        finally:
+            routers.stop_replica_reads(token)
+
+    def test_lagging_replicas_are_skipped(self):
+        lags = {'replica1': 30, 'replica2': None}
+        with mock.patch('museum_app.routers.get_replica_lag', side_effect=lags.get) as get_lag:
+            token = routers.start_replica_reads()
+            try:
+                self.assertEqual(self.router.db_for_read(Work), 'default')
+            finally:
+                routers.stop_replica_reads(token)
+            # Lag is checked once per interval, not per request
+            self.assertEqual(routers.get_healthy_replicas(), [])
+            self.assertEqual(get_lag.call_count, 2)
+
+
+class ConnectionMetricsTests(SimpleTestCase):
+
+    def setUp(self):
+        metrics.reset_connection_stats()
+        self.addCleanup(metrics.reset_connection_stats)
+        self.wrapper = DatabaseWrapper({
+            'ENGINE': 'museum_app.db.backends.mysql', 'NAME': 'museum', 'USER': '', 'PASSWORD': '', 'HOST': '',
+            'PORT': '', 'OPTIONS': {}, 'TIME_ZONE': None, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False,
+            'CONN_MAX_AGE': 300, 'CONN_HEALTH_CHECKS': True, 'TEST': {},
+        }, 'metrics')
+        # No MySQL server here: "connecting" hands out a mock connection
+        patcher = mock.patch(
+            'django.db.backends.mysql.base.DatabaseWrapper.connect', autospec=True,
+            side_effect=self.fake_connect,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_connect(self, wrapper):
+        wrapper.connection = mock.Mock()
+        wrapper.autocommit = True
+        wrapper.health_check_enabled = True
+        wrapper.health_check_done = True
+        wrapper.close_at = None
+        wrapper.errors_occurred = False
+
+    def run_request(self):
+        # What Django does around a request: check the connection, use it, check it again
+        self.wrapper.close_if_unusable_or_obsolete()
+        self.wrapper.close_if_health_check_failed()
+        self.wrapper.ensure_connection()
+        self.wrapper.ensure_connection()
+        checkout = dict(self.wrapper.checkout)
+        self.wrapper.close_if_unusable_or_obsolete()
+        return checkout
+
+    def test_connections_are_counted_per_checkout(self):
+        self.assertFalse(self.run_request()['reused'])
+        self.assertTrue(self.run_request()['reused'])
+        self.assertTrue(self.run_request()['reused'])
+
+        stats = metrics.get_connection_stats()['metrics']
+        self.assertEqual((stats['checkouts'], stats['reused'], stats['connects']), (3, 2, 1))
+        self.assertEqual(stats['reuse_ratio'], 0.667)
+        self.assertIsNotNone(stats['mean_connect_ms'])
+
+    def test_failed_health_checks_are_counted(self):
+        self.run_request()
+        self.wrapper.health_check_done = False
+        with mock.patch.object(self.wrapper, 'is_usable', return_value=False):
+            self.wrapper.close_if_health_check_failed()
+        self.assertFalse(self.run_request()['reused'])
+
+        stats = metrics.get_connection_stats()['metrics']
+        self.assertEqual((stats['health_check_failures'], stats['connects']), (1, 2))
+
+    def test_stats_are_logged_periodically(self):
+        self.run_request()
+        with mock.patch.object(metrics, '_last_logged', 0), self.assertLogs('museum_app.db.metrics', 'INFO') as logs:
+            metrics.log_connection_stats_if_due()
+            metrics.log_connection_stats_if_due()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('"alias": "metrics"', logs.output[0])
+
+
+class ReplicaPinningTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        cls.work = Work.objects.create(title='Work', member=cls.member, public_visibility='public', is_public=True)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('museum_app.routers.get_replica_aliases', return_value=['replica1'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = str(RefreshToken.for_user(self.member).access_token)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        request = self.client.get('/api/artworks/', HTTP_AUTHORIZATION=f'Bearer {self.token}').wsgi_request
+        self.assertFalse(routers.is_pinned_to_primary(request))
+
+        response = self.client.post(f'/api/artworks/{self.work.pk}/like/', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(routers.REPLICA_PIN_COOKIE, response.cookies)
+
+        # Pinned by the cookie, and by user id for clients without cookies
+        self.client.cookies.clear()
+        request = self.client.get('/api/artworks/', HTTP_AUTHORIZATION=f'Bearer {self.token}').wsgi_request
+        self.assertTrue(routers.is_pinned_to_primary(request))
+
+
+class EmailOutboxTests(TestCase):
+
+    def queue(self, recipient='parent@example.com'):
+        send_email(
+            template_name='emails/custom_messages.html',
+            subject='Hello',
+            context={'subject': 'Hello', 'user_name': 'Parent', 'custom_message': 'Message'},
+            recipient_email=recipient,
+        )
+
+    def test_queued_emails_are_sent_by_the_worker(self):
+        self.queue()
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(deliver_queued_emails(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['parent@example.com'])
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_SENT)
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+    def test_failed_emails_are_retried_then_given_up(self):
+        self.queue()
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', side_effect=smtplib.SMTPRecipientsRefused({})):
+            self.assertEqual(deliver_queued_emails(), (0, 1))
+            email = EmailOutbox.objects.get()
+            self.assertEqual((email.status, email.attempts), (EmailOutbox.STATUS_PENDING, 1))
+            self.assertAlmostEqual(
+                (email.next_attempt_at - timezone.now()).total_seconds(), get_retry_delay(1).total_seconds(), delta=5,
+            )
+
+            EmailOutbox.objects.update(attempts=EMAIL_OUTBOX_MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+            self.assertEqual(deliver_queued_emails(), (0, 1))
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_FAILED)
+
+    def test_batch_is_rescheduled_when_the_mail_server_is_down(self):
+        self.queue('a@example.com')
+        self.queue('b@example.com')
+        connection = mock.Mock()
+        connection.open.side_effect = ConnectionRefusedError('Connection refused')
+        with mock.patch('member.helpers.emails.get_connection', return_value=connection):
+            self.assertEqual(deliver_queued_emails(), (0, 2))
+
+        for email in EmailOutbox.objects.all():
+            self.assertEqual((email.status, email.attempts, email.last_error), (EmailOutbox.STATUS_PENDING, 1, 'Connection refused'))
+            self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_queued_emails(), (0, 0))
+
+    def test_worker_loop_survives_errors(self):
+        stderr = StringIO()
+        deliver = mock.Mock(side_effect=[OperationalError('server has gone away'), KeyboardInterrupt])
+        with mock.patch('member.management.commands.send_queued_emails.deliver_queued_emails', deliver), \
+                mock.patch('member.management.commands.send_queued_emails.time.sleep'):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('send_queued_emails', loop=True, stdout=StringIO(), stderr=stderr)
+        self.assertEqual(deliver.call_count, 2)
+        self.assertIn('server has gone away', stderr.getvalue())
+
+
+class BulkEmailJobTests(TestCase):
+
+    def queue(self, recipients):
+        return queue_bulk_email(
+            template_name='emails/custom_messages.html',
+            subject='Notice',
+            context={'subject': 'Notice', 'custom_message': 'Message'},
+            recipient_emails=recipients,
+        )
+
+    def test_progress_counts_sent_and_failed_recipients(self):
+        job = self.queue([f'user{i}@example.com' for i in range(5)] + ['user0@example.com', ''])
+        self.assertEqual(job.total, 5)
+
+        send = mock.Mock(side_effect=[1, 1, smtplib.SMTPRecipientsRefused({}), 1, 1])
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', send):
+            process_bulk_email_jobs(batch_size=2)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.failed), (BulkEmailJob.STATUS_DONE, 4, 1))
+        self.assertEqual(job.processed, job.total)
+        self.assertEqual(job.failed_recipients, ['user2@example.com'])
+
+    def test_interrupted_jobs_resume_where_they_left_off(self):
+        job = self.queue([f'user{i}@example.com' for i in range(4)])
+        job.status = BulkEmailJob.STATUS_RUNNING
+        job.sent = 2
+        job.save()
+        # The worker running it went away without updating the job
+        BulkEmailJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=BULK_EMAIL_STALE_AFTER + 1),
+        )
+
+        run_bulk_email_job(claim_bulk_email_job())
+        self.assertEqual([message.to for message in mail.outbox], [['user2@example.com'], ['user3@example.com']])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent), (BulkEmailJob.STATUS_DONE, 4))
+        self.assertIsNone(claim_bulk_email_job())
+
+    def test_job_is_handed_back_when_the_mail_server_is_down(self):
+        job = self.queue(['a@example.com', 'b@example.com'])
+        connection = mock.Mock()
+        connection.open.side_effect = smtplib.SMTPAuthenticationError(535, b'Authentication failed')
+        with mock.patch('member.helpers.emails.get_connection', return_value=connection):
+            self.assertEqual(process_bulk_email_jobs(), 0)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.attempts), (BulkEmailJob.STATUS_PENDING, 0, 1))
+        self.assertIn('Authentication failed', job.last_error)
+        self.assertAlmostEqual(
+            (job.next_attempt_at - timezone.now()).total_seconds(), get_retry_delay(1).total_seconds(), delta=5,
+        )
+
+        # Not retried before the backoff delay
+        self.assertIsNone(claim_bulk_email_job())
+        BulkEmailJob.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_bulk_email_jobs(), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (BulkEmailJob.STATUS_DONE, 0))
+
+    def test_job_fails_after_too_many_connection_attempts(self):
+        job = self.queue(['a@example.com'])
+        BulkEmailJob.objects.update(attempts=BULK_EMAIL_MAX_ATTEMPTS - 1)
+        connection = mock.Mock()
+        connection.open.side_effect = OSError('Connection refused')
+        with mock.patch('member.helpers.emails.get_connection', return_value=connection):
+            self.assertEqual(process_bulk_email_jobs(), 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, BulkEmailJob.STATUS_FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(claim_bulk_email_job())
+
+    def test_children_are_reached_through_their_parent(self):
+        parent = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        Member.objects.create_user(username='child', email='child@example.com', password='x', role='child', parent=parent)
+        Member.objects.create_user(username='orphan', email='orphan@example.com', password='x', role='child')
+        Member.objects.create_user(username='other', email='other@example.com', password='x', role='protector')
+
+        emails = get_member_emails(Member.objects.order_by('username'))
+        self.assertEqual(emails, ['parent@example.com', 'other@example.com', 'parent@example.com'])
+        self.assertEqual(self.queue(emails).total, 2)
+
+
+class OrganizationClosureTests(TestCase):
+
+    def create(self, name, parent=None):
+        return Organization.objects.create(
+            name=name, username=name, email=f'{name}@example.com', staff_name='Staff',
+            address='Address', city='City', country='Country', parent=parent,
+        )
+
+    def links(self):
+        return set(OrganizationClosure.objects.values_list('ancestor__name', 'descendant__name', 'depth'))
+
+    def setUp(self):
+        self.root = self.create('root')
+        self.branch = self.create('branch', self.root)
+        self.leaf = self.create('leaf', self.branch)
+        self.other = self.create('other')
+
+    def test_new_organizations_are_linked_to_their_ancestors(self):
+        self.assertEqual(self.links(), {
+            ('root', 'root', 0), ('branch', 'branch', 0), ('leaf', 'leaf', 0), ('other', 'other', 0),
+            ('root', 'branch', 1), ('root', 'leaf', 2), ('branch', 'leaf', 1),
+        })
+        self.assertEqual([organization.name for organization in self.leaf.get_ancestors()], ['root', 'branch'])
+
+    def test_moving_a_branch_moves_its_subtree(self):
+        self.branch.parent = self.other
+        self.branch.save()
+
+        self.assertEqual(set(self.other.get_descendant_ids()), {self.other.pk, self.branch.pk, self.leaf.pk})
+        self.assertEqual(self.root.get_descendant_ids(), [self.root.pk])
+        self.assertIn(('other', 'leaf', 2), self.links())
+
+    def test_organizations_cannot_move_under_their_own_branches(self):
+        before = self.links()
+        self.root.parent = self.leaf
+        with self.assertRaises(ValidationError):
+            self.root.full_clean()
+        with self.assertRaises(ValidationError):
+            self.root.save()
+
+        self.assertIsNone(Organization.objects.get(pk=self.root.pk).parent_id)
+        self.assertEqual(self.links(), before)
+
+    def test_rebuild_restores_the_table(self):
+        before = self.links()
+        OrganizationClosure.objects.filter(depth__gt=0).delete()
+        call_command('rebuild_organization_closure', stdout=StringIO())
+        self.assertEqual(self.links(), before)
+
+    def test_children_of_all_branches(self):
+        in_leaf = Member.objects.create_user(username='child1', email='child1@example.com', password='x', role='child')
+        in_leaf.organizations.add(self.leaf, self.branch)
+        in_other = Member.objects.create_user(username='child2', email='child2@example.com', password='x', role='child')
+        in_other.organizations.add(self.other)
+        parent = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        parent.organizations.add(self.root)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(self.root.get_children()), [in_leaf])
+        self.assertEqual(list(self.branch.get_children()), [in_leaf])
+
+
+class BenchmarkCommandTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.benchmark_media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.benchmark_media_root, ignore_errors=True)
+
+    def test_seed_and_benchmark(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            call_command(
+                'seed_benchmark_data', '--noinput', '--organizations=1', '--branches=1', '--protectors=2',
+                '--children=2', '--works=10', '--tags=3', '--likes=5', '--contests=1', '--applications=2',
+                f'--media-root={self.benchmark_media_root}', stdout=StringIO(),
+            )
+        self.assertEqual(Member.objects.filter(role='child', username__startswith='bench_').count(), 4)
+        self.assertEqual(Work.objects.count(), 10)
+        # The real media directory is left alone
+        self.assertEqual(os.listdir(self.media_root), [])
+        self.assertTrue(os.listdir(os.path.join(self.benchmark_media_root, 'works')))
+
+        output = os.path.join(self.benchmark_media_root, 'results.json')
+        call_command(
+            'benchmark_endpoints', '--iterations=1', '--warmup=0', '--endpoint=artworks', '--endpoint=contests',
+            f'--output={output}', stdout=StringIO(),
+        )
+        with open(output) as f:
+            results = json.load(f)['results']
+        self.assertEqual(sorted(results), ['artworks', 'contests'])
+        self.assertGreater(results['artworks']['queries'], 0)
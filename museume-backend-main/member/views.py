@@ -19,6 +19,7 @@ from .models import Member, Organization
 from .pagination import CustomPageNumberPagination
 from rest_framework import filters
 from rest_framework.generics import ListAPIView
+from museum_app.conditional import ConditionalGetMixin
 from museum_app.permissions import IsChild 
 from rest_framework import serializers
 
@@ -172,6 +173,8 @@ class PasswordResetConfirmView(generics.GenericAPIView):
 class ProfileListView(generics.ListAPIView):
     serializer_class = ProfileSerializer
     permission_classes = [IsAuthenticated]
+    # authentication, members, organizations, shared users, siblings, viewer's shared users
+    query_budget = 6
 
     def get_queryset(self):
         # Return only the children of the authenticated protector
@@ -213,7 +216,7 @@ class ProfileLoginView(generics.GenericAPIView):
 
         return Response(serializer.create_response(), status=status.HTTP_200_OK)
     
-class OrganizationListView(ListAPIView):
+class OrganizationListView(ConditionalGetMixin, ListAPIView):
     permission_classes = [IsChild]
     serializer_class = OrganizationSerializer
     pagination_class = CustomPageNumberPagination
@@ -0,0 +1,55 @@
+"""
+Async API views.
+
+DRF's APIView only dispatches synchronously. AsyncAPIView runs the usual
+request setup (authentication, permissions, throttling) in a thread with
+``sync_to_async`` and then awaits an ``async def`` handler, so a worker
+waiting on Stripe or another HTTP API is free to serve other requests.
+
+Handlers must not touch the ORM directly: use the async queryset methods
+(``aget``, ``acreate``, ...) or wrap the call in ``sync_to_async``, and
+``select_related`` anything read from related objects.
+
+Async views are used when ASYNC_VIEWS is set, i.e. when the app is served
+by uvicorn workers (see gunicorn.conf.py); under WSGI every request
+runs in its own thread anyway and the sync views are routed instead.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication can load the user from the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def select_view(sync_view, async_view):
+    """The view class to route: async_view when ASYNC_VIEWS is enabled."""
+    return async_view if getattr(settings, 'ASYNC_VIEWS', False) else sync_view
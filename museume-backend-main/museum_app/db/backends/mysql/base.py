@@ -0,0 +1,51 @@
+"""
+MySQL backend recording connection reuse and handshake time.
+
+Behaves exactly like ``django.db.backends.mysql``; see museum_app/db/metrics.py
+for what is recorded.
+"""
+import time
+
+from django.db.backends.mysql import base
+
+from museum_app.db.metrics import log_connection_stats_if_due, record_connection_stats
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Whether the connection was used since the last close_old_connections()
+        self.checked_out = False
+        self.checkout = None
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - started
+        record_connection_stats(self.alias, connects=1, connect_seconds=elapsed)
+        if self.checked_out:
+            self.checkout['connect_ms'] += elapsed * 1000
+
+    def ensure_connection(self):
+        if not self.checked_out:
+            self.checked_out = True
+            self.checkout = {'reused': self.connection is not None, 'connect_ms': 0.0}
+            record_connection_stats(self.alias, checkouts=1, reused=int(self.checkout['reused']))
+            log_connection_stats_if_due()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        was_open = self.connection is not None
+        super().close_if_health_check_failed()
+        if was_open and self.connection is None:
+            record_connection_stats(self.alias, health_check_failures=1)
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and end of every request. Its autocommit check
+        # goes through ensure_connection() and must not count as a checkout.
+        self.checked_out = True
+        try:
+            super().close_if_unusable_or_obsolete()
+        finally:
+            self.checked_out = False
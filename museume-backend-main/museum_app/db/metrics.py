@@ -0,0 +1,93 @@
+"""
+Database connection metrics.
+
+With persistent connections (CONN_MAX_AGE) each worker thread keeps one
+connection per database and reuses it across requests, so the TCP and
+authentication handshake only happens when a connection is first opened,
+expires or fails its health check (CONN_HEALTH_CHECKS). The MySQL backend
+in museum_app/db/backends/mysql records, per database alias and process:
+
+- checkouts: requests (or other units of work between
+  ``close_old_connections()`` calls) that used the database
+- reused: checkouts served by an already open connection
+- connects and connect_seconds: new connections and the time spent
+  opening them, i.e. what a request waits for before its first query
+- health_check_failures: persistent connections found dead and replaced
+
+get_connection_stats() adds the reuse ratio and mean connect time. The
+counters live in each process, so every process logs its own totals as a
+JSON line on this module's logger every DB_STATS_LOG_INTERVAL seconds. The
+query budget middleware also reports each request's own connection use.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+
+DB_STATS_LOG_INTERVAL = getattr(settings, 'DB_STATS_LOG_INTERVAL', 300)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_last_logged = time.monotonic()
+_stats = defaultdict(lambda: {
+    'checkouts': 0,
+    'reused': 0,
+    'connects': 0,
+    'connect_seconds': 0.0,
+    'health_check_failures': 0,
+})
+
+
+def record_connection_stats(alias, **values):
+    with _lock:
+        stats = _stats[alias]
+        for name, value in values.items():
+            stats[name] += value
+
+
+def get_connection_stats():
+    """Return {alias: stats} for this process, including reuse_ratio and mean_connect_ms."""
+    with _lock:
+        result = {alias: dict(stats) for alias, stats in _stats.items()}
+    for stats in result.values():
+        stats['reuse_ratio'] = round(stats['reused'] / stats['checkouts'], 3) if stats['checkouts'] else None
+        stats['mean_connect_ms'] = round(stats['connect_seconds'] * 1000 / stats['connects'], 2) if stats['connects'] else None
+    return result
+
+
+def log_connection_stats():
+    for alias, stats in get_connection_stats().items():
+        logger.info(json.dumps({'event': 'db_connections', 'pid': os.getpid(), 'alias': alias, **stats}))
+
+
+def log_connection_stats_if_due():
+    """Log this process's totals if DB_STATS_LOG_INTERVAL has passed since the last time."""
+    global _last_logged
+    if not DB_STATS_LOG_INTERVAL:
+        return
+    now = time.monotonic()
+    with _lock:
+        if now - _last_logged < DB_STATS_LOG_INTERVAL:
+            return
+        _last_logged = now
+    log_connection_stats()
+
+
+def reset_connection_stats():
+    with _lock:
+        _stats.clear()
+
+
+def get_current_checkouts():
+    """Connection use of the current request: {alias: {'reused': bool, 'connect_ms': float}}."""
+    return {
+        connection.alias: dict(connection.checkout)
+        for connection in connections.all(initialized_only=True)
+        if getattr(connection, 'checked_out', False)
+    }
@@ -0,0 +1,170 @@
+"""
+Per-request database query instrumentation.
+
+QueryBudgetMiddleware records every SQL query a request runs (count, total
+time, and how often each query "shape" repeats, which is how N+1 patterns
+show up) and reports it as:
+
+- a ``Server-Timing`` response header (``db;dur=12.3;desc="8 queries"``,
+  plus ``dbconnect`` for time spent opening connections, see
+  museum_app/db/metrics.py)
+- one structured log line per request on the ``museum_app.querybudget`` logger
+
+Views can declare a budget with a ``query_budget`` attribute (class-based
+views) or the ``query_budget`` decorator (function views). Exceeding it logs
+a warning, or raises QueryBudgetExceeded when QUERY_BUDGET_STRICT is set,
+which makes the offending request fail in tests.
+
+Controlled by the QUERY_BUDGET_ENABLED and QUERY_BUDGET_STRICT settings.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .db.metrics import get_current_checkouts
+
+logger = logging.getLogger('museum_app.querybudget')
+
+# Collapse literal values and IN (...) lists so that repeated queries with
+# different parameters share one shape
+IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|[-\d.]+|\'[^\']*\')\s*,?)+\)', re.IGNORECASE)
+NUMBER = re.compile(r'\b\d+\b')
+STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def normalize_sql(sql):
+    """Reduce a SQL statement to its shape (parameters and literals removed)."""
+    sql = STRING.sub('?', sql)
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = NUMBER.sub('?', sql)
+    return ' '.join(sql.split())
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` callable collecting query statistics.
+
+    Attributes:
+        count: Number of queries
+        duration: Total time spent in the database, in seconds
+        shapes: Counter of normalized SQL -> number of executions
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[normalize_sql(sql)] += 1
+
+    @property
+    def duplicates(self):
+        """Query shapes executed more than once, most repeated first."""
+        return {shape: count for shape, count in self.shapes.most_common() if count > 1}
+
+    @contextmanager
+    def record(self):
+        """Record queries on every database connection inside the block."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+
+def query_budget(max_queries):
+    """Set the query budget of a function-based view."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_view_query_budget(view_func):
+    view_class = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None)
+    return getattr(view_class, 'query_budget', None) or getattr(view_func, 'query_budget', None)
+
+
+class QueryBudgetMiddleware:
+    """Record per-request query statistics and enforce per-view query budgets."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+            return self.get_response(request)
+
+        request.query_budget = None
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+
+        response['Server-Timing'] = 'db;dur=%.1f;desc="%d queries"' % (recorder.duration * 1000, recorder.count)
+        checkouts = get_current_checkouts()
+        if checkouts:
+            connect_ms = sum(checkout['connect_ms'] for checkout in checkouts.values())
+            response['Server-Timing'] += ', dbconnect;dur=%.1f' % connect_ms
+        self.report(request, response, recorder, checkouts)
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI the queries run in threads of their own, outside the
+        # recorder's reach; only sync (WSGI) requests are instrumented
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'query_budget'):
+            request.query_budget = get_view_query_budget(view_func)
+        return None
+
+    def report(self, request, response, recorder, checkouts=None):
+        budget = request.query_budget
+        over_budget = budget is not None and recorder.count > budget
+        resolver_match = getattr(request, 'resolver_match', None)
+        record = {
+            'event': 'query_budget',
+            'method': request.method,
+            'path': request.path,
+            'view': resolver_match.view_name if resolver_match else None,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 1),
+            'budget': budget,
+            'connections': checkouts or {},
+            'duplicates': [
+                {'sql': shape[:300], 'count': count}
+                for shape, count in list(recorder.duplicates.items())[:5]
+            ],
+        }
+        if over_budget:
+            logger.warning(json.dumps(record, ensure_ascii=False))
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(
+                    f"{request.method} {request.path} ran {recorder.count} queries (budget {budget})"
+                )
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
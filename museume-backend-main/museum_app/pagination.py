@@ -0,0 +1,124 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a ``(sort field, id)`` pair.
+
+    Each page is fetched with ``WHERE (created_at, id) < (last_created_at, last_id)``
+    style filtering instead of ``OFFSET``, and no ``COUNT(*)`` is issued, so
+    page 1000 costs the same as page 1. The cursor is an opaque token holding
+    the sort value and id of the last item on the previous page.
+
+    Views can override the ordering with a ``cursor_ordering`` attribute, e.g.
+    ``('-feed_created_at', '-id')`` for an annotated sort value. The last
+    field must be unique (the primary key) and all fields must share the same
+    direction.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'cursor_ordering', self.ordering))
+        self.sort_field = self.ordering[0].lstrip('-')
+        self.descending = self.ordering[0].startswith('-')
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request, queryset)
+        if cursor is not None:
+            value, pk = cursor
+            lookup = 'lt' if self.descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.sort_field}__{lookup}': value}) |
+                Q(**{self.sort_field: value, f'pk__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        value = getattr(last, self.sort_field)
+        cursor = self.encode_cursor(value.isoformat() if hasattr(value, 'isoformat') else value, last.pk)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, value, pk):
+        payload = json.dumps({'v': value, 'id': pk}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return self.to_python(queryset, payload['v']), int(payload['id'])
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, queryset, value):
+        try:
+            return queryset.model._meta.get_field(self.sort_field).to_python(value)
+        except FieldDoesNotExist:
+            # Annotated sort values (e.g. feed timestamps) are datetimes or plain values
+            return parse_datetime(value) or value if isinstance(value, str) else value
+
+
+class KeysetOrPageNumberPagination(BasePagination):
+    """
+    Keyset pagination by default, with page numbers kept as an opt-in.
+
+    Requests that pass ``?page=`` (existing clients) or a search query
+    (results are ordered by relevance, not by the keyset) get the classic
+    ``PageNumberPagination`` response with ``count``/``next``/``previous``.
+    Everything else is paginated by cursor.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_page_numbers(request):
+            self.paginator = PageNumberPagination()
+            self.paginator.page_query_param = self.page_query_param
+            if not self.is_search(request):
+                # Same order as the cursor pages, so OFFSET pages are stable
+                # when several rows share a timestamp
+                queryset = queryset.order_by(*getattr(view, 'cursor_ordering', KeysetPagination.ordering))
+        else:
+            self.paginator = KeysetPagination()
+        self.paginator.page_size = self.page_size
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def use_page_numbers(self, request):
+        return self.page_query_param in request.query_params or self.is_search(request)
+
+    def is_search(self, request):
+        return bool(request.query_params.get(api_settings.SEARCH_PARAM))
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
@@ -0,0 +1,230 @@
+"""
+Read replica routing.
+
+Replicas are extra DATABASES entries named ``replica1``, ``replica2``, ...
+built from the DB_REPLICAS setting. ReplicaRoutingMiddleware marks GET and
+HEAD API requests as replica-safe; within such a request ReplicaRouter
+sends reads to one healthy replica (the same one for the whole request).
+Everything else goes to the primary: writes, requests that are not
+replica-safe, management commands, reads inside a transaction and reads
+after a write in the same request.
+
+Read-your-writes: after a successful write request the user is pinned to
+the primary for REPLICA_PIN_SECONDS, both by a short-lived cookie and by a
+default cache key on their user id. The id is taken from the JWT without
+a query, so clients that do not keep cookies are pinned too.
+
+Lag: each process checks a replica's replication lag at most every
+REPLICA_LAG_CHECK_INTERVAL seconds and skips replicas that are more than
+REPLICA_MAX_LAG seconds behind, not replicating or unreachable. When no
+replica is usable, reads fall back to the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+REPLICA_PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+REPLICA_PIN_COOKIE = getattr(settings, 'REPLICA_PIN_COOKIE', 'db_primary')
+REPLICA_MAX_LAG = getattr(settings, 'REPLICA_MAX_LAG', 5)
+REPLICA_LAG_CHECK_INTERVAL = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 10)
+REPLICA_PATH_PREFIXES = tuple(getattr(settings, 'REPLICA_PATH_PREFIXES', ('/api/',)))
+
+logger = logging.getLogger(__name__)
+
+_routing = ContextVar('replica_routing', default=None)
+_health = {}
+_health_lock = threading.Lock()
+
+
+class RoutingState:
+    """Replica choice of one replica-safe request."""
+
+    def __init__(self):
+        self.use_replicas = True
+        self.replica = None
+
+
+def get_replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def get_replica_lag(alias):
+    """
+    Seconds the replica is behind the primary, or None if it is not
+    replicating. Stand-ins that are not MySQL replicas report 0.
+    """
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return 0
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except DatabaseError:
+            # MySQL before 8.0.22
+            cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            # Not configured as a replica, e.g. a second server used as a stand-in
+            return 0
+        status = dict(zip([column[0] for column in cursor.description], row))
+    return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+
+def is_replica_healthy(alias):
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+
+    with _health_lock:
+        checked = _health.get(alias)
+        if checked and now - checked[0] < REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        try:
+            lag = get_replica_lag(alias)
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable", alias, exc_info=True)
+            lag = None
+        healthy = lag is not None and lag <= REPLICA_MAX_LAG
+        if not healthy and lag is not None:
+            logger.warning("Replica %s is %s seconds behind, reading from the primary", alias, lag)
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def get_healthy_replicas():
+    return [alias for alias in get_replica_aliases() if is_replica_healthy(alias)]
+
+
+def clear_replica_health():
+    _health.clear()
+
+
+def get_token_user_id(request):
+    """User id from the request's JWT, validated without a database query."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def get_pin_key(user_id):
+    return f'db:primary:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(get_pin_key(user_id), True, REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(request):
+    if REPLICA_PIN_COOKIE in request.COOKIES:
+        return True
+    user_id = get_token_user_id(request)
+    return user_id is not None and cache.get(get_pin_key(user_id), False)
+
+
+def start_replica_reads():
+    """Allow reads from replicas until the returned token is passed to stop_replica_reads()."""
+    return _routing.set(RoutingState())
+
+
+def stop_replica_reads(token):
+    _routing.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            replicas = get_healthy_replicas()
+            state.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # Later reads in the same request must see the write
+        state = _routing.get()
+        if state is not None:
+            state.use_replicas = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Let GET/HEAD API requests read from replicas, and pin users to the primary after writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not get_replica_aliases():
+            return self.get_response(request)
+
+        token = start_replica_reads() if self.is_replica_safe(request) else None
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                stop_replica_reads(token)
+        self.pin_after_write(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not get_replica_aliases():
+            return await self.get_response(request)
+
+        # The routing state is a context variable, so it follows the request
+        # into the threads running its ORM calls
+        token = start_replica_reads() if await sync_to_async(self.is_replica_safe)(request) else None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                stop_replica_reads(token)
+        await sync_to_async(self.pin_after_write)(request, response)
+        return response
+
+    def is_replica_safe(self, request):
+        return (
+            request.method in ('GET', 'HEAD')
+            and request.path.startswith(REPLICA_PATH_PREFIXES)
+            and not is_pinned_to_primary(request)
+        )
+
+    def pin_after_write(self, request, response):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+            return
+        # DRF sets request.user on the underlying request once authenticated
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
+        response.set_cookie(REPLICA_PIN_COOKIE, '1', max_age=REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
@@ -136,6 +136,10 @@ FRONTEND_URL = os.getenv('FRONTEND_URL')  # Change this to your actual frontend
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY')
 
+# Artwork search backend (dotted path). Empty = pick by database vendor:
+# MySQL FULLTEXT (n-gram) on MySQL, substring match elsewhere. See work/search.py
+WORK_SEARCH_BACKEND = os.getenv('WORK_SEARCH_BACKEND') or None
+
 
 
 
@@ -145,6 +149,17 @@ AUTH_USER_MODEL = 'member.Member'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Hash uploads (SHA-256, used for image dedupe) while they stream in
+FILE_UPLOAD_HANDLERS = [
+    'work.uploadhandlers.HashingMemoryFileUploadHandler',
+    'work.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Artwork image variants (see work/images.py)
+IMAGE_VARIANT_SIZES = {'thumbnail': 400, 'medium': 1200}
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', '2'))
+IMAGE_VARIANTS_ASYNC = os.getenv('IMAGE_VARIANTS_ASYNC', 'True').lower() in ('true', '1', 'yes')
+
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -157,6 +172,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # 'member.middleware.AdminLanguageMiddleware',
     'member.middleware.APILanguageMiddleware',
+    'museum_app.routers.ReplicaRoutingMiddleware',
+    'museum_app.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'museum_app.urls'
@@ -183,17 +200,97 @@ WSGI_APPLICATION = 'museum_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# ASGI mode: served by uvicorn workers (see gunicorn.conf.py), with async
+# versions of the views that wait on Stripe (see museum_app/async_views.py)
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes')
+
+# DB_ENGINE can point at another backend, e.g. django.db.backends.sqlite3
+# with DB_NAME set to a file for a local benchmark database. The default
+# engine is Django's MySQL backend plus connection metrics
+# (museum_app/db/metrics.py).
+# Connections are persistent: each worker thread keeps its connection for
+# DB_CONN_MAX_AGE seconds (0 closes it after every request) and checks it
+# is still alive before reusing it in a new request. A worker therefore
+# holds at most one connection per thread (GUNICORN_THREADS, see
+# gunicorn.conf.py); keep workers x threads below MySQL's max_connections.
+# Under ASGI each request's ORM calls run in a thread of its own, so
+# connections cannot be reused and are closed after every request.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': os.getenv('DB_ENGINE', 'museum_app.db.backends.mysql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0' if ASYNC_VIEWS else '300')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Every DB_STATS_LOG_INTERVAL seconds each process logs its connection
+# counters (museum_app/db/metrics.py) at INFO on the museum_app.db.metrics
+# logger; 0 turns the log line off
+DB_STATS_LOG_INTERVAL = int(os.getenv('DB_STATS_LOG_INTERVAL', '300'))
+
+# Read replicas (see museum_app/routers.py): a comma-separated list of
+# host[:port] sharing the default database's engine and credentials, or of
+# database files when DB_ENGINE is SQLite (a local stand-in)
+for index, replica in enumerate(filter(None, (r.strip() for r in os.getenv('DB_REPLICAS', '').split(','))), start=1):
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        location = {'NAME': replica}
+    else:
+        host, _sep, port = replica.partition(':')
+        location = {'HOST': host, 'PORT': port or DATABASES['default']['PORT']}
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], **location, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['museum_app.routers.ReplicaRouter']
+# Seconds a user reads from the primary after one of their writes
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+# Replicas further behind than this (seconds) are skipped; lag is checked
+# at most every REPLICA_LAG_CHECK_INTERVAL seconds per process
+REPLICA_MAX_LAG = int(os.getenv('REPLICA_MAX_LAG', '5'))
+REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('REPLICA_LAG_CHECK_INTERVAL', '10'))
+
+# Cache
+# Local memory by default (per process). Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared cache (e.g. django.core.cache.backends.redis.RedisCache) so that
+# invalidations are seen by every instance. Required wherever the Stripe
+# event worker runs (process_stripe_events checks it, see billing/checks.py):
+# it invalidates cached entitlements for the web workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+    # Rendered work representations (see work/fragments.py). Entries are
+    # versioned by key, so a per-process or file-based cache
+    # (django.core.cache.backends.filebased.FileBasedCache with a directory
+    # as FRAGMENT_CACHE_LOCATION) never serves stale data.
+    'fragments': {
+        'BACKEND': os.getenv('FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('FRAGMENT_CACHE_LOCATION', 'fragments'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', '10000'))},
+    },
+}
+
+# Seconds a rendered work representation is kept
+WORK_FRAGMENT_CACHE_TIMEOUT = int(os.getenv('WORK_FRAGMENT_CACHE_TIMEOUT', '3600'))
+
+# Longest time a process serves its in-memory set of active advertisements
+# without checking for admin edits (see advertisement/serving.py)
+AD_CACHE_MAX_AGE = int(os.getenv('AD_CACHE_MAX_AGE', '300'))
+
+# Seconds a resolved subscription/plan stays cached (see billing/entitlements.py)
+ENTITLEMENT_CACHE_TIMEOUT = int(os.getenv('ENTITLEMENT_CACHE_TIMEOUT', '300'))
+
+# Per-request query instrumentation (see museum_app/middleware.py): adds a
+# Server-Timing header and logs query count/time and repeated queries. With
+# QUERY_BUDGET_STRICT, views exceeding their query_budget raise instead of
+# logging a warning (enabled for tests by museum_app.testing).
+QUERY_BUDGET_ENABLED = os.getenv('QUERY_BUDGET_ENABLED', str(DEBUG)).lower() in ('true', '1', 'yes')
+QUERY_BUDGET_STRICT = os.getenv('QUERY_BUDGET_STRICT', 'False').lower() in ('true', '1', 'yes')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -0,0 +1,79 @@
+"""
+Test helpers for query budgets (see museum_app/middleware.py).
+
+    class WorkViewTests(QueryBudgetTestMixin, APITestCase):
+        def test_list(self):
+            with self.assertQueryBudget(5):
+                self.client.get('/api/artworks/')
+
+Tests using the mixin run with the middleware in strict mode, so any request
+to a view whose ``query_budget`` is exceeded fails with QueryBudgetExceeded.
+
+QueryPlanTestMixin checks that a queryset is served by indexes, using
+MySQL's ``EXPLAIN FORMAT=JSON``; tests using it should be skipped on other
+databases.
+"""
+import json
+from contextlib import contextmanager
+
+from django.test import override_settings
+
+from .middleware import QueryRecorder
+
+
+class QueryBudgetTestMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        strict = override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_STRICT=True)
+        strict.enable()
+        cls.addClassCleanup(strict.disable)
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, allow_duplicates=False):
+        """
+        Fail if the block runs more than max_queries queries, or (unless
+        allow_duplicates) runs the same query shape more than once.
+        """
+        recorder = QueryRecorder()
+        with recorder.record():
+            yield recorder
+
+        self.assertLessEqual(
+            recorder.count, max_queries,
+            f"{recorder.count} queries executed, budget is {max_queries}",
+        )
+        if not allow_duplicates:
+            self.assertEqual(
+                recorder.duplicates, {},
+                "Repeated queries (possible N+1):\n" + "\n".join(
+                    f"{count}x {shape}" for shape, count in recorder.duplicates.items()
+                ),
+            )
+
+
+class QueryPlanTestMixin:
+
+    def assertIndexedPlan(self, queryset, allow_filesort=False):
+        """Fail if the MySQL plan of queryset scans a whole table or (unless allow_filesort) sorts rows."""
+        plan = json.loads(queryset.explain(format='json'))
+        problems = []
+        for node in _walk_plan(plan):
+            if node.get('access_type') == 'ALL':
+                problems.append(f"full scan of {node.get('table_name')}")
+            if node.get('using_filesort') and not allow_filesort:
+                problems.append('filesort')
+        self.assertEqual(problems, [], f"{queryset.query}\n{json.dumps(plan, indent=2)}")
+
+
+def _walk_plan(node):
+    if isinstance(node, dict):
+        yield node
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return
+    for child in children:
+        yield from _walk_plan(child)
@@ -1,8 +1,9 @@
 from rest_framework.generics import ListAPIView
+from museum_app.conditional import ConditionalGetMixin
 from .models import PublicNavBar
 from .serializers import PublicNavBarSerializer
 
-class PublicNavBarListAPIView(ListAPIView):
+class PublicNavBarListAPIView(ConditionalGetMixin, ListAPIView):
     """
     API view to retrieve the list of PublicNavBar items.
     """
@@ -26,7 +26,8 @@ def test_inquiry_email():
             subject=f"[問い合わせ] {context['subject']}",
             context=context,
             recipient_email=["contact@museume.art", "info@seso-j.com"],
-            reply_to=context['email']
+            reply_to=context['email'],
+            immediate=True
         )
         print("✅ メール送信成功！")
     except Exception as e:
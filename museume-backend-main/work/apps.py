@@ -5,4 +5,7 @@ from django.apps import AppConfig
 class WorkConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'work'
-    verbose_name = _("work")
\ No newline at end of file
+    verbose_name = _("work")
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,85 @@
+"""
+Family gallery feed.
+
+The family gallery (SiblingGalleryView) lists the public works of a child
+and their siblings, newest first. It used to resolve the siblings on every
+request and filter Work with ``member__id__in``; instead every work that
+belongs in a gallery has a FamilyFeedEntry keyed on its family, so a page
+is a single range scan of the ``(family, -created_at, -work)`` index.
+
+A child's family is their parent account; a child without a parent is a
+family of their own. Entries are kept in sync by the signals in
+``work/signals.py`` when a work is saved (published or unpublished) and
+when a child joins, leaves or loses their family. The
+``rebuild_family_feed`` command rebuilds them from scratch.
+"""
+from django.db import connection
+
+from member.models import Member
+
+from .models import FamilyFeedEntry, Work
+
+
+def get_family_id(member):
+    """Return the id of the member whose family gallery ``member`` belongs to."""
+    return member.parent_id or member.pk
+
+
+def is_in_family_feed(work, member):
+    return member.role == 'child' and work.is_public and work.public_visibility == 'public'
+
+
+def update_feed_entry(work):
+    """Add, move or remove the feed entry of a single work."""
+    if Work.member.is_cached(work):
+        member = work.member
+    else:
+        member = Member.objects.only('parent_id', 'role').get(pk=work.member_id)
+
+    if is_in_family_feed(work, member):
+        _write_entries([_build_entry(work.pk, member.pk, member.parent_id, work.created_at)])
+    else:
+        FamilyFeedEntry.objects.filter(work_id=work.pk).delete()
+
+
+def rebuild_feed_entries(queryset=None, batch_size=500):
+    """
+    Rebuild feed entries for the given works (all works by default).
+
+    Returns:
+        int: Number of entries written
+    """
+    if queryset is None:
+        queryset = Work.objects.all()
+    FamilyFeedEntry.objects.filter(work__in=queryset.values('pk')).delete()
+
+    visible = queryset.filter(
+        member__role='child',
+        public_visibility='public',
+        is_public=True,
+    ).values_list('pk', 'member_id', 'member__parent_id', 'created_at')
+
+    written = 0
+    entries = []
+    for row in visible.iterator(chunk_size=batch_size):
+        entries.append(_build_entry(*row))
+        if len(entries) >= batch_size:
+            written += _write_entries(entries)
+            entries = []
+    if entries:
+        written += _write_entries(entries)
+    return written
+
+
+def _build_entry(work_id, member_id, parent_id, created_at):
+    return FamilyFeedEntry(work_id=work_id, member_id=member_id, family_id=parent_id or member_id, created_at=created_at)
+
+
+def _write_entries(entries):
+    FamilyFeedEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['work'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=['family', 'member', 'created_at'],
+    )
+    return len(entries)
@@ -0,0 +1,64 @@
+"""
+Cached work representations.
+
+WorkSerializer output is the same for every viewer except for
+``is_liked_by_user`` and ``member.is_shared``. The shared part is cached per
+work in the ``fragments`` cache (see FRAGMENT_CACHE_* settings) and the
+viewer overlay is applied on top on every request.
+
+Keys contain the work's ``updated_at``, ``fragment_version`` and
+``like_count``, so any change to a work row makes old entries unreachable in
+every process, whatever the cache backend. Changes stored outside the work
+row (images, tags, the author's profile) bump ``fragment_version`` through
+the signals in work/signals.py; ``updated_at`` stays the time the work itself
+was last edited.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F, prefetch_related_objects
+
+from .models import Work
+
+FRAGMENT_CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'fragments')
+WORK_FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'WORK_FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def get_fragment_cache():
+    return caches[FRAGMENT_CACHE_ALIAS]
+
+
+def get_work_fragment_key(work, request):
+    # Image URLs are absolute, so the origin the request came in on is part of the key
+    origin = hashlib.md5(request.build_absolute_uri('/').encode()).hexdigest()[:8]
+    return f'work:repr:{work.pk}:{work.updated_at.timestamp():.6f}:{work.fragment_version}:{work.like_count}:{origin}'
+
+
+def get_work_representations(works, request, render):
+    """
+    Shared representations of works, rendered with render(work) on a miss.
+
+    Images and tags are only loaded (one prefetch for all misses) when
+    something has to be rendered, so a fully cached page needs no queries
+    for them.
+
+    Returns:
+        list: One dict per work, in the same order
+    """
+    cache = get_fragment_cache()
+    keys = [get_work_fragment_key(work, request) for work in works]
+    cached = cache.get_many(keys)
+
+    missing = [(key, work) for key, work in zip(keys, works) if key not in cached]
+    if missing:
+        prefetch_related_objects([work for _, work in missing], 'images', 'tags')
+        rendered = {key: render(work) for key, work in missing}
+        cache.set_many(rendered, WORK_FRAGMENT_CACHE_TIMEOUT)
+        cached.update(rendered)
+    return [cached[key] for key in keys]
+
+
+def touch_works(**filters):
+    """Bump the fragment_version of the matching works, invalidating their fragments."""
+    return Work.objects.filter(**filters).update(fragment_version=F('fragment_version') + 1)
@@ -0,0 +1,142 @@
+"""
+Responsive image variants for artwork uploads.
+
+Gallery tiles used to load the original upload (up to 5MB). After an Image
+is saved, a background worker renders smaller JPEG and WebP copies and
+stores them next to the original under ``works/``:
+
+- ``thumbnail`` / ``thumbnail_webp``: longest edge IMAGE_VARIANT_SIZES['thumbnail']
+- ``medium`` / ``medium_webp``: longest edge IMAGE_VARIANT_SIZES['medium']
+
+Jobs run on a small in-process thread pool after the transaction commits.
+They are not durable, so ``manage.py generate_image_variants`` picks up any
+image that is still missing its variants (e.g. after a restart).
+
+The variant files are deleted with their Image once the deletion commits.
+The original upload is left alone, as before.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image as PILImage, ImageOps
+
+from .fragments import touch_works
+from .models import Image
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANT_SIZES = getattr(settings, 'IMAGE_VARIANT_SIZES', {'thumbnail': 400, 'medium': 1200})
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+# (size name, model field, Pillow format, file extension)
+VARIANT_FIELDS = [
+    ('thumbnail', 'thumbnail', 'JPEG', 'jpg'),
+    ('thumbnail', 'thumbnail_webp', 'WEBP', 'webp'),
+    ('medium', 'medium', 'JPEG', 'jpg'),
+    ('medium', 'medium_webp', 'WEBP', 'webp'),
+]
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def schedule_image_variants(image_id):
+    """
+    Queue variant generation for an image once the current transaction commits.
+
+    With IMAGE_VARIANTS_ASYNC = False the variants are rendered inline, which
+    is handy for tests and management commands.
+    """
+    if getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, image_id))
+    else:
+        transaction.on_commit(lambda: generate_image_variants(image_id))
+
+
+def _run_in_worker(image_id):
+    close_old_connections()
+    try:
+        generate_image_variants(image_id)
+    except Exception:
+        logger.exception("Failed to generate variants for image %s", image_id)
+    finally:
+        close_old_connections()
+
+
+def render_variant(source, max_size, image_format):
+    """Return the encoded bytes of ``source`` resized to fit ``max_size``."""
+    variant = source.copy()
+    variant.thumbnail((max_size, max_size), PILImage.LANCZOS)
+    buffer = BytesIO()
+    if image_format == 'JPEG':
+        variant.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        variant.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def generate_image_variants(image_id):
+    """
+    Render and store all variants of one image.
+
+    Returns:
+        bool: False if the image no longer exists or has no file
+    """
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return False
+
+    with image.image.open('rb') as original:
+        source = PILImage.open(original)
+        source.draft('RGB', (max(IMAGE_VARIANT_SIZES.values()),) * 2)
+        source = ImageOps.exif_transpose(source).convert('RGB')
+
+    stem = os.path.splitext(os.path.basename(image.image.name))[0]
+    updates = {}
+    for size_name, field_name, image_format, extension in VARIANT_FIELDS:
+        data = render_variant(source, IMAGE_VARIANT_SIZES[size_name], image_format)
+        field = getattr(image, field_name)
+        field.save(f"{stem}_{size_name}.{extension}", ContentFile(data), save=False)
+        updates[field_name] = field.name
+
+    # update() avoids Image.save() and its hashing/auto_now side effects
+    if not Image.objects.filter(pk=image.pk).update(**updates):
+        # Deleted while rendering: nothing will ever clean these up
+        delete_files([(getattr(image, field_name).storage, name) for field_name, name in updates.items()])
+        return False
+    touch_works(pk=image.work_id)
+    return True
+
+
+def schedule_variant_deletion(image):
+    """Delete the variant files of a deleted image once the transaction commits."""
+    files = [
+        (field.storage, field.name)
+        for field in (getattr(image, field_name) for _size, field_name, _format, _extension in VARIANT_FIELDS)
+        if field
+    ]
+    if files:
+        transaction.on_commit(lambda: delete_files(files))
+
+
+def delete_files(files):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning("Failed to delete image variant %s", name, exc_info=True)
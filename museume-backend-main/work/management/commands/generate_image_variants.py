@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from work.images import generate_image_variants
+from work.models import Image
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and medium variants for artwork images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate variants for every image')
+
+    def handle(self, *args, **options):
+        images = Image.objects.all() if options['all'] else Image.objects.filter(Q(thumbnail__isnull=True) | Q(thumbnail=''))
+        generated = failed = 0
+        for image_id in images.values_list('id', flat=True).iterator():
+            try:
+                if generate_image_variants(image_id):
+                    generated += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Image {image_id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {generated} image(s), {failed} failed."))
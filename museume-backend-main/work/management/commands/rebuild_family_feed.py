@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from work.feed import rebuild_feed_entries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the family gallery feed entries from the current works'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of entries written per batch')
+
+    def handle(self, *args, **options):
+        written = rebuild_feed_entries(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} family feed entries."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from work.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the artwork search documents used by the gallery search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of works written per batch')
+
+    def handle(self, *args, **options):
+        written = rebuild_search_documents(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} search documents."))
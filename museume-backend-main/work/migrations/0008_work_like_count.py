@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-17 10:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_like_count(apps, schema_editor):
+    Work = apps.get_model('work', 'Work')
+    for work in Work.objects.annotate(num_likes=Count('likes')).filter(num_likes__gt=0).iterator():
+        Work.objects.filter(pk=work.pk).update(like_count=work.num_likes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0007_alter_work_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='work',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='like count'),
+        ),
+        migrations.RunPython(backfill_like_count, reverse_code=migrations.RunPython.noop),
+    ]
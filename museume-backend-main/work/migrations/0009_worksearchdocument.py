@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+FULLTEXT_INDEX_NAME = 'work_search_content_ft'
+
+
+def create_fulltext_index(apps, schema_editor):
+    # MySQL only: n-gram parser so CJK text without spaces is tokenized
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        f"ALTER TABLE work_worksearchdocument ADD FULLTEXT INDEX {FULLTEXT_INDEX_NAME} (content) WITH PARSER ngram"
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(f"ALTER TABLE work_worksearchdocument DROP INDEX {FULLTEXT_INDEX_NAME}")
+
+
+def build_search_documents(apps, schema_editor):
+    Work = apps.get_model('work', 'Work')
+    WorkSearchDocument = apps.get_model('work', 'WorkSearchDocument')
+    documents = []
+    for work in Work.objects.prefetch_related('tags').iterator(chunk_size=500):
+        parts = [work.title or '', work.description or ''] + [tag.name for tag in work.tags.all()]
+        documents.append(WorkSearchDocument(work_id=work.pk, content='\n'.join(part for part in parts if part)))
+    WorkSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0008_work_like_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkSearchDocument',
+            fields=[
+                ('work', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='work.work', verbose_name='work')),
+                ('content', models.TextField(blank=True, verbose_name='content')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, reverse_code=drop_fulltext_index),
+        migrations.RunPython(build_search_documents, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0009_worksearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='medium',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='works/', verbose_name='medium'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='medium_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='works/', verbose_name='medium (WebP)'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='works/', verbose_name='thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='thumbnail_webp',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='works/', verbose_name='thumbnail (WebP)'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_member_quotas(apps, schema_editor):
+    Work = apps.get_model('work', 'Work')
+    Image = apps.get_model('work', 'Image')
+    MemberQuota = apps.get_model('work', 'MemberQuota')
+    work_counts = dict(Work.objects.values('member').annotate(n=Count('id')).values_list('member', 'n'))
+    image_counts = dict(Image.objects.values('work__member').annotate(n=Count('id')).values_list('work__member', 'n'))
+    MemberQuota.objects.bulk_create([
+        MemberQuota(member_id=member_id, work_count=work_counts.get(member_id, 0), image_count=image_counts.get(member_id, 0))
+        for member_id in set(work_counts) | set(image_counts)
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0021_member_ulid'),
+        ('work', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberQuota',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quota', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='member')),
+                ('work_count', models.PositiveIntegerField(default=0, verbose_name='work count')),
+                ('image_count', models.PositiveIntegerField(default=0, verbose_name='image count')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'verbose_name': 'Member Quota',
+                'verbose_name_plural': 'Member Quotas',
+            },
+        ),
+        migrations.RunPython(backfill_member_quotas, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:32
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_usage_counts(apps, schema_editor):
+    Tag = apps.get_model('work', 'Tag')
+    Work = apps.get_model('work', 'Work')
+    usage = Work.tags.through.objects.filter(tag=OuterRef('pk')).order_by().values('tag').annotate(n=Count('id')).values('n')
+    Tag.objects.update(usage_count=Coalesce(Subquery(usage), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0012_tag_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='usage count'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-usage_count', 'name'], name='tag_popularity_idx'),
+        ),
+        migrations.RunPython(backfill_usage_counts, migrations.RunPython.noop),
+    ]
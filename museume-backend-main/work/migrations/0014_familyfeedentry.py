@@ -0,0 +1,46 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_family_feed(apps, schema_editor):
+    Work = apps.get_model('work', 'Work')
+    FamilyFeedEntry = apps.get_model('work', 'FamilyFeedEntry')
+    visible = Work.objects.filter(
+        member__role='child', public_visibility='public', is_public=True,
+    ).values_list('pk', 'member_id', 'member__parent_id', 'created_at')
+
+    entries = []
+    for work_id, member_id, parent_id, created_at in visible.iterator(chunk_size=500):
+        entries.append(FamilyFeedEntry(work_id=work_id, member_id=member_id, family_id=parent_id or member_id, created_at=created_at))
+        if len(entries) >= 500:
+            FamilyFeedEntry.objects.bulk_create(entries)
+            entries = []
+    FamilyFeedEntry.objects.bulk_create(entries)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0013_tag_usage_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FamilyFeedEntry',
+            fields=[
+                ('work', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_entry', serialize=False, to='work.work', verbose_name='work')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('family', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='family_feed', to=settings.AUTH_USER_MODEL, verbose_name='family')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='member')),
+            ],
+            options={
+                'verbose_name': 'Family Feed Entry',
+                'verbose_name_plural': 'Family Feed Entries',
+                'indexes': [models.Index(fields=['family', '-created_at', '-work'], name='family_feed_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_family_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.2 on 2026-10-17 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0014_familyfeedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='work',
+            index=models.Index(fields=['is_public', '-created_at', '-id'], name='work_public_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='work',
+            index=models.Index(fields=['member', '-created_at'], name='work_member_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='work',
+            index=models.Index(fields=['member', 'is_public', '-created_at'], name='work_member_public_idx'),
+        ),
+    ]
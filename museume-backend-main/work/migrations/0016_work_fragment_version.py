@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-17 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('work', '0015_view_access_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='work',
+            name='fragment_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='fragment version'),
+        ),
+    ]
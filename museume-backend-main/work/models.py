@@ -1,14 +1,22 @@
 from django.db import models
 from member.models import Member  # Assuming the user model is in the member app
-import hashlib
 from django.db import models
 from rest_framework.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.db.utils import IntegrityError
 class Image(models.Model):
     image = models.ImageField(upload_to='works/', verbose_name=_("image"))
     hash = models.CharField(max_length=64, unique=True, editable=False, verbose_name=_("hash"))  # SHA-256 hash for uniqueness
     work = models.ForeignKey('Work', on_delete=models.CASCADE, related_name='images', verbose_name=_("work"))
+    # Resized derivatives generated in the background by work.images (JPEG + WebP)
+    thumbnail = models.ImageField(upload_to='works/', null=True, blank=True, editable=False, verbose_name=_("thumbnail"))
+    thumbnail_webp = models.ImageField(upload_to='works/', null=True, blank=True, editable=False, verbose_name=_("thumbnail (WebP)"))
+    medium = models.ImageField(upload_to='works/', null=True, blank=True, editable=False, verbose_name=_("medium"))
+    medium_webp = models.ImageField(upload_to='works/', null=True, blank=True, editable=False, verbose_name=_("medium (WebP)"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
 
@@ -29,8 +37,8 @@ class Image(models.Model):
 
     def generate_image_hash(self):
         """Generate a unique hash based on the image file content."""
-        image_content = self.image.read()
-        return hashlib.sha256(image_content).hexdigest()
+        from .uploadhandlers import get_file_hash
+        return get_file_hash(self.image.file)
 
     def __str__(self):
         return f"Image {self.id} - Hash: {self.hash}"
@@ -39,6 +47,8 @@ class Image(models.Model):
 # Work limits per member type (RFP requirements)
 WORK_LIMIT_FREE = 20
 WORK_LIMIT_PAID = 100
+# Total image limit for members without a paid plan
+IMAGE_LIMIT_FREE = 50
 
 
 class Work(models.Model):
@@ -52,8 +62,14 @@ class Work(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name=_("price"))
     tags = models.ManyToManyField('Tag', related_name='works', blank=True, verbose_name=_("tags"))
     category = models.ForeignKey('Category', on_delete=models.SET_NULL, related_name='works', null=True, blank=True, verbose_name=_("category"))
+    # Denormalized number of likes, kept in sync by the Like signals in work/signals.py
+    like_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("like count"))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("created at"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+    # Bumped when data stored outside the work row changes (images, tags, the
+    # author's profile), so cached representations (work/fragments.py) are
+    # dropped without touching updated_at
+    fragment_version = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("fragment version"))
     # RFP: Default visibility should be private - changed from 'public' to 'private'
     public_visibility = models.CharField(
         max_length=50,
@@ -64,6 +80,13 @@ class Work(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Access paths of the gallery views (work/views.py): public works
+        # newest first, a member's own works, and a member's public works
+        indexes = [
+            models.Index(fields=['is_public', '-created_at', '-id'], name='work_public_recent_idx'),
+            models.Index(fields=['member', '-created_at'], name='work_member_recent_idx'),
+            models.Index(fields=['member', 'is_public', '-created_at'], name='work_member_public_idx'),
+        ]
         verbose_name = _("Work")
         verbose_name_plural = _("Works")
 
@@ -85,29 +108,28 @@ class Work(models.Model):
         Returns:
             int: Maximum number of works allowed
         """
-        # TODO: Check actual subscription/billing status
-        # For now, check if member has any active subscription
-        # This should be integrated with the billing app
-        if hasattr(member, 'subscriptions') and member.subscriptions.filter(is_active=True).exists():
+        from billing.entitlements import get_entitlement
+
+        if get_entitlement(member).is_premium:
             return WORK_LIMIT_PAID
         return WORK_LIMIT_FREE
 
     @classmethod
-    def can_create_work(cls, member):
+    def can_create_work(cls, member, lock=False):
         """
         Check if a member can create a new work based on their limit.
 
         Args:
             member: Member instance
+            lock: Lock the member's quota row (call inside transaction.atomic)
 
         Returns:
             tuple: (can_create: bool, message: str)
         """
-        current_count = cls.objects.filter(member=member).count()
-        limit = cls.get_work_limit(member)
+        usage = MemberQuota.usage(member, lock=lock)
 
-        if current_count >= limit:
-            return False, _("作品の上限（%(limit)s点）に達しました。") % {'limit': limit}
+        if usage['remaining_work_slots'] <= 0:
+            return False, _("作品の上限（%(limit)s点）に達しました。") % {'limit': usage['work_limit']}
         return True, ""
 
     @classmethod
@@ -121,23 +143,141 @@ class Work(models.Model):
         Returns:
             int: Number of works the member can still create
         """
-        current_count = cls.objects.filter(member=member).count()
-        limit = cls.get_work_limit(member)
-        return max(0, limit - current_count)
+        return MemberQuota.usage(member)['remaining_work_slots']
     
 
+class MemberQuota(models.Model):
+    """
+    Per-member usage counters for the work and image limits.
+
+    Replaces COUNT(*) queries over Work/Image on every upload and poll. The
+    counters are adjusted with F() expressions by the signals in
+    work/signals.py whenever a Work or Image is created or deleted; a row is
+    created lazily from the real counts the first time it is needed.
+    Upload validation locks the row (``for_member(member, lock=True)``)
+    so concurrent uploads cannot both pass the limit check.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, primary_key=True, related_name='quota', verbose_name=_("member"))
+    work_count = models.PositiveIntegerField(default=0, verbose_name=_("work count"))
+    image_count = models.PositiveIntegerField(default=0, verbose_name=_("image count"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+
+    class Meta:
+        verbose_name = _("Member Quota")
+        verbose_name_plural = _("Member Quotas")
+
+    def __str__(self):
+        return f"Quota for {self.member_id}: {self.work_count} works, {self.image_count} images"
+
+    @classmethod
+    def for_member(cls, member, lock=False):
+        """
+        Get (or lazily create) the quota row of a member.
+
+        Args:
+            member: Member instance
+            lock: Lock the row with SELECT ... FOR UPDATE (call inside transaction.atomic)
+
+        Returns:
+            MemberQuota
+        """
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        try:
+            return queryset.get(member=member)
+        except cls.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    member=member,
+                    work_count=Work.objects.filter(member=member).count(),
+                    image_count=Image.objects.filter(work__member=member).count(),
+                )
+        except IntegrityError:
+            # Created concurrently by another request
+            pass
+        return queryset.get(member=member)
+
+    @classmethod
+    def adjust(cls, member_id, works=0, images=0):
+        """Atomically add ``works``/``images`` (may be negative) to a member's counters."""
+        queryset = cls.objects.filter(member_id=member_id)
+        if works:
+            queryset.filter(work_count__gte=-works).update(work_count=F('work_count') + works)
+        if images:
+            queryset.filter(image_count__gte=-images).update(image_count=F('image_count') + images)
+
+    @classmethod
+    def usage(cls, member, lock=False):
+        """
+        Limits and current usage of a member in one call.
+
+        Args:
+            member: Member instance
+            lock: Lock the quota row (call inside transaction.atomic)
+
+        Returns:
+            dict: work_count, work_limit, remaining_work_slots, image_count,
+            image_limit (None = unlimited), subscription_active, is_premium
+        """
+        from billing.entitlements import get_entitlement
+
+        quota = cls.for_member(member, lock=lock)
+        entitlement = get_entitlement(member)
+        is_premium = entitlement.is_premium
+        work_limit = Work.get_work_limit(member)
+
+        return {
+            'work_count': quota.work_count,
+            'work_limit': work_limit,
+            'remaining_work_slots': max(0, work_limit - quota.work_count),
+            'image_count': quota.image_count,
+            'image_limit': None if is_premium else IMAGE_LIMIT_FREE,
+            'subscription_active': entitlement.active,
+            'is_premium': is_premium,
+        }
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True, verbose_name=_("name"))
+    # Number of works with this tag, kept up to date by the signals in
+    # work/signals.py; orders the tag picker
+    usage_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("usage count"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
 
     class Meta:
         verbose_name = _("Tag")
         verbose_name_plural = _("Tags")
+        indexes = [
+            models.Index(fields=['-usage_count', 'name'], name='tag_popularity_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def adjust_usage(cls, tag_ids, delta):
+        """
+        Atomically add delta (may be negative) to the usage count of the tags.
+        updated_at is bumped too, so the tag list ETag and caches change.
+        """
+        if not tag_ids or not delta:
+            return
+        cls.objects.filter(pk__in=tag_ids, usage_count__gte=-delta).update(
+            usage_count=F('usage_count') + delta, updated_at=timezone.now()
+        )
+
+    @classmethod
+    def refresh_usage_counts(cls, queryset=None):
+        """Recompute usage counts from Work.tags (after bulk imports)."""
+        usage = Work.tags.through.objects.filter(tag=OuterRef('pk')).order_by().values('tag').annotate(n=Count('id')).values('n')
+        return (queryset if queryset is not None else cls.objects.all()).update(
+            usage_count=Coalesce(Subquery(usage), 0), updated_at=timezone.now()
+        )
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name=_("name"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
 
     class Meta:
         verbose_name = _("Category")
@@ -146,6 +286,49 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class WorkSearchDocument(models.Model):
+    """
+    Denormalized search text for a Work (title, description and tag names).
+
+    Rebuilt by signals whenever a Work or its tags change, so that searching
+    only has to look at a single indexed column instead of joining tags.
+    On MySQL the ``content`` column carries a FULLTEXT index using the
+    n-gram parser (see migration 0009) so Japanese text is searchable.
+    """
+    work = models.OneToOneField(Work, on_delete=models.CASCADE, primary_key=True, related_name='search_document', verbose_name=_("work"))
+    content = models.TextField(blank=True, verbose_name=_("content"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("updated at"))
+
+    class Meta:
+        verbose_name = _("Search Document")
+        verbose_name_plural = _("Search Documents")
+
+    def __str__(self):
+        return f"Search document for work {self.work_id}"
+
+class FamilyFeedEntry(models.Model):
+    """
+    A public work as listed in its family's gallery (see work/feed.py).
+
+    ``family`` is the parent account of the work's author, or the author
+    itself for a child without a parent; ``created_at`` is copied from the
+    work so a family's gallery is one range scan of ``family_feed_idx``.
+    """
+    work = models.OneToOneField(Work, on_delete=models.CASCADE, primary_key=True, related_name='feed_entry', verbose_name=_("work"))
+    family = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='family_feed', verbose_name=_("family"))
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='+', verbose_name=_("member"))
+    created_at = models.DateTimeField(verbose_name=_("created at"))
+
+    class Meta:
+        verbose_name = _("Family Feed Entry")
+        verbose_name_plural = _("Family Feed Entries")
+        indexes = [
+            models.Index(fields=['family', '-created_at', '-work'], name='family_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Work {self.work_id} in family {self.family_id}"
+
 class Like(models.Model):
     member = models.ForeignKey(Member, on_delete=models.CASCADE)  # The user who liked the work
     work = models.ForeignKey('Work', on_delete=models.CASCADE, related_name='likes')  # The liked artwork
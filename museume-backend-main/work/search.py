@@ -0,0 +1,196 @@
+"""
+Artwork search.
+
+Searching used to be DRF's SearchFilter over ``title``, ``description`` and
+``tags__name``, i.e. ``LIKE '%q%'`` plus a join through the tags M2M, which
+scans every row. Instead each Work has a WorkSearchDocument holding its
+searchable text, kept up to date by the signals in ``work/signals.py``, and
+queries go through a pluggable backend:
+
+- MySQLFullTextSearchBackend: ``MATCH ... AGAINST`` on the n-gram FULLTEXT
+  index of WorkSearchDocument.content, ranked by relevance.
+- SimpleSearchBackend: ``icontains`` on the single document column, for
+  SQLite/local development.
+
+The backend can be forced with the ``WORK_SEARCH_BACKEND`` setting (dotted
+path); otherwise it is picked from the database vendor.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, F, FloatField, Func, IntegerField, Q, Value, When
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+from .models import Work, WorkSearchDocument
+
+# Characters with a special meaning in MySQL boolean full-text queries
+BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+
+def build_search_content(work):
+    """Return the searchable text for a work: title, description and tag names."""
+    parts = [work.title or '', work.description or '']
+    parts.extend(tag.name for tag in work.tags.all())
+    return '\n'.join(part for part in parts if part)
+
+
+def update_search_document(work):
+    """Create or refresh the search document of a single work."""
+    WorkSearchDocument.objects.update_or_create(
+        work_id=work.pk,
+        defaults={'content': build_search_content(work)},
+    )
+
+
+def rebuild_search_documents(queryset=None, batch_size=500):
+    """
+    Rebuild search documents for the given works (all works by default).
+
+    Returns:
+        int: Number of documents written
+    """
+    if queryset is None:
+        queryset = Work.objects.all()
+
+    written = 0
+    documents = []
+    for work in queryset.prefetch_related('tags').iterator(chunk_size=batch_size):
+        documents.append(WorkSearchDocument(work_id=work.pk, content=build_search_content(work)))
+        if len(documents) >= batch_size:
+            written += _write_documents(documents)
+            documents = []
+    if documents:
+        written += _write_documents(documents)
+    return written
+
+
+def _write_documents(documents):
+    WorkSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        # MySQL upserts on any unique key (ON DUPLICATE KEY UPDATE) and rejects a target
+        unique_fields=['work'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=['content', 'updated_at'],
+    )
+    return len(documents)
+
+
+def split_terms(query):
+    """Split a user query into search terms, dropping full-text operators."""
+    return [term for term in BOOLEAN_OPERATORS.sub(' ', query).split() if term]
+
+
+class MatchAgainst(Func):
+    """
+    ``MATCH(column) AGAINST (query IN BOOLEAN MODE)``.
+
+    The column is resolved through the queryset like any other expression,
+    so MATCH refers to the table alias the ORM picked for the join.
+    """
+    output_field = FloatField()
+
+    def __init__(self, column, query):
+        super().__init__(column, Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column_sql, column_params = compiler.compile(self.source_expressions[0])
+        query_sql, query_params = compiler.compile(self.source_expressions[1])
+        return f'MATCH({column_sql}) AGAINST ({query_sql} IN BOOLEAN MODE)', (*column_params, *query_params)
+
+
+class BaseSearchBackend:
+    """
+    Interface for work search backends.
+
+    ``search`` receives a Work queryset and the raw query string and returns
+    the matching works annotated with ``search_rank`` (higher is better).
+    """
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """
+    Portable backend: substring match on the denormalized document column.
+
+    Every term must match. Works whose title contains the whole query rank
+    above the rest.
+    """
+
+    def search(self, queryset, query):
+        terms = split_terms(query)
+        if not terms:
+            return queryset
+
+        condition = Q()
+        for term in terms:
+            condition &= Q(search_document__content__icontains=term)
+
+        return queryset.filter(condition).annotate(
+            search_rank=Case(
+                When(title__icontains=query.strip(), then=Value(2)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+
+
+class MySQLFullTextSearchBackend(BaseSearchBackend):
+    """
+    MySQL backend using the n-gram FULLTEXT index on WorkSearchDocument.
+
+    Each term is required and matched as a phrase, which with the n-gram
+    parser behaves like a substring match. Terms shorter than the n-gram
+    token size cannot be found through the index, so those queries fall
+    back to SimpleSearchBackend.
+    """
+    ngram_token_size = 2
+
+    def search(self, queryset, query):
+        terms = split_terms(query)
+        if not terms:
+            return queryset
+        if any(len(term) < self.ngram_token_size for term in terms):
+            return SimpleSearchBackend().search(queryset, query)
+
+        boolean_query = ' '.join(f'+"{term}"' for term in terms)
+        # An inner join on the document, so MySQL can start from the FULLTEXT index
+        return queryset.filter(search_document__isnull=False).annotate(
+            search_rank=MatchAgainst(F('search_document__content'), boolean_query)
+        ).filter(search_rank__gt=0)
+
+
+def get_search_backend():
+    """Return the configured search backend instance."""
+    backend_path = getattr(settings, 'WORK_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'mysql':
+        return MySQLFullTextSearchBackend()
+    return SimpleSearchBackend()
+
+
+class WorkSearchFilter(BaseFilterBackend):
+    """
+    Drop-in replacement for SearchFilter on Work list views.
+
+    Reads the same ``search`` query parameter and orders matches by
+    relevance, newest first among equally ranked works.
+    """
+
+    def get_search_query(self, request):
+        return request.query_params.get(api_settings.SEARCH_PARAM, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        queryset = get_search_backend().search(queryset, query)
+        if 'search_rank' in queryset.query.annotations:
+            queryset = queryset.order_by('-search_rank', '-created_at', '-id')
+        return queryset
@@ -1,16 +1,13 @@
 from rest_framework import serializers
+from django.db import models
 from .models import *
+from .uploadhandlers import get_file_hash
+from member.helpers.viewer import get_viewer
 from member.serializers import MemberSerializer
-from django.db import IntegrityError
+from .fragments import get_work_representations
+from django.db import IntegrityError, transaction
 from django.utils.translation import gettext as _
 
-try:
-    from billing.models import Subscription, Plan
-except ImportError:
-    # Fallback if billing app is not available
-    Subscription = None
-    Plan = None
-
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
@@ -21,27 +18,56 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = ['id', 'name']
 
+def build_image_url(request, image_field):
+    """Absolute URL for a stored image, forced to HTTPS on the production host."""
+    if not image_field:
+        return None
+    if not request:
+        return image_field.url
+    url = request.build_absolute_uri(image_field.url)
+    # Force HTTPS in production
+    if url.startswith('http://') and (
+        'museume.art' in url or 
+        request.get_host() in ['museume.art', 'www.museume.art']
+    ):
+        url = url.replace('http://', 'https://')
+    return url
+
 class ImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Image
-        fields = ['id', 'image_url']
+        fields = ['id', 'image_url', 'variants']
         read_only_fields = ['hash', 'work']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
         if obj.image and request:
-            url = request.build_absolute_uri(obj.image.url)
-            # Force HTTPS in production
-            if url.startswith('http://') and (
-                'museume.art' in url or 
-                request.get_host() in ['museume.art', 'www.museume.art']
-            ):
-                url = url.replace('http://', 'https://')
-            return url
+            return build_image_url(request, obj.image)
         return None
 
+    def get_variants(self, obj):
+        """
+        Resized copies for responsive <img>/<picture> markup, e.g.
+        {"thumbnail": {"jpeg": url, "webp": url}, "medium": {...}}.
+        Empty until the background worker has generated them.
+        """
+        request = self.context.get('request')
+        if not request or not obj.thumbnail:
+            return {}
+        return {
+            'thumbnail': {
+                'jpeg': build_image_url(request, obj.thumbnail),
+                'webp': build_image_url(request, obj.thumbnail_webp),
+            },
+            'medium': {
+                'jpeg': build_image_url(request, obj.medium),
+                'webp': build_image_url(request, obj.medium_webp),
+            },
+        }
+
     def validate_image(self, value):
         """
         Validate that the image is less than 5MB and is either PNG or JPG.
@@ -55,33 +81,50 @@ class ImageSerializer(serializers.ModelSerializer):
         if not value.name.lower().endswith(('.png', '.jpg', '.jpeg')):
             raise serializers.ValidationError(_("Only PNG and JPG images are allowed."))
 
-        # Generate hash to check for uniqueness
-        image_hash = self.generate_image_hash(value)
-        if Image.objects.filter(hash=image_hash).exists():
+        # Check for uniqueness (hash computed once, while the upload streamed in)
+        if Image.objects.filter(hash=get_file_hash(value)).exists():
             raise serializers.ValidationError(_("Image already exists in the system."))
 
         return value
 
-    def generate_image_hash(self, image):
-        """Generate a hash for the image file content."""
-        import hashlib
-        image_content = image.read()
-        return hashlib.sha256(image_content).hexdigest()
-
     def create(self, validated_data):
-        image = validated_data['image']
-        image_hash = self.generate_image_hash(image)
-        validated_data['hash'] = image_hash
+        validated_data['hash'] = get_file_hash(validated_data['image'])
         return super().create(validated_data)
 
 
+class WorkListSerializer(serializers.ListSerializer):
+    """
+    List serializer that renders a whole page at once.
+
+    Instead of one ``likes.filter(...).exists()`` query per work, the IDs of
+    the works on the page that the current user has liked are loaded with a
+    single query into the request's viewer context, where the child
+    serializer finds them. The shared part of every work comes from the
+    fragment cache in one lookup (see work/fragments.py).
+    """
+
+    def to_representation(self, data):
+        works = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+
+        request = self.context.get('request')
+        if not request:
+            return super().to_representation(works)
+
+        get_viewer(request).liked_work_ids(work.id for work in works)
+        representations = get_work_representations(works, request, self.child.to_shared_representation)
+        return [
+            self.child.to_viewer_representation(work, representation)
+            for work, representation in zip(works, representations)
+        ]
+
+
 class WorkSerializer(serializers.ModelSerializer):
     images = serializers.ListField(
         child=serializers.ImageField(), write_only=True, required=True
     )
     images_data = ImageSerializer(many=True, read_only=True, source='images')
     is_liked_by_user = serializers.SerializerMethodField()
-    likes_count = serializers.IntegerField(source='likes.count', read_only=True)
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
     member = MemberSerializer(read_only=True)
     tags = serializers.PrimaryKeyRelatedField(queryset=Tag.objects.all(), many=True)
 
@@ -90,14 +133,16 @@ class WorkSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'member', 'is_public', 'price', 'tags', 'category', 'images', 'images_data',
                   'likes_count', 'is_liked_by_user']
         read_only_fields = ['member', 'images_data', 'tags']
+        list_serializer_class = WorkListSerializer
 
     def get_is_liked_by_user(self, obj):
         """
         Check if the current authenticated user has liked this work.
+        Uses the page-level lookup from WorkListSerializer when available.
         """
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return obj.likes.filter(member=request.user).exists()
+        if request:
+            return get_viewer(request).has_liked(obj.id)
         return False
 
     def validate_images(self, value):
@@ -107,6 +152,8 @@ class WorkSerializer(serializers.ModelSerializer):
         """
         if len(value) > 5:
             raise serializers.ValidationError(_("You can upload a maximum of 5 images for an artwork."))
+
+        self._validate_unique_images(value)
         
         # Check subscription-based limits
         request = self.context.get('request')
@@ -116,46 +163,45 @@ class WorkSerializer(serializers.ModelSerializer):
         
         return value
     
-    def _validate_total_image_limit(self, user, new_images_count):
+    def _validate_unique_images(self, images):
+        """
+        Reject uploads that repeat an image in the same request or that already
+        exist in the system, using a single query for the whole batch.
+        """
+        hashes = [get_file_hash(image) for image in images]
+        if len(set(hashes)) != len(hashes) or Image.objects.filter(hash__in=hashes).exists():
+            raise serializers.ValidationError(_("Image already exists in the system."))
+
+    def _validate_total_image_limit(self, user, new_images_count, lock=False):
         """
         Validate total image limit based on user's subscription.
+
+        Uses the member's quota counters instead of counting images. Pass
+        lock=True inside a transaction to hold the quota row until the new
+        images are saved.
         """
-        # Skip validation if billing models are not available
-        if not Subscription or not Plan:
-            return
-            
-        # Get current total image count for the user
-        current_image_count = Image.objects.filter(work__member=user).count()
-        
-        # Check if user has active subscription
-        try:
-            subscription = Subscription.objects.get(member=user, active=True)
-            plan = subscription.plan
-            
-            # Check if it's a free plan (amount = 0)
-            if plan.amount == 0:
-                # Free plan: limit to 50 images total
-                if current_image_count + new_images_count > 50:
-                    raise serializers.ValidationError(
-                        _("Free plan allows up to 50 images total. You currently have {} images. Upgrade to premium for unlimited uploads.").format(current_image_count)
-                    )
-        except (Subscription.DoesNotExist, AttributeError):
-            # No subscription = free tier
-            if current_image_count + new_images_count > 50:
-                raise serializers.ValidationError(
-                    _("Free plan allows up to 50 images total. You currently have {} images. Upgrade to premium for unlimited uploads.").format(current_image_count)
-                )
+        usage = MemberQuota.usage(user, lock=lock)
+        image_limit = usage['image_limit']
+        current_image_count = usage['image_count']
+
+        # Free tier (no subscription or free plan): limit to 50 images total
+        if image_limit is not None and current_image_count + new_images_count > image_limit:
+            raise serializers.ValidationError(
+                _("Free plan allows up to 50 images total. You currently have {} images. Upgrade to premium for unlimited uploads.").format(current_image_count)
+            )
 
+    @transaction.atomic
     def create(self, validated_data):
         # Extract images data before creating artwork
         print(f"iamges: {validated_data}")
         images_data = validated_data.pop('images', [])
         tags_data = validated_data.pop('tags', [])
         
-        # Validate subscription limits before creating artwork
+        # Validate subscription limits before creating artwork; the quota row
+        # stays locked until the images are saved
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            self._validate_total_image_limit(request.user, len(images_data))
+            self._validate_total_image_limit(request.user, len(images_data), lock=True)
         
         artwork = Work.objects.create(**validated_data)
 
@@ -187,6 +233,7 @@ class WorkSerializer(serializers.ModelSerializer):
 
         return artwork
     
+    @transaction.atomic
     def update(self, instance, validated_data):
         images_data = validated_data.pop('images', None)
         tags_data = validated_data.pop('tags', None)
@@ -209,7 +256,7 @@ class WorkSerializer(serializers.ModelSerializer):
             if net_change > 0:
                 request = self.context.get('request')
                 if request and request.user.is_authenticated:
-                    self._validate_total_image_limit(request.user, net_change)
+                    self._validate_total_image_limit(request.user, net_change, lock=True)
             
             # Delete old images before adding new ones
             instance.images.all().delete()
@@ -224,6 +271,16 @@ class WorkSerializer(serializers.ModelSerializer):
         return instance
 
     def to_representation(self, instance):
+        """
+        Shared representation from the fragment cache plus the viewer's fields.
+        """
+        request = self.context.get('request')
+        if not request:
+            return self.to_shared_representation(instance)
+        representation = get_work_representations([instance], request, self.to_shared_representation)[0]
+        return self.to_viewer_representation(instance, representation)
+
+    def to_shared_representation(self, instance):
         """
         Customize the representation to include tag and category details with id and name.
         """
@@ -232,3 +289,12 @@ class WorkSerializer(serializers.ModelSerializer):
         representation['category'] = CategorySerializer(instance.category).data
 
         return representation
+
+    def to_viewer_representation(self, instance, representation):
+        """Copy of a shared representation with the requesting user's fields set."""
+        representation = dict(representation, is_liked_by_user=self.get_is_liked_by_user(instance))
+        if representation.get('member') is not None:
+            representation['member'] = dict(
+                representation['member'], is_shared=self.fields['member'].get_is_shared(instance.member)
+            )
+        return representation
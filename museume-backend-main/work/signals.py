@@ -0,0 +1,227 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Work, Tag, Image, Like, MemberQuota, Category, Member
+from .feed import rebuild_feed_entries, update_feed_entry
+from .fragments import touch_works
+from .images import schedule_image_variants, schedule_variant_deletion
+from .search import update_search_document, rebuild_search_documents
+
+
+@receiver(post_save, sender=Work)
+def refresh_search_document_on_work_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_search_document(instance)
+
+
+@receiver(m2m_changed, sender=Work.tags.through)
+def refresh_search_document_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.works.clear() does not say which works lost the tag
+        instance._cleared_work_ids = list(instance.works.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # tag.works.add(...) etc.: instance is the Tag
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_work_ids', [])
+        rebuild_search_documents(Work.objects.filter(pk__in=pk_set))
+    else:
+        update_search_document(instance)
+
+
+@receiver(post_save, sender=Tag)
+def refresh_search_documents_on_tag_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    rebuild_search_documents(instance.works.all())
+    touch_works(tags=instance)
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tagged_works(sender, instance, **kwargs):
+    instance._tagged_work_ids = list(instance.works.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def refresh_search_documents_on_tag_delete(sender, instance, **kwargs):
+    work_ids = getattr(instance, '_tagged_work_ids', None)
+    if work_ids:
+        rebuild_search_documents(Work.objects.filter(pk__in=work_ids))
+        touch_works(pk__in=work_ids)
+
+
+@receiver(m2m_changed, sender=Work.tags.through)
+def count_tag_usage(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse: tag.works.add(...) etc., instance is the Tag
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() reports every requested id; only count links that exist
+        links = sender.objects.filter(tag=instance) if reverse else sender.objects.filter(work=instance)
+        if action == 'pre_remove':
+            links = links.filter(**{'work_id__in' if reverse else 'tag_id__in': pk_set})
+        instance._removed_tag_ids = list(links.values_list('tag_id', flat=True))
+    elif action == 'post_add' and pk_set:
+        if reverse:
+            Tag.adjust_usage([instance.pk], len(pk_set))
+        else:
+            Tag.adjust_usage(pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        tag_ids = instance.__dict__.pop('_removed_tag_ids', [])
+        if reverse:
+            Tag.adjust_usage([instance.pk], -len(tag_ids))
+        else:
+            Tag.adjust_usage(tag_ids, -1)
+
+
+@receiver(pre_delete, sender=Work)
+def remember_work_tags(sender, instance, **kwargs):
+    instance._tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Work)
+def uncount_tag_usage_on_work_delete(sender, instance, **kwargs):
+    Tag.adjust_usage(getattr(instance, '_tag_ids', None), -1)
+
+
+# Cached work representations (work/fragments.py) are keyed on
+# fragment_version, so changes stored outside the work row bump it
+
+
+@receiver(m2m_changed, sender=Work.tags.through)
+def touch_works_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_works(pk=instance.pk)
+    elif pk_set:
+        touch_works(pk__in=pk_set)
+    else:
+        touch_works(tags=instance)
+
+
+@receiver(post_save, sender=Image)
+def touch_work_on_image_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    touch_works(pk=instance.work_id)
+
+
+@receiver(post_delete, sender=Image)
+def touch_work_on_image_delete(sender, instance, **kwargs):
+    touch_works(pk=instance.work_id)
+
+
+@receiver(post_save, sender=Category)
+def touch_works_on_category_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    touch_works(category=instance)
+
+
+@receiver(pre_delete, sender=Category)
+def remember_category_works(sender, instance, **kwargs):
+    instance._work_ids = list(instance.works.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def touch_works_on_category_delete(sender, instance, **kwargs):
+    work_ids = getattr(instance, '_work_ids', None)
+    if work_ids:
+        touch_works(pk__in=work_ids)
+
+
+@receiver(post_save, sender=Member)
+def touch_works_on_member_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Logins only update last_login, which is not part of the representation
+    if raw or created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    touch_works(member=instance)
+
+
+# Family gallery feed (work/feed.py)
+
+
+@receiver(post_save, sender=Work)
+def update_family_feed_on_work_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    update_feed_entry(instance)
+
+
+@receiver(post_save, sender=Member)
+def rebuild_family_feed_on_member_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # A child moved to another parent (or role) takes their works to another gallery
+    if raw or created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    rebuild_feed_entries(Work.objects.filter(member=instance))
+
+
+@receiver(pre_delete, sender=Member)
+def remember_family_children(sender, instance, **kwargs):
+    instance._child_ids = list(instance.children.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Member)
+def rebuild_family_feed_on_parent_delete(sender, instance, **kwargs):
+    # The family's entries went with the parent; the children now form families of their own
+    child_ids = getattr(instance, '_child_ids', None)
+    if child_ids:
+        rebuild_feed_entries(Work.objects.filter(member_id__in=child_ids))
+
+
+@receiver(post_save, sender=Image)
+def generate_variants_on_image_upload(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    schedule_image_variants(instance.pk)
+
+
+@receiver(post_delete, sender=Image)
+def delete_variants_on_image_delete(sender, instance, **kwargs):
+    schedule_variant_deletion(instance)
+
+
+@receiver(post_save, sender=Like)
+def count_like_on_create(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    Work.objects.filter(pk=instance.work_id).update(like_count=F('like_count') + 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like_on_delete(sender, instance, **kwargs):
+    # Also runs for likes removed with their member or work
+    Work.objects.filter(pk=instance.work_id, like_count__gt=0).update(like_count=F('like_count') - 1)
+
+
+@receiver(post_save, sender=Work)
+def count_work_on_create(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    MemberQuota.adjust(instance.member_id, works=1)
+
+
+@receiver(post_delete, sender=Work)
+def uncount_work_on_delete(sender, instance, **kwargs):
+    MemberQuota.adjust(instance.member_id, works=-1)
+
+
+@receiver(post_save, sender=Image)
+def count_image_on_create(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    MemberQuota.adjust(_get_image_member_id(instance), images=1)
+
+
+@receiver(post_delete, sender=Image)
+def uncount_image_on_delete(sender, instance, **kwargs):
+    # Runs before the parent Work row is removed when a work is deleted
+    MemberQuota.adjust(_get_image_member_id(instance), images=-1)
+
+
+def _get_image_member_id(image):
+    if Image.work.is_cached(image):
+        return image.work.member_id
+    return Work.objects.filter(pk=image.work_id).values_list('member_id', flat=True).first()
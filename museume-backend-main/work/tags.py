@@ -0,0 +1,38 @@
+"""
+Tag catalog for the tag picker.
+
+Tags are listed by popularity (``Tag.usage_count``, maintained by signals)
+and searched by name prefix; both are served by indexes, so the picker stays
+fast however many tags users create. The popular list is cached under the
+tag table's version stamp (row count and latest updated_at, which usage
+changes bump), so a cached list is never stale.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+from .serializers import TagSerializer
+
+TAG_TOP_CACHE_TIMEOUT = getattr(settings, 'TAG_TOP_CACHE_TIMEOUT', 3600)
+
+
+def search_tags(prefix, limit):
+    """Most used tags whose name starts with prefix (case-insensitive)."""
+    return Tag.objects.filter(name__istartswith=prefix).order_by('-usage_count', 'name')[:limit]
+
+
+def get_top_tags(limit, version):
+    """
+    Serialized most used tags.
+
+    Args:
+        limit: Number of tags, or None for all of them
+        version: (count, updated_at) version stamp of the tag table
+    """
+    count, updated = version
+    key = f"tags:top:{limit or 'all'}:{count}:{updated.timestamp() if updated else 0}"
+    data = cache.get(key)
+    if data is None:
+        data = TagSerializer(Tag.objects.order_by('-usage_count', 'name')[:limit], many=True).data
+        cache.set(key, data, TAG_TOP_CACHE_TIMEOUT)
+    return data
@@ -1,3 +1,601 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+
+from django.db import connection
+from django.http.multipartparser import MultiPartParser
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+
+from member.models import Member
+from museum_app.middleware import normalize_sql
+from museum_app.pagination import KeysetPagination
+from museum_app.testing import QueryBudgetTestMixin, QueryPlanTestMixin
+from .feed import rebuild_feed_entries
+from .images import VARIANT_FIELDS
+from .models import Image, Like, MemberQuota, Tag, Work, WorkSearchDocument
+from .pagination import CustomCursorPagination
+from .search import MySQLFullTextSearchBackend
+from .uploadhandlers import HashingMemoryFileUploadHandler, HashingTemporaryFileUploadHandler, get_file_hash
+from .views import (
+    MemberArtworkListView, MemberSpecificArtworkListView, MyCollectionView, SiblingGalleryView, TagListView,
+    WorkListCreateView,
+)
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image_file(name, color):
+    buffer = BytesIO()
+    PILImage.new('RGB', (8, 8), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class NormalizeSqlTests(APITestCase):
+
+    def test_parameters_and_literals_are_collapsed(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM work WHERE id IN (1, 2, 3) AND title = 'a'  LIMIT 16"),
+            normalize_sql("SELECT * FROM work WHERE id IN (4) AND title = 'b' LIMIT 16"),
+        )
+        self.assertEqual(normalize_sql('SELECT * FROM work WHERE id IN (%s, %s)'), 'SELECT * FROM work WHERE id IN (...)')
+
+
+class SiblingGalleryQueryTests(QueryBudgetTestMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.protector = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        cls.children = [
+            Member.objects.create_user(
+                username=f'child{i}', email=f'child{i}@example.com', password='x', role='child', parent=cls.protector,
+            )
+            for i in range(2)
+        ]
+        for child in cls.children:
+            for i in range(3):
+                Work.objects.create(title=f'{child.username} {i}', member=child, public_visibility='public', is_public=True)
+        cls.children[0].shared_users.add(cls.children[1])
+        Like.objects.create(member=cls.children[0], work=cls.children[1].works.first())
+
+    def test_works_are_fetched_once(self):
+        self.client.force_authenticate(self.children[0])
+        with self.assertQueryBudget(100, allow_duplicates=True) as queries:
+            response = self.client.get('/api/artworks/family-gallery/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 6)
+        work_selects = [
+            shape for shape in queries.shapes
+            if shape.startswith('SELECT') and 'FROM "work_work"' in shape.split(' WHERE ')[0]
+        ]
+        self.assertEqual([queries.shapes[shape] for shape in work_selects], [1])
+
+    def test_viewer_facts_are_loaded_once(self):
+        self.client.force_authenticate(self.children[0])
+        # works, images, tags, likes, shared users
+        with self.assertQueryBudget(SiblingGalleryView.query_budget - 1):
+            response = self.client.get('/api/artworks/family-gallery/')
+
+        results = response.data['results']
+        self.assertEqual(
+            {work['member']['username']: work['member']['is_shared'] for work in results},
+            {'child0': False, 'child1': True},
+        )
+        liked = [work['id'] for work in results if work['is_liked_by_user']]
+        self.assertEqual(liked, [self.children[1].works.first().id])
+
+
+class FamilyFeedTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.protector = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        cls.other_protector = Member.objects.create_user(username='other', email='other@example.com', password='x', role='protector')
+        cls.child = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child', parent=cls.protector)
+        cls.sibling = Member.objects.create_user(username='sibling', email='sibling@example.com', password='x', role='child', parent=cls.protector)
+        cls.works = [
+            Work.objects.create(title=f'Work {i}', member=member, public_visibility='public', is_public=True)
+            for i, member in enumerate([cls.child, cls.sibling, cls.sibling])
+        ]
+        Work.objects.create(title='Private', member=cls.sibling, public_visibility='private')
+
+    def get_titles(self, member, url='/api/artworks/family-gallery/'):
+        self.client.force_authenticate(member)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [work['title'] for work in response.data['results']], response.data['next']
+
+    def test_gallery_lists_public_family_works_newest_first(self):
+        self.assertEqual(self.get_titles(self.child)[0], ['Work 2', 'Work 1', 'Work 0'])
+
+    def test_publishing_updates_the_feed(self):
+        work = self.works[1]
+        work.is_public = False
+        work.save()
+        self.assertEqual(self.get_titles(self.child)[0], ['Work 2', 'Work 0'])
+
+        work.is_public = True
+        work.save()
+        self.assertEqual(self.get_titles(self.child)[0], ['Work 2', 'Work 1', 'Work 0'])
+
+    def test_moving_a_child_moves_their_works(self):
+        self.sibling.parent = self.other_protector
+        self.sibling.save()
+        self.assertEqual(self.get_titles(self.child)[0], ['Work 0'])
+
+        self.sibling.parent = None
+        self.sibling.save()
+        self.assertEqual(self.get_titles(self.sibling)[0], ['Work 2', 'Work 1'])
+
+    def test_deleting_the_parent_keeps_the_children_galleries(self):
+        self.protector.delete()
+        self.child.refresh_from_db()
+        self.assertEqual(self.get_titles(self.child)[0], ['Work 0'])
+
+    @mock.patch.object(CustomCursorPagination, 'page_size', 2)
+    def test_cursor_pages_follow_the_feed(self):
+        titles, next_url = self.get_titles(self.child)
+        self.assertEqual(titles, ['Work 2', 'Work 1'])
+        self.assertEqual(self.get_titles(self.child, next_url), (['Work 0'], None))
+
+
+class WorkSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        cls.sea = Work.objects.create(title='Sea', description='Waves', member=cls.member, public_visibility='public', is_public=True)
+        cls.sky = Work.objects.create(title='Sky', description='Clouds over the sea', member=cls.member, public_visibility='public', is_public=True)
+        cls.tag = Tag.objects.create(name='ocean')
+
+    def setUp(self):
+        self.client.force_authenticate(self.member)
+
+    def get_content(self, work):
+        return WorkSearchDocument.objects.get(work=work).content
+
+    def search(self, query):
+        return [work['title'] for work in self.client.get('/api/artworks/', {'search': query}).data['results']]
+
+    def test_tag_changes_refresh_the_document(self):
+        self.sea.tags.add(self.tag)
+        self.assertIn('ocean', self.get_content(self.sea))
+
+        self.tag.name = 'deep ocean'
+        self.tag.save()
+        self.assertIn('deep ocean', self.get_content(self.sea))
+
+        self.tag.works.add(self.sky)
+        self.assertIn('deep ocean', self.get_content(self.sky))
+        self.tag.works.clear()
+        self.assertNotIn('ocean', self.get_content(self.sea))
+        self.assertNotIn('ocean', self.get_content(self.sky))
+
+    def test_fallback_search_matches_the_document(self):
+        self.sky.tags.add(self.tag)
+        # Every term must match; title matches rank first
+        self.assertEqual(self.search('sea'), ['Sea', 'Sky'])
+        self.assertEqual(self.search('ocean clouds'), ['Sky'])
+        self.assertEqual(self.search('ocean waves'), [])
+
+    def test_full_text_match_uses_the_joined_document(self):
+        # The other works of the same member are joined first and take the table name
+        queryset = Work.objects.filter(member__works__search_document__content__icontains='sea')
+        queryset = MySQLFullTextSearchBackend().search(queryset, 'sea')
+        sql, params = queryset.query.sql_with_params()
+        compiler = queryset.query.get_compiler(connection=connection)
+        alias = next(
+            alias for alias, join in queryset.query.alias_map.items()
+            if join.table_name == WorkSearchDocument._meta.db_table and join.parent_alias == Work._meta.db_table
+        )
+        column = f'{compiler.quote_name_unless_alias(alias)}.{connection.ops.quote_name("content")}'
+        self.assertIn(f'MATCH({column}) AGAINST (%s IN BOOLEAN MODE)', sql)
+        self.assertIn('+"sea"', params)
+
+
+class LikeCountTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        cls.fans = [
+            Member.objects.create_user(username=f'fan{i}', email=f'fan{i}@example.com', password='x', role='child')
+            for i in range(2)
+        ]
+        cls.work = Work.objects.create(title='Work', member=cls.artist, public_visibility='public', is_public=True)
+
+    def post(self, member, action):
+        self.client.force_authenticate(member)
+        return self.client.post(f'/api/artworks/{self.work.pk}/{action}/')
+
+    def get_like_count(self):
+        return Work.objects.values_list('like_count', flat=True).get(pk=self.work.pk)
+
+    def test_like_and_unlike(self):
+        self.assertEqual(self.post(self.fans[0], 'like').status_code, 201)
+        self.assertEqual(self.post(self.fans[1], 'like').status_code, 201)
+        self.assertEqual(self.get_like_count(), 2)
+
+        self.assertEqual(self.post(self.fans[0], 'unlike').status_code, 200)
+        self.assertEqual(self.get_like_count(), 1)
+        self.assertEqual(self.post(self.fans[0], 'unlike').status_code, 400)
+        self.assertEqual(self.get_like_count(), 1)
+
+    def test_double_like_counts_once(self):
+        self.assertEqual(self.post(self.fans[0], 'like').status_code, 201)
+        self.assertEqual(self.post(self.fans[0], 'like').status_code, 200)
+        self.assertEqual(self.get_like_count(), 1)
+
+    def test_deleting_a_member_removes_their_likes(self):
+        for fan in self.fans:
+            Like.objects.create(member=fan, work=self.work)
+        self.assertEqual(self.get_like_count(), 2)
+
+        self.fans[0].delete()
+        self.assertEqual(self.get_like_count(), 1)
+        Like.objects.all().delete()
+        self.assertEqual(self.get_like_count(), 0)
+
+
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        cls.works = [
+            Work.objects.create(title=f'Work {i}', member=cls.member, public_visibility='public', is_public=True)
+            for i in range(5)
+        ]
+        # Uploaded in the same instant: only the id tells them apart
+        cls.created_at = timezone.now().replace(microsecond=0)
+        Work.objects.update(created_at=cls.created_at)
+
+    def setUp(self):
+        self.client.force_authenticate(self.member)
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        paginator.sort_field = 'created_at'
+        cursor = paginator.encode_cursor(self.created_at.isoformat(), 42)
+        request = Request(RequestFactory().get('/api/artworks/', {'cursor': cursor}))
+        self.assertEqual(paginator.decode_cursor(request, Work.objects.all()), (self.created_at, 42))
+
+        self.assertEqual(self.client.get('/api/artworks/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    @mock.patch.object(CustomCursorPagination, 'page_size', 2)
+    def test_equal_timestamps_are_ordered_by_id(self):
+        ids = []
+        url = '/api/artworks/'
+        while url:
+            data = self.client.get(url).data
+            self.assertNotIn('count', data)
+            ids += [work['id'] for work in data['results']]
+            url = data['next']
+        self.assertEqual(ids, sorted((work.pk for work in self.works), reverse=True))
+
+    @mock.patch.object(CustomCursorPagination, 'page_size', 2)
+    def test_page_numbers_and_search_use_offset_pages(self):
+        data = self.client.get('/api/artworks/', {'page': 2}).data
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([work['id'] for work in data['results']], [self.works[2].pk, self.works[1].pk])
+        self.assertIn('page=3', data['next'])
+
+        data = self.client.get('/api/artworks/', {'search': 'Work'}).data
+        self.assertEqual(data['count'], 5)
+        self.assertIsNone(data['previous'])
+
+
+class WorkFragmentCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        cls.fan = Member.objects.create_user(username='fan', email='fan@example.com', password='x', role='child')
+        cls.work = Work.objects.create(title='Work', member=cls.member, public_visibility='public', is_public=True)
+        cls.tag = Tag.objects.create(name='sky')
+
+    def get_work(self):
+        return self.client.get(f'/api/artworks/{self.work.id}/').data
+
+    def test_changes_are_not_served_from_cache(self):
+        self.client.force_authenticate(Member.objects.get(pk=self.fan.pk))
+        self.assertEqual(self.get_work()['tags'], [])
+
+        self.work.tags.add(self.tag)
+        self.assertEqual(self.get_work()['tags'], [{'id': self.tag.id, 'name': 'sky'}])
+
+        self.tag.name = 'sea'
+        self.tag.save()
+        self.assertEqual(self.get_work()['tags'], [{'id': self.tag.id, 'name': 'sea'}])
+
+        self.member.username = 'renamed'
+        self.member.save()
+        self.assertEqual(self.get_work()['member']['username'], 'renamed')
+        # Only the work's own edits change its updated_at
+        self.assertEqual(Work.objects.get(pk=self.work.pk).updated_at, self.work.updated_at)
+
+        self.client.post(f'/api/artworks/{self.work.id}/like/')
+        data = self.get_work()
+        self.assertEqual((data['likes_count'], data['is_liked_by_user']), (1, True))
+
+    def test_viewer_fields_are_not_cached(self):
+        self.fan.shared_users.add(self.member)
+        Like.objects.create(member=self.fan, work=self.work)
+
+        self.client.force_authenticate(self.fan)
+        data = self.get_work()
+        self.assertEqual((data['is_liked_by_user'], data['member']['is_shared']), (True, True))
+
+        self.client.force_authenticate(Member.objects.get(pk=self.member.pk))
+        data = self.get_work()
+        self.assertEqual((data['is_liked_by_user'], data['member']['is_shared']), (False, False))
+
+
+class CatalogConditionalGetTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [Tag.objects.create(name=name) for name in ('sky', 'sea')]
+
+    def test_unchanged_catalog_answers_304(self):
+        response = self.client.get('/api/artworks/tags/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        # Only the version stamp is queried
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/artworks/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.tags[0].name = 'cloud'
+        self.tags[0].save()
+        response = self.client.get('/api/artworks/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deletion_changes_etag(self):
+        etag = self.client.get('/api/artworks/tags/')['ETag']
+        Tag.objects.filter(pk=self.tags[0].pk).delete()
+
+        response = self.client.get('/api/artworks/tags/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([tag['name'] for tag in response.json()], ['sea'])
+
+    def test_tags_ordered_by_usage_and_searchable(self):
+        member = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+        works = [Work.objects.create(title=str(i), member=member) for i in range(3)]
+        for work in works:
+            work.tags.add(self.tags[1])
+        works[0].tags.add(self.tags[0])
+        works[1].tags.set([self.tags[0]])
+        works[2].delete()
+
+        self.tags[0].refresh_from_db()
+        self.tags[1].refresh_from_db()
+        self.assertEqual((self.tags[0].usage_count, self.tags[1].usage_count), (2, 1))
+
+        Tag.objects.create(name='seaweed')
+        self.assertEqual([tag['name'] for tag in self.client.get('/api/artworks/tags/').json()], ['sky', 'sea', 'seaweed'])
+        self.assertEqual([tag['name'] for tag in self.client.get('/api/artworks/tags/?q=SE&limit=1').json()], ['sea'])
+        self.assertEqual([tag['name'] for tag in self.client.get('/api/artworks/tags/?limit=2').json()], ['sky', 'sea'])
+
+    def test_tags_are_not_truncated_without_a_limit(self):
+        Tag.objects.bulk_create([Tag(name=f'tag{i:03}') for i in range(TagListView.default_limit + 5)])
+        self.assertEqual(len(self.client.get('/api/artworks/tags/').json()), Tag.objects.count())
+        self.assertEqual(len(self.client.get('/api/artworks/tags/?q=tag').json()), TagListView.default_limit)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantCommandTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_images_without_variants_are_backfilled(self):
+        member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        work = Work.objects.create(title='Work', member=member)
+        # Variants are scheduled on commit, which never happens in a TestCase
+        # (like a job lost with the worker process)
+        blank = Image.objects.create(work=work, image=make_image_file('blank.png', (0, 255, 0)))
+        # Rows that predate the variant columns hold NULL
+        missing = Image.objects.create(work=work, image=make_image_file('missing.png', (255, 0, 0)))
+        Image.objects.filter(pk=missing.pk).update(thumbnail=None)
+
+        call_command('generate_image_variants', stdout=StringIO())
+
+        for image in Image.objects.filter(pk__in=[missing.pk, blank.pk]):
+            self.assertTrue(image.thumbnail.name.endswith('_thumbnail.jpg'))
+            self.assertTrue(image.medium_webp.name.endswith('_medium.webp'))
+
+    def test_variant_files_are_deleted_with_the_image(self):
+        member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        work = Work.objects.create(title='Work', member=member)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(work=work, image=make_image_file('delete.png', (0, 0, 255)))
+        image.refresh_from_db()
+        variants = [getattr(image, field_name) for _size, field_name, _format, _extension in VARIANT_FIELDS]
+        self.assertTrue(all(variant.storage.exists(variant.name) for variant in variants))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            work.delete()
+            # Not before the deletion is committed
+            self.assertTrue(all(variant.storage.exists(variant.name) for variant in variants))
+        self.assertFalse(any(variant.storage.exists(variant.name) for variant in variants))
+        self.assertTrue(image.image.storage.exists(image.image.name))
+
+
+@skipUnless(connection.vendor == 'mysql', 'Query plans are checked on MySQL')
+class WorkQueryPlanTests(QueryPlanTestMixin, TestCase):
+    """The gallery queries in work/views.py are served by the indexes on Work."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.protector = Member.objects.create_user(username='parent', email='parent@example.com', password='x', role='protector')
+        cls.members = [
+            Member.objects.create_user(
+                username=f'child{i}', email=f'child{i}@example.com', password='x', role='child', parent=cls.protector,
+            )
+            for i in range(4)
+        ]
+        Work.objects.bulk_create([
+            Work(title=f'Work {i}', member=cls.members[i % 4], is_public=i % 3 > 0, public_visibility='public')
+            for i in range(400)
+        ])
+        rebuild_feed_entries()
+        Like.objects.bulk_create([Like(member=cls.members[0], work=work) for work in Work.objects.all()[:20]])
+
+    def get_queryset(self, view_class, **kwargs):
+        request = RequestFactory().get('/')
+        request.user = self.members[0]
+        view = view_class()
+        view.setup(request, **kwargs)
+        return view.get_queryset()
+
+    def test_public_gallery(self):
+        self.assertIndexedPlan(self.get_queryset(WorkListCreateView).order_by('-created_at', '-id')[:16])
+
+    def test_member_galleries(self):
+        self.assertIndexedPlan(self.get_queryset(MemberArtworkListView)[:15])
+        self.assertIndexedPlan(self.get_queryset(MemberSpecificArtworkListView, member_id=self.members[1].pk)[:15])
+
+    def test_family_gallery(self):
+        self.assertIndexedPlan(self.get_queryset(SiblingGalleryView)[:16])
+
+    def test_my_collection(self):
+        # Sorting is bounded by the member's likes
+        queryset = self.get_queryset(MyCollectionView).order_by('-created_at', '-id')[:16]
+        self.assertIndexedPlan(queryset, allow_filesort=True)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class MemberQuotaTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.member = Member.objects.create_user(username='child', email='child@example.com', password='x', role='child')
+        self.work = Work.objects.create(title='Existing', member=self.member)
+        Image.objects.create(work=self.work, image=make_image_file('existing.png', 'red'))
+
+    def get_counts(self):
+        return MemberQuota.objects.values_list('work_count', 'image_count').get(member=self.member)
+
+    def test_quota_is_created_from_the_real_counts(self):
+        self.assertFalse(MemberQuota.objects.filter(member=self.member).exists())
+        quota = MemberQuota.for_member(self.member)
+        self.assertEqual((quota.work_count, quota.image_count), (1, 1))
+
+    def test_creating_and_deleting_works_and_images(self):
+        MemberQuota.for_member(self.member)
+        work = Work.objects.create(title='New', member=self.member)
+        image = Image.objects.create(work=work, image=make_image_file('new.png', 'blue'))
+        self.assertEqual(self.get_counts(), (2, 2))
+
+        image.delete()
+        self.assertEqual(self.get_counts(), (2, 1))
+        work.delete()
+        self.assertEqual(self.get_counts(), (1, 1))
+
+    def test_deleting_a_work_uncounts_its_images(self):
+        Image.objects.create(work=self.work, image=make_image_file('second.png', 'blue'))
+        MemberQuota.for_member(self.member)
+        self.assertEqual(self.get_counts(), (1, 2))
+
+        Work.objects.filter(pk=self.work.pk).delete()
+        self.assertEqual(self.get_counts(), (0, 0))
+
+    def test_counters_do_not_go_below_zero(self):
+        MemberQuota.for_member(self.member)
+        MemberQuota.adjust(self.member.pk, works=-5, images=-1)
+        self.assertEqual(self.get_counts(), (1, 0))
+
+    def test_deleting_the_member_removes_the_quota(self):
+        MemberQuota.for_member(self.member)
+        self.member.delete()
+        self.assertFalse(MemberQuota.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_VARIANTS_ASYNC=False)
+class UploadHashingTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.member = Member.objects.create_user(username='artist', email='artist@example.com', password='x', role='child')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def parse_upload(self, upload):
+        body = encode_multipart(BOUNDARY, {'image': upload})
+        meta = {'CONTENT_TYPE': MULTIPART_CONTENT, 'CONTENT_LENGTH': len(body)}
+        handlers = [HashingMemoryFileUploadHandler(), HashingTemporaryFileUploadHandler()]
+        return MultiPartParser(meta, BytesIO(body), handlers).parse()[1]['image']
+
+    def test_handlers_hash_in_memory_and_temporary_uploads(self):
+        content = make_image_file('a.png', 'red').read()
+        expected = hashlib.sha256(content).hexdigest()
+
+        uploaded = self.parse_upload(SimpleUploadedFile('a.png', content, content_type='image/png'))
+        self.assertIsInstance(uploaded, InMemoryUploadedFile)
+        self.assertEqual(uploaded.sha256, expected)
+
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=0):
+            uploaded = self.parse_upload(SimpleUploadedFile('a.png', content, content_type='image/png'))
+        self.assertIsInstance(uploaded, TemporaryUploadedFile)
+        self.assertEqual(uploaded.sha256, expected)
+        self.assertEqual(uploaded.read(), content)
+        uploaded.close()
+
+    def test_get_file_hash_rewinds_and_caches(self):
+        file = make_image_file('a.png', 'red')
+        content = file.read()
+        file.seek(3)
+
+        self.assertEqual(get_file_hash(file), hashlib.sha256(content).hexdigest())
+        self.assertEqual(file.tell(), 0)
+        with mock.patch.object(file, 'chunks') as chunks:
+            self.assertEqual(get_file_hash(file), hashlib.sha256(content).hexdigest())
+        chunks.assert_not_called()
+
+    def upload(self, *files):
+        return self.client.post('/api/artworks/', {'title': 'Work', 'images': list(files)}, format='multipart')
+
+    def test_stored_hash_matches_the_saved_file(self):
+        self.client.force_authenticate(self.member)
+        # In memory, then streamed to a temporary file
+        for max_memory_size, color in ((2621440, 'red'), (0, 'blue')):
+            with self.subTest(max_memory_size=max_memory_size), override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=max_memory_size):
+                response = self.upload(make_image_file('a.png', color))
+                self.assertEqual(response.status_code, 201, response.data)
+
+                image = Image.objects.get(work_id=response.data['id'])
+                with image.image.open('rb') as saved:
+                    self.assertEqual(image.hash, hashlib.sha256(saved.read()).hexdigest())
+
+    def test_duplicate_uploads_are_rejected(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.upload(make_image_file('a.png', 'red')).status_code, 201)
+
+        response = self.upload(make_image_file('b.png', 'red'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], 'Image already exists in the system.')
+        self.assertEqual(self.upload(make_image_file('c.png', 'blue'), make_image_file('d.png', 'blue')).status_code, 400)
+        self.assertEqual(Image.objects.count(), 1)
@@ -0,0 +1,71 @@
+"""
+Upload handlers that hash files while Django streams them in.
+
+Image dedupe needs the SHA-256 of every upload. Instead of reading each
+file back into memory (once per consumer), the digest is computed chunk by
+chunk as the multipart parser receives the file and cached on the
+resulting UploadedFile as ``sha256``. ``get_file_hash`` returns that cached
+value and only falls back to a chunked read for files that did not come
+through these handlers (admin forms in tests, storage files, ...).
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingMemoryFileUploadHandler(MemoryFileUploadHandler):
+    """MemoryFileUploadHandler that also records the SHA-256 of small uploads."""
+
+    def new_file(self, *args, **kwargs):
+        # Set up first: the parent may raise StopFutureHandlers
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.activated:
+            self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        if uploaded_file is not None:
+            uploaded_file.sha256 = self.sha256.hexdigest()
+        return uploaded_file
+
+
+class HashingTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """TemporaryFileUploadHandler that also records the SHA-256 of large uploads."""
+
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.sha256 = self.sha256.hexdigest()
+        return uploaded_file
+
+
+def get_file_hash(file):
+    """
+    Return the SHA-256 hex digest of a file, computing it at most once.
+
+    Uses the digest cached by the upload handlers when present, otherwise
+    reads the file in chunks and caches the result on the file object. The
+    file position is rewound so the file can still be saved afterwards.
+    """
+    cached = getattr(file, 'sha256', None)
+    if cached:
+        return cached
+
+    hasher = hashlib.sha256()
+    for chunk in file.chunks():
+        hasher.update(chunk)
+    file.seek(0)
+
+    file.sha256 = hasher.hexdigest()
+    return file.sha256
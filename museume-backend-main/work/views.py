@@ -1,135 +1,130 @@
 from rest_framework import generics
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.filters import SearchFilter
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from .models import *
 from .serializers import *
+from .feed import get_family_id
 from .filters import WorkFilter
-from .pagination import CustomPageNumberPagination
+from .search import WorkSearchFilter
+from .tags import get_top_tags, search_tags
+from .uploadhandlers import get_file_hash
+from .pagination import CustomPageNumberPagination, CustomCursorPagination
+from museum_app.conditional import ConditionalGetMixin
 from museum_app.permissions import IsChild
 from django.utils.translation import gettext as _
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 
 class WorkListCreateView(generics.ListCreateAPIView):
     serializer_class = WorkSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, WorkSearchFilter]
     filterset_class = WorkFilter
-    search_fields = ['title', 'description', 'tags__name']
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CustomCursorPagination
+    # authentication, works, images, tags, likes, shared users
+    query_budget = 6
 
     def perform_create(self, serializer):
-        # RFP: Check work limit before allowing creation
-        can_create, message = Work.can_create_work(self.request.user)
-        if not can_create:
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError({'detail': message})
+        with transaction.atomic():
+            # RFP: Check work limit before allowing creation. The quota row is
+            # locked until the work is saved so concurrent uploads from
+            # sibling profiles cannot both take the last slot.
+            can_create, message = Work.can_create_work(self.request.user, lock=True)
+            if not can_create:
+                from rest_framework.exceptions import ValidationError
+                raise ValidationError({'detail': message})
 
-        # If you want to assign the currently authenticated user to the work
-        serializer.save(member=self.request.user)
+            # If you want to assign the currently authenticated user to the work
+            serializer.save(member=self.request.user)
 
     def get_queryset(self):
-        # Use select_related and prefetch_related to avoid N+1 queries
+        # Images and tags are prefetched by WorkSerializer, only for works
+        # missing from the fragment cache
         return Work.objects.filter(is_public=True).select_related(
             'member',
             'category'
-        ).prefetch_related(
-            'images',
-            'tags',
-            'likes'
         )
 
 class WorkDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = WorkSerializer
+    # authentication, work, images, tags, like, shared users
+    query_budget = 6
     #permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         """
         Return the list of artworks uploaded by the current authenticated user.
-        Use select_related and prefetch_related to avoid N+1 queries.
+        Images and tags are prefetched by the serializer on fragment cache misses.
         """
         return Work.objects.filter(
             (Q(member=self.request.user) & Q(is_public=False)) | Q(is_public=True)
         ).select_related(
             'member',
             'category'
-        ).prefetch_related(
-            'images',
-            'tags',
-            'likes'
         )
 
 class MemberArtworkListView(generics.ListAPIView):
     serializer_class = WorkSerializer
     permission_classes = [IsChild]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, WorkSearchFilter]
     filterset_class = WorkFilter
-    search_fields = ['title', 'description', 'tags__name']
     pagination_class = CustomPageNumberPagination
+    # authentication, count, works, images, tags, likes, shared users
+    query_budget = 7
 
     def get_queryset(self):
         """
         Return the list of artworks uploaded by the current authenticated user.
-        Use select_related and prefetch_related to avoid N+1 queries.
+        Images and tags are prefetched by the serializer on fragment cache misses.
         """
         return Work.objects.filter(member=self.request.user).select_related(
             'member',
             'category'
-        ).prefetch_related(
-            'images',
-            'tags',
-            'likes'
         )
       
 class MemberSpecificArtworkListView(generics.ListAPIView):
     serializer_class = WorkSerializer
     #permission_classes = [IsAuthenticated]
     permission_classes = [IsChild]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, WorkSearchFilter]
     filterset_class = WorkFilter
-    search_fields = ['title', 'description', 'tags__name']
     pagination_class = CustomPageNumberPagination
+    # authentication, count, works, images, tags, likes, shared users
+    query_budget = 7
 
     def get_queryset(self):
         """
         Return the list of artworks uploaded by the specified member (by ID or username).
-        Use select_related and prefetch_related to avoid N+1 queries.
+        Images and tags are prefetched by the serializer on fragment cache misses.
         """
         member_id = self.kwargs.get('member_id')
 
         return Work.objects.filter(member__id=member_id, is_public=True).select_related(
             'member',
             'category'
-        ).prefetch_related(
-            'images',
-            'tags',
-            'likes'
         )
 
 class MyCollectionView(generics.ListAPIView):
     serializer_class = WorkSerializer
     permission_classes = [IsChild]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, WorkSearchFilter]
     filterset_class = WorkFilter
-    search_fields = ['title', 'description', 'tags__name']
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CustomCursorPagination
+    # authentication, works, images, tags, likes, shared users
+    query_budget = 6
 
     def get_queryset(self):
         """
         Return all works liked by the currently authenticated user.
-        Use select_related and prefetch_related to avoid N+1 queries.
+        Images and tags are prefetched by the serializer on fragment cache misses.
         """
         # Get the works that the logged-in user has liked
         liked_work_ids = Like.objects.filter(member=self.request.user).values_list('work_id', flat=True)
         return Work.objects.filter(id__in=liked_work_ids).select_related(
             'member',
             'category'
-        ).prefetch_related(
-            'images',
-            'tags',
-            'likes'
         )
 
 class LikeWorkView(APIView):
@@ -140,6 +135,7 @@ class LikeWorkView(APIView):
 
     def post(self, request, work_id):
         work = Work.objects.get(id=work_id)
+        # Like counts are kept by the Like signals (work/signals.py, contest/signals.py)
         like, created = Like.objects.get_or_create(member=request.user, work=work)
 
         if created:
@@ -155,20 +151,45 @@ class UnlikeWorkView(APIView):
 
     def post(self, request, work_id):
         work = Work.objects.get(id=work_id)
-        try:
-            like = Like.objects.get(member=request.user, work=work)
-            like.delete()
+        deleted, _deleted_by_model = Like.objects.filter(member=request.user, work=work).delete()
+
+        if deleted:
             return Response({"message": _("Unliked")}, status=status.HTTP_200_OK)
-        except Like.DoesNotExist:
-            return Response({"message": _("You haven't liked this work")}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": _("You haven't liked this work")}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TagListView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    Tags for the tag picker, most used first.
 
+    Query params:
+        q: Name prefix to search for
+        limit: Number of tags (default 100, max 500)
 
-class TagListView(generics.ListAPIView):
+    Without either parameter every tag is returned, as the SPA's tag pickers
+    still load the whole list and resolve selected tag ids from it.
+    """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     #permission_classes = [IsAuthenticated]
+    default_limit = 100
+    max_limit = 500
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
 
-class CategoryListView(generics.ListAPIView):
+    def list(self, request, *args, **kwargs):
+        prefix = request.query_params.get('q', '').strip()
+        if prefix:
+            return Response(self.get_serializer(search_tags(prefix, self.get_limit()), many=True).data)
+        limit = self.get_limit() if 'limit' in request.query_params else None
+        return Response(get_top_tags(limit, self.version_stamps[Tag]))
+
+class CategoryListView(ConditionalGetMixin, generics.ListAPIView):
     queryset = Category.objects.all().order_by('id')
     serializer_class = CategorySerializer
     #permission_classes = [IsAuthenticated]
@@ -176,54 +197,32 @@ class CategoryListView(generics.ListAPIView):
 class SiblingGalleryView(generics.ListAPIView):
    serializer_class = WorkSerializer
    permission_classes = [IsChild]
-   filter_backends = [DjangoFilterBackend, SearchFilter]
+   filter_backends = [DjangoFilterBackend, WorkSearchFilter]
    filterset_class = WorkFilter
-   search_fields = ['title', 'description', 'tags__name']
-   pagination_class = CustomPageNumberPagination
+   pagination_class = CustomCursorPagination
+   # Newest first on the family feed index; see work/feed.py
+   cursor_ordering = ('-feed_created_at', '-id')
+   # authentication, works, images, tags, likes, shared users
+   query_budget = 6
 
    def get_queryset(self):
        """
-       Return artworks from shared siblings and current user
+       Return the public artworks of the current user and their siblings
        """
-       user = self.request.user
-       
-       # Get siblings that are shared with this user
-       siblings = user.get_sibilings().exclude(id=user.id)
-       shared_siblings = siblings.filter()
-       
-       # Add current user to the queryset
-       user_ids = list(shared_siblings.values_list('id', flat=True))
-       user_ids.append(user.id)
-       
-       # Get works from shared siblings and current user
-       queryset = Work.objects.filter(
-           member__id__in=user_ids,
-           public_visibility='public', 
-           is_public=True,
+       return Work.objects.filter(
+           feed_entry__family_id=get_family_id(self.request.user),
+       ).annotate(
+           feed_created_at=F('feed_entry__created_at'),
        ).select_related(
            'member',
            'category'
-       ).prefetch_related(
-           'images',
-           'tags',
-           'likes'
-       ).order_by('-created_at')
-
-       return queryset
+       ).order_by('-feed_created_at', '-id')
 
    def get_serializer_context(self):
        context = super().get_serializer_context()
        context['request'] = self.request
        return context
 
-   def list(self, request, *args, **kwargs):
-       # Add extra logging to debug the query and results
-       queryset = self.get_queryset()
-       print(f"Query: {queryset.query}")  # Log the SQL query
-       print(f"User IDs included: {[x.member_id for x in queryset]}")  # Log member IDs
-       
-       return super().list(request, *args, **kwargs)
-
 
 class WorkDeleteView(generics.DestroyAPIView):
     queryset = Work.objects.all()
@@ -289,16 +288,11 @@ class WorkUpdateView(APIView):
                     for img in image_files:
                         if img:
                             try:
-                                # Generate hash
-                                img.seek(0)
-                                image_hash = hashlib.sha256(img.read()).hexdigest()
-                                img.seek(0)
-                                
-                                # Create new image
+                                # Create new image (hash computed while the upload streamed in)
                                 Image.objects.create(
                                     work=work,
                                     image=img,
-                                    hash=image_hash
+                                    hash=get_file_hash(img)
                                 )
                             except Exception as img_error:
                                 print(f"Error processing image: {img_error}")
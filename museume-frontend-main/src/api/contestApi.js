@@ -1,13 +1,13 @@
 import { toast } from 'react-toastify';
-import { fetchData } from './fetchHelpers';
+import { buildPageQuery, fetchData } from './fetchHelpers';
 import { BASE_URL } from '../constants';
 
 const WORK_URL = `${BASE_URL}`;
 
-export const getContestsApi = async ({ page = 1, search = '', filter = '' }) => {
+export const getContestsApi = async ({ page = 1, next = null, search = '', filter = '' }) => {
   try {
     const response = await fetchData({
-      apiUrl: `${WORK_URL}/contests?page=${page}&search=${search}&status=${filter}`,
+      apiUrl: `${WORK_URL}/contests?${buildPageQuery(page, next)}&search=${search}&status=${filter}`,
       method: 'GET'
     });
     return response;
@@ -24,6 +24,23 @@ const buildQueryParams = (params) => {
   return query ? `?${query}` : '';
 };
 
+// Helper function to build the paging part of a list query. Lists paginated
+// by cursor (galleries, contests) return an opaque cursor in `next`, so later
+// pages follow that link instead of asking for a page number; search results
+// are still numbered and their `next` carries the page.
+export const buildPageQuery = (page, next) => {
+  if (page > 1 && next) {
+    const params = new URL(next).searchParams;
+    if (params.has('cursor')) {
+      return `cursor=${encodeURIComponent(params.get('cursor'))}`;
+    }
+    if (params.has('page')) {
+      return `page=${params.get('page')}`;
+    }
+  }
+  return page > 1 ? `page=${page}` : '';
+};
+
 // Helper function to process error responses
 const processErrorResponse = (error) => {
   if (!error.response) {
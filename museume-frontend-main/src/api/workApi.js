@@ -1,5 +1,5 @@
 import { toast } from 'react-toastify';
-import { fetchData } from './fetchHelpers';
+import { buildPageQuery, fetchData } from './fetchHelpers';
 import { BASE_URL } from '../constants';
 
 const WORK_URL = `${BASE_URL}`;
@@ -58,10 +58,10 @@ export const getCategoriesApi = async () => {
   }
 };
 
-export const getPublicWorksApi = async ({ page = 1, search = '', category = '', tags = '' }) => {
+export const getPublicWorksApi = async ({ page = 1, next = null, search = '', category = '', tags = '' }) => {
   try {
     const response = await fetchData({
-      apiUrl: `${WORK_URL}/artworks/?page=${page}&search=${search}&category=${category}&tags=${tags}`,
+      apiUrl: `${WORK_URL}/artworks/?${buildPageQuery(page, next)}&search=${search}&category=${category}&tags=${tags}`,
       method: 'GET'
     });
     return response;
@@ -71,10 +71,10 @@ export const getPublicWorksApi = async ({ page = 1, search = '', category = '',
   }
 };
 
-export const getMyCollectionApi = async ({ page = 1, search = '', category = '', tags = '' }) => {
+export const getMyCollectionApi = async ({ page = 1, next = null, search = '', category = '', tags = '' }) => {
   try {
     const response = await fetchData({
-      apiUrl: `${WORK_URL}/artworks/my-collection/?page=${page}&search=${search}&category=${category}&tags=${tags}`,
+      apiUrl: `${WORK_URL}/artworks/my-collection/?${buildPageQuery(page, next)}&search=${search}&category=${category}&tags=${tags}`,
       method: 'GET'
     });
     return response;
@@ -136,10 +136,10 @@ export const getWorkDetailApi = async (workId) => {
   }
 };
 
-export const getFamilyGalleryApi = async ({ page = 1, search = '', category = '', tags = '' }) => {
+export const getFamilyGalleryApi = async ({ page = 1, next = null, search = '', category = '', tags = '' }) => {
   try {
     const response = await fetchData({
-      apiUrl: `${WORK_URL}/artworks/family-gallery/?page=${page}&search=${search}&category=${category}&tags=${tags}`,
+      apiUrl: `${WORK_URL}/artworks/family-gallery/?${buildPageQuery(page, next)}&search=${search}&category=${category}&tags=${tags}`,
       method: 'GET'
     });
     return response;
@@ -22,7 +22,7 @@ const ContestList = () => {
   const handleSeeMore = () => {
     if (contests?.next) {
       setPage(prev => prev + 1);
-      dispatch(getContests({ page: page + 1, search, filter }));
+      dispatch(getContests({ page: page + 1, next: contests.next, search, filter }));
     }
   };
 
@@ -68,6 +68,7 @@ const FamilyGallery = () => {
         ...(selectedCategory && { category: selectedCategory }),
         ...(selectedTags && { tags: selectedTags }),
         page: currentPage,
+        next: familyGallery?.next,
       };
       dispatch(getFamilyGallery(queryParams));
     }
@@ -48,6 +48,7 @@ const MyCollectionPage = () => {
         ...(selectedCategory && { category: selectedCategory }),
         ...(selectedTags && { tags: selectedTags }),
         page: currentPage,
+        next: myCollection?.next,
       };
       dispatch(getMyCollection(queryParams));
     }
@@ -46,6 +46,7 @@ const PublicGalleryPage = () => {
         ...(selectedCategory && { category: selectedCategory }),
         ...(selectedTags && { tags: selectedTags }),
         page: currentPage,
+        next: publicWorks?.next,
       };
       dispatch(getPublicWorks(queryParams));
     }
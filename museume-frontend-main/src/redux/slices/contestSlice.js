@@ -1,9 +1,9 @@
 import { createSlice, createAsyncThunk } from '@reduxjs/toolkit';
 import { getContestsApi, getContestDetailApi, getMyContestsApi, submitContestWorkApi, getArtistClassesApi, getArtistClassDetailApi, artistClassSignUpApi, getArtistClassVideoUrlApi, confirmPaymentApi, getMyArtistClassesApi } from '../../api/contestApi';
 
-export const getContests = createAsyncThunk('contest/getContests', async ({ page = 1, search = '', filter = '' }, thunkAPI) => {
+export const getContests = createAsyncThunk('contest/getContests', async ({ page = 1, next = null, search = '', filter = '' }, thunkAPI) => {
   try {
-    const response = await getContestsApi({ page, search, filter });
+    const response = await getContestsApi({ page, next, search, filter });
     return { data: response, page, search, filter };
   } catch (error) {
     console.error("Get Contests Thunk error:", error);
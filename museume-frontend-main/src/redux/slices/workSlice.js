@@ -41,9 +41,9 @@ export const getCategories = createAsyncThunk('work/getCategories', async (_, th
   }
 });
 
-export const getPublicWorks = createAsyncThunk('work/getPublicWorks', async ({ page = 1, search = '', category = '', tags = '', isLike = false }, thunkAPI) => {
+export const getPublicWorks = createAsyncThunk('work/getPublicWorks', async ({ page = 1, next = null, search = '', category = '', tags = '', isLike = false }, thunkAPI) => {
   try {
-    const response = await getPublicWorksApi({ page, search, category, tags });
+    const response = await getPublicWorksApi({ page, next, search, category, tags });
     return { data: response, isLike, page, search, category, tags };
   } catch (error) {
     console.error("Get Public Works Thunk error:", error);
@@ -51,9 +51,9 @@ export const getPublicWorks = createAsyncThunk('work/getPublicWorks', async ({ p
   }
 });
 
-export const getMyCollection = createAsyncThunk('work/getMyCollection', async ({ page = 1, search = '', category = '', tags = '' }, thunkAPI) => {
+export const getMyCollection = createAsyncThunk('work/getMyCollection', async ({ page = 1, next = null, search = '', category = '', tags = '' }, thunkAPI) => {
   try {
-    const response = await getMyCollectionApi({ page, search, category, tags });
+    const response = await getMyCollectionApi({ page, next, search, category, tags });
     return { data: response, page, search, category, tags };
   } catch (error) {
     console.error("Get My Collection Thunk error:", error);
@@ -101,9 +101,9 @@ export const getWorkDetail = createAsyncThunk('work/workDetail', async (id, thun
   }
 });
 
-export const getFamilyGallery = createAsyncThunk('work/getFamilyGallery', async ({ page = 1, search = '', category = '', tags = '', isLike = false }, thunkAPI) => {
+export const getFamilyGallery = createAsyncThunk('work/getFamilyGallery', async ({ page = 1, next = null, search = '', category = '', tags = '', isLike = false }, thunkAPI) => {
   try {
-    const response = await getFamilyGalleryApi({ page, search, category, tags });
+    const response = await getFamilyGalleryApi({ page, next, search, category, tags });
     return { data: response, isLike, page, search, category, tags };
   } catch (error) {
     console.error("Get Family Gallery Thunk error:", error);